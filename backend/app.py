@@ -1,14 +1,32 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g
 from flask_cors import CORS
-import joblib
 import numpy as np
 from pymongo import MongoClient
-from pymongo.errors import ServerSelectionTimeoutError, OperationFailure
+from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError, OperationFailure
 from datetime import datetime
 from bson import ObjectId
 import os
+import io
+import csv
 import json
-import hashlib   # NEW ✔
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import artifacts
+import batching
+import calibration
+import downsample
+import drift
+import events
+import explain
+import model_store
+import preprocessing
+import profiling
+import schema
+import shadow
+import telemetry
 
 app = Flask(__name__)
 CORS(app)
@@ -17,56 +35,79 @@ CORS(app)
 # PATHS
 # ─────────────────────────────────────────────
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_DIR = os.path.join(BASE_DIR, "..", "model")
+MODEL_DIR = model_store.MODEL_DIR
 FALLBACK_FILE = os.path.join(BASE_DIR, "predictions_fallback.json")
 
 # ─────────────────────────────────────────────
-# SHA256 HASH FN — for version freezing
-# ─────────────────────────────────────────────
-def file_hash(path):
-    try:
-        with open(path, "rb") as f:
-            return hashlib.sha256(f.read()).hexdigest()
-    except:
-        return "missing"
-
-MODEL_VERSION_INFO = {}   # NEW ✔
-
-# ─────────────────────────────────────────────
-# LOAD SCALER & MODELS (FROZEN)
+# LOAD PREPROCESSING & MODELS (FROZEN) — see artifacts.py, preprocessing.py, model_store.py
 # ─────────────────────────────────────────────
-def load_frozen_model(name, file_path):
-    """Load model, compute hash, freeze version info."""
-    model = joblib.load(file_path)
-    MODEL_VERSION_INFO[name] = {
-        "path": file_path,
-        "sha256": file_hash(file_path)
-    }
-    return model
-
+ARTIFACTS = None
 try:
-    scaler = joblib.load(os.path.join(MODEL_DIR, "scaler.pkl"))
-
-    models = {
-        "random_forest": load_frozen_model(
-            "random_forest", os.path.join(MODEL_DIR, "random_forest.pkl")
-        ),
-        "logistic_regression": load_frozen_model(
-            "logistic_regression", os.path.join(MODEL_DIR, "logistic_regression.pkl")
-        ),
-        "gradient_boosting": load_frozen_model(
-            "gradient_boosting", os.path.join(MODEL_DIR, "gradient_boosting.pkl")
-        ),
-    }
+    ARTIFACTS = artifacts.open_run(MODEL_DIR)
+    preprocessor = preprocessing.load(ARTIFACTS)
+    models, MODEL_VERSION_INFO = model_store.load_frozen_models(ARTIFACTS)
 
-    print("\n✔ MODELS LOADED & FROZEN")
+    print("\n✔ MODELS LOADED & FROZEN"
+          + (f" — run {ARTIFACTS.run}" if ARTIFACTS.run else " — loose files (no artifact store)"))
     for m, info in MODEL_VERSION_INFO.items():
-        print(f"   {m}: {info['sha256']}")
+        variant = "" if info["variant"] == "full" else f" [{info['variant']}]"
+        print(f"   {m}: {info['sha256']}{variant}")
+    print(f"   preprocessing v{preprocessor.version}: {preprocessor.sha256} "
+          f"(imputes {', '.join(preprocessor.optional)}; default input: {preprocessor.encoding.default})")
+
+    # Per-model calibration tables — see calibration.py
+    CALIBRATION = calibration.load(ARTIFACTS)
+    if CALIBRATION:
+        print(f"   calibration v{CALIBRATION.version}: " + ", ".join(
+            f"{m} {t['method']}" for m, t in CALIBRATION.models.items()))
+        if model_store.VARIANT != "full":
+            print(f"   {model_store.VARIANT} variants: " + ", ".join(
+                f"{m} {t['method']}" for m, t in CALIBRATION.variants.items() if m.endswith(f".{model_store.VARIANT}")))
+    else:
+        print("⚠ No calibration table (or CARDIOSCAN_CALIBRATION=0) → raw probabilities")
+
+    # Live feature distributions vs the training reference — see drift.py
+    DRIFT = drift.load(ARTIFACTS, preprocessor.optional)
+    if DRIFT:
+        print(f"   drift reference v{DRIFT.version}: {DRIFT.reference_rows} training rows "
+              f"(recent window {drift.BLOCK_ROWS * drift.WINDOW_BLOCKS} predictions)")
+    else:
+        print("⚠ No drift reference (or CARDIOSCAN_DRIFT=0) → drift monitoring off")
 
 except Exception as e:
     print(f"✘ Error loading models: {e}")
-    scaler = None
+    preprocessor = None
     models = {}
+    MODEL_VERSION_INFO = {}
+    CALIBRATION = None
+    DRIFT = None
+
+CALIBRATORS = ({name: CALIBRATION.calibrator(name, MODEL_VERSION_INFO[name]["variant"]) for name in models}
+               if CALIBRATION else {})
+
+# Flatten tree ensembles for TreeSHAP now so the first /predict/explain is fast
+for _name, _model in models.items():
+    if MODEL_VERSION_INFO[_name]["variant"] == "full":
+        explain.get_explainer(MODEL_VERSION_INFO[_name]["sha256"], _model, _model.n_features_in_)
+
+# Candidate models scoring /predict traffic off the response path (CARDIOSCAN_SHADOW) — see shadow.py
+SHADOW = None
+if models and shadow.CANDIDATES:
+    try:
+        SHADOW = shadow.load(MODEL_DIR, models, preprocessor.sha256)
+        for _name, _candidates in SHADOW.by_model.items():
+            for _c in _candidates:
+                print(f"✔ Shadowing {_name} with {_c.info['sha256'][:12]} "
+                      f"({_c.info['file']}, run {_c.info['run']})")
+    except Exception as e:
+        print(f"⚠ Shadow scoring off: {e}")
+
+# Opt-in request coalescing (CARDIOSCAN_BATCHING=1) — see batching.py
+batcher = None
+if batching.ENABLED and models:
+    batcher = batching.MicroBatcher(models, preprocessor)
+    print(f"✔ Micro-batching on (max_wait={batching.MAX_WAIT * 1000:.1f} ms, "
+          f"max_batch={batching.MAX_BATCH})")
 
 # ─────────────────────────────────────────────
 # DATABASE CONNECTION
@@ -87,6 +128,11 @@ try:
     collection = db["predictions"]
     USE_DB = True
     print("✔ Connected to MongoDB Atlas")
+    try:
+        # One label per /history index: a second POST for the same index is rejected
+        db["outcomes"].create_index("index", unique=True)
+    except Exception as e:
+        print(f"⚠ outcomes.index unique index not created ({e}) → duplicates left to retrain.ingest")
 except Exception as e:
     _db_error = str(e)
     print("⚠ MongoDB unavailable → using fallback JSON file")
@@ -103,11 +149,16 @@ def _read_fallback():
     except:
         return []
 
+_fallback_lock = threading.Lock()
+
 def _append_fallback(record):
-    data = _read_fallback()
-    data.append(record)
-    with open(FALLBACK_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+    """Append one record; returns the new record count (the history cursor)."""
+    with _fallback_lock:
+        data = _read_fallback()
+        data.append(record)
+        with open(FALLBACK_FILE, "w") as f:
+            json.dump(data, f, indent=2)
+        return len(data)
 
 # ─────────────────────────────────────────────
 # SERIALIZER
@@ -126,11 +177,7 @@ def serialize(doc):
 # ─────────────────────────────────────────────
 # NORMALISER
 # ─────────────────────────────────────────────
-FEATURE_KEYS = [
-    "age", "sex", "cp", "trestbps", "chol",
-    "fbs", "restecg", "thalach", "exang",
-    "oldpeak", "slope", "ca", "thal"
-]
+FEATURE_KEYS = model_store.FEATURE_KEYS
 
 def normalise_record(r):
     if "input_data" in r:
@@ -145,99 +192,871 @@ def normalise_record(r):
     return r
 
 # ─────────────────────────────────────────────
-# ROUTES
+# PREDICTION CORE — shared by the Flask routes and asgi_app.py
 # ─────────────────────────────────────────────
+def resolve_model(data):
+    """The requested model name (default random_forest); the first read of a JSON body."""
+    if not isinstance(data, dict):
+        raise schema.ValidationError({"body": "must be a JSON object"})
+    model_name = data.get("model", "random_forest")
+    if model_name not in models:
+        model_name = "random_forest"
+    return model_name
 
-@app.route("/")
-def home():
-    return jsonify({
+def parse_features(data):
+    """(1, 13) float row in training codes; raises schema.ValidationError (a 400).
+
+    Every request scored for the prediction stream comes through here, so
+    this is where the drift monitor sees it (or counts its rejection)."""
+    if DRIFT is None:
+        return preprocessor.prepare_row(data)
+    try:
+        features = preprocessor.prepare_row(data)
+    except schema.ValidationError as e:
+        DRIFT.reject(e.fields)
+        raise
+    DRIFT.observe(features, [data.get(k) is None for k in preprocessor.optional])
+    return features
+
+def infer(model_name, features):
+    """Scale one raw feature row and run the model; returns raw (prediction, probability)."""
+    stage = telemetry.STAGE_LATENCY
+    model = models[model_name]
+    with telemetry.timed(stage, stage="scale", model=model_name):
+        feats_scaled = preprocessor.transform(features)
+    with telemetry.timed(stage, stage="predict_proba", model=model_name):
+        proba = model.predict_proba(feats_scaled)[0]
+    return int(model.classes_[proba.argmax()]), float(proba[1])
+
+def build_record(data, model_name, pred, prob):
+    """Record for one scored row; a calibrated model's probability is mapped here."""
+    record = {k: data.get(k) for k in FEATURE_KEYS}
+    record["model_used"] = model_name
+    record["encoding"] = data.get("encoding") or preprocessor.encoding.default
+    calibrate = CALIBRATORS.get(model_name)
+    if calibrate is not None:
+        record["raw_probability"] = prob
+        prob = float(calibrate(prob))
+        pred = int(prob >= calibration.THRESHOLD)
+    record["probability"] = prob
+    record["prediction"] = pred
+    record["timestamp"] = datetime.now().isoformat()
+    return record
+
+def score_request(data):
+    """Run the requested model on one JSON body and build the record to store."""
+    # Identify model
+    model_name = resolve_model(data)
+
+    print(f"[PREDICT] Using model: {model_name} ({MODEL_VERSION_INFO[model_name]['sha256']})")
+
+    # Validate features
+    features = parse_features(data)
+
+    if batcher is not None:
+        with telemetry.timed(telemetry.STAGE_LATENCY, stage="batch_wait", model=model_name):
+            pred, prob = batcher.submit(model_name, features).result()
+    else:
+        pred, prob = infer(model_name, features)
+
+    record = build_record(data, model_name, pred, prob)
+    if SHADOW is not None:
+        SHADOW.submit(data, features, record)
+    return record
+
+def store_record(record):
+    """Persist a prediction record; returns the storage backend it landed in."""
+    store_start = time.perf_counter()
+    cursor = None
+    if USE_DB:
+        try:
+            collection.insert_one(record)
+            stored_in = "mongodb_atlas"
+        except:
+            telemetry.ERRORS.inc(route="predict", kind="mongo_insert")
+            cursor = _append_fallback(record)
+            stored_in = "local_json"
+    else:
+        cursor = _append_fallback(record)
+        stored_in = "local_json"
+    record_store_metrics(record, stored_in, time.perf_counter() - store_start)
+    publish_stored(record, stored_in, cursor)
+    return stored_in
+
+def publish_stored(record, stored_in, cursor=None):
+    """Push a stored record to /history/stream clients — only if /history will show it."""
+    if not events.broadcaster.active or stored_in != ("mongodb_atlas" if USE_DB else "local_json"):
+        return
+    if cursor is None:
+        cursor = history_version()
+    events.publish_prediction(serialize(record), cursor)
+
+def record_store_metrics(record, stored_in, elapsed):
+    telemetry.STAGE_LATENCY.observe(elapsed, stage="store", backend=stored_in)
+    telemetry.PREDICTIONS.inc(model=record["model_used"])
+    telemetry.STORAGE_WRITES.inc(backend=stored_in)
+
+def prediction_response(record, stored_in):
+    model_name = record["model_used"]
+    return {
+        "prediction": record["prediction"],
+        "probability": record["probability"],
+        "model_used": model_name,
+        "model_hash": MODEL_VERSION_INFO[model_name]["sha256"],
+        "calibrated": "raw_probability" in record,
+        "stored_in": stored_in
+    }
+
+# ─────────────────────────────────────────────
+# ENSEMBLE — every frozen model on one scaled row
+# ─────────────────────────────────────────────
+TREE_MODELS = ("random_forest", "gradient_boosting")
+ENSEMBLE_POOL = ThreadPoolExecutor(max_workers=len(TREE_MODELS), thread_name_prefix="cardioscan-ensemble")
+
+def ensemble_weights(requested):
+    """Normalise {model: weight} for the soft vote; missing models get weight 0."""
+    if not requested:
+        return {name: 1.0 / len(models) for name in models}
+    if not isinstance(requested, dict):
+        raise schema.ValidationError({"weights": "must be an object of {model: weight}"})
+    unknown = set(requested) - set(models)
+    if unknown:
+        raise schema.ValidationError({"weights": f"unknown models: {sorted(unknown)}"})
+    try:
+        weights = {name: float(requested.get(name, 0.0)) for name in models}
+    except (TypeError, ValueError):
+        raise schema.ValidationError({"weights": "values must be numbers"})
+    # float("nan") / float("inf") parse, but would store a NaN probability
+    if not all(math.isfinite(w) for w in weights.values()):
+        raise schema.ValidationError({"weights": "values must be finite numbers"})
+    total = sum(weights.values())
+    if any(w < 0 for w in weights.values()) or total <= 0:
+        raise schema.ValidationError({"weights": "must be non-negative with a positive sum"})
+    return {name: w / total for name, w in weights.items()}
+
+def ensemble_threshold(requested):
+    if requested is None:
+        return calibration.THRESHOLD
+    if isinstance(requested, bool) or not isinstance(requested, (int, float)) or not 0 <= requested <= 1:
+        raise schema.ValidationError({"threshold": "must be a number between 0 and 1"})
+    return float(requested)
+
+def score_ensemble(data):
+    """Scale once, score all models (trees in parallel) and soft-vote the result."""
+    stage = telemetry.STAGE_LATENCY
+    if not isinstance(data, dict):
+        raise schema.ValidationError({"body": "must be a JSON object"})
+    weights = ensemble_weights(data.get("weights"))
+    threshold = ensemble_threshold(data.get("threshold"))
+    features = parse_features(data)
+
+    with telemetry.timed(stage, stage="scale", model="ensemble"):
+        feats_scaled = preprocessor.transform(features)
+
+    with telemetry.timed(stage, stage="predict_proba", model="ensemble"):
+        pending = {
+            name: ENSEMBLE_POOL.submit(models[name].predict_proba, feats_scaled)
+            for name in TREE_MODELS if name in models
+        }
+        probas = {
+            name: model.predict_proba(feats_scaled)[0]
+            for name, model in models.items() if name not in pending
+        }
+        for name, fut in pending.items():
+            probas[name] = fut.result()[0]
+
+    per_model = {}
+    for name in models:
+        proba = probas[name]
+        pred, prob = int(models[name].classes_[proba.argmax()]), float(proba[1])
+        calibrate = CALIBRATORS.get(name)
+        if calibrate is not None:
+            prob = float(calibrate(prob))
+            pred = int(prob >= calibration.THRESHOLD)
+        per_model[name] = {
+            "prediction": pred,
+            "probability": prob,
+            "model_hash": MODEL_VERSION_INFO[name]["sha256"],
+        }
+
+    prob = float(sum(weights[n] * per_model[n]["probability"] for n in models))
+    record = build_record(data, "ensemble", int(prob >= threshold), prob)
+    record["model_probabilities"] = {n: per_model[n]["probability"] for n in models}
+    record["ensemble_weights"] = weights
+    return record, per_model
+
+def ensemble_response(record, per_model, stored_in):
+    return {
+        "prediction": record["prediction"],
+        "probability": record["probability"],
+        "model_used": "ensemble",
+        "weights": record["ensemble_weights"],
+        "models": per_model,
+        "stored_in": stored_in
+    }
+
+def explain_request(data):
+    """Per-feature attributions for one patient; base_value + sum == model output."""
+    model_name = resolve_model(data)
+    model_hash = MODEL_VERSION_INFO[model_name]["sha256"]
+    variant = MODEL_VERSION_INFO[model_name]["variant"]
+    if variant != "full":
+        raise schema.ValidationError({"model": f"explanations need the full model; {model_name} "
+                                               f"is served as the {variant} variant"})
+    features = preprocessor.prepare_row(data)      # not a prediction — kept out of the drift monitor
+    with telemetry.timed(telemetry.STAGE_LATENCY, stage="explain", model=model_name):
+        output_space, base, contribs = explain.explain(
+            model_hash, models[model_name], features, preprocessor.transform
+        )
+    return {
+        "model_used": model_name,
+        "model_hash": model_hash,
+        "output_space": output_space,
+        "base_value": base,
+        "contributions": dict(zip(FEATURE_KEYS, contribs)),
+    }
+
+# ─────────────────────────────────────────────
+# BULK SCORING — CSV chunks from the upload page, not stored in history
+# ─────────────────────────────────────────────
+BULK_MAX_ROWS = 10000
+
+BULK_ROWS = telemetry.counter(
+    "cardioscan_bulk_rows_total", "Rows received by /predict/batch, by model and outcome (scored/invalid)."
+)
+
+def _csv_cell(row, index):
+    try:
+        return float(row[index])
+    except (IndexError, ValueError):
+        return np.nan
+
+def parse_feature_csv(body):
+    """Feature matrix from a CSV chunk with a header row; unparseable cells become NaN."""
+    reader = csv.reader(io.StringIO(body.decode("utf-8-sig")))
+    header = [h.strip() for h in next(reader, [])]
+    missing = [k for k in FEATURE_KEYS if k not in header]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+
+    columns = [header.index(k) for k in FEATURE_KEYS]
+    rows = []
+    for row in reader:
+        if not row:
+            continue
+        if len(rows) == BULK_MAX_ROWS:
+            raise ValueError(f"at most {BULK_MAX_ROWS} rows per request")
+        rows.append([_csv_cell(row, i) for i in columns])
+    return np.array(rows, dtype=np.float64).reshape(-1, len(FEATURE_KEYS))
+
+def score_bulk(model_name, features, encoding_name=None):
+    """Score every complete row with one transform + predict_proba; others come back null."""
+    features, valid, invalid_fields = preprocessor.prepare_matrix(features, encoding_name)
+    with telemetry.timed(telemetry.STAGE_LATENCY, stage="predict_proba", model=model_name):
+        _, prediction, probability = model_store.score_matrix(
+            models[model_name], preprocessor, features, valid, CALIBRATORS.get(model_name))
+
+    scored = int(valid.sum())
+    BULK_ROWS.inc(scored, model=model_name, outcome="scored")
+    BULK_ROWS.inc(len(features) - scored, model=model_name, outcome="invalid")
+    return {
+        "model_used": model_name,
+        "model_hash": MODEL_VERSION_INFO[model_name]["sha256"],
+        "rows": len(features),
+        "scored": scored,
+        "invalid_fields": invalid_fields,
+        "prediction": [int(p) if ok else None for p, ok in zip(prediction, valid)],
+        "probability": [float(p) if ok else None for p, ok in zip(probability, valid)],
+    }
+
+# ─────────────────────────────────────────────
+# MODEL CARDS — read once, re-read only when the file changes (never, for a stored run)
+# ─────────────────────────────────────────────
+_card_cache = {}
+
+def load_model_card(name):
+    file = f"cards/{name}.json"
+    if ARTIFACTS is None or not ARTIFACTS.exists(file):
+        raise FileNotFoundError(file)
+    stamp = ARTIFACTS.stamp(file)
+    cached = _card_cache.get(name)
+    telemetry.record_cache("model_card", cached is not None and cached[0] == stamp)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    card = json.loads(ARTIFACTS.read(file)[0])
+    served = MODEL_VERSION_INFO.get(name, {}).get("sha256")
+    card["matches_served_model"] = served == card.get("sha256")
+    _card_cache[name] = (stamp, card)
+    return card
+
+def model_cards_payload():
+    cards = {}
+    for name in models:
+        try:
+            cards[name] = load_model_card(name)
+        except FileNotFoundError:
+            continue
+    return {"cards": cards}
+
+# ─────────────────────────────────────────────
+# HISTORY — the store is append-only, so its record count doubles as a
+# monotonic write counter: it versions the ETag and is the `since` cursor
+# ─────────────────────────────────────────────
+_fallback_cache = (None, [])
+
+def _fallback_history():
+    """Fallback records, re-parsed only when the file's mtime/size changes."""
+    global _fallback_cache
+    try:
+        st = os.stat(FALLBACK_FILE)
+    except FileNotFoundError:
+        return []
+    key = (st.st_mtime_ns, st.st_size)
+    cached_key, records = _fallback_cache
+    telemetry.record_cache("history_file", cached_key == key)
+    if cached_key != key:
+        records = _read_fallback()
+        _fallback_cache = (key, records)
+    return records
+
+def load_history():
+    if USE_DB:
+        raw = list(collection.find({}, {"_id": 0}))
+        return [normalise_record(serialize(r)) for r in raw]
+    return _fallback_history()
+
+def history_version():
+    if USE_DB:
+        return collection.estimated_document_count()
+    return len(_fallback_history())
+
+def history_etag(version):
+    return f"history-{'db' if USE_DB else 'json'}-{version}"
+
+def parse_since(value):
+    """`since` is a record cursor (int) or an ISO timestamp; ValueError otherwise."""
+    if value is None or value.isdigit():
+        return None if value is None else int(value)
+    datetime.fromisoformat(value)
+    return value
+
+def history_query(since):
+    """(filter, skip) selecting the Mongo records after `since`."""
+    if isinstance(since, int):
+        return {}, since
+    return {"timestamp": {"$gt": since}}, 0
+
+def history_delta(since, records, version):
+    """{"cursor", "records"} for a ?since= fetch; `records` are those after `since`."""
+    if isinstance(since, int):
+        # A cursor past the end means the store was reset — hand back the real count
+        cursor = since + len(records) if records else min(since, version)
+    else:
+        cursor = version
+    return {"cursor": cursor, "records": records}
+
+def load_history_since(since, version):
+    if USE_DB:
+        query, skip = history_query(since)
+        raw = list(collection.find(query, {"_id": 0}).skip(skip))
+        records = [normalise_record(serialize(r)) for r in raw]
+    elif isinstance(since, int):
+        records = _fallback_history()[since:]
+    else:
+        records = [r for r in _fallback_history() if str(r.get("timestamp", "")) > since]
+    return history_delta(since, records, version)
+
+# ─────────────────────────────────────────────
+# OUTCOMES — observed labels for stored predictions, read by model/retrain.py
+# ─────────────────────────────────────────────
+OUTCOME_FILE = os.path.join(BASE_DIR, "outcomes.jsonl")
+_outcome_lock = threading.Lock()
+_labeled = None   # indices already in OUTCOME_FILE, read once on the first local write
+
+def parse_outcome(data):
+    """(history index, outcome) from a /history/outcome body; raises schema.ValidationError."""
+    if not isinstance(data, dict):
+        raise schema.ValidationError({"body": "must be a JSON object"})
+    index, outcome = data.get("index"), data.get("outcome")
+    fields = {}
+    if not isinstance(index, int) or isinstance(index, bool) or index < 0:
+        fields["index"] = "must be a /history position (0 or more)"
+    if isinstance(outcome, bool) or outcome not in (0, 1):
+        fields["outcome"] = "must be 0 or 1"
+    if fields:
+        raise schema.ValidationError(fields)
+    return index, int(outcome)
+
+def stored_record(index):
+    """The stored prediction at /history position `index`, or None past the end."""
+    if USE_DB:
+        raw = list(collection.find({}, {"_id": 0}).skip(index).limit(1))
+        return normalise_record(serialize(raw[0])) if raw else None
+    records = _fallback_history()
+    return normalise_record(dict(records[index])) if index < len(records) else None
+
+def build_outcome(index, outcome, record):
+    """One labeled row: the stored inputs in training codes (imputed), plus the observed outcome.
+
+    Self-contained, so the retraining job reads only the label log, never the history."""
+    return {
+        "index": index,
+        "outcome": outcome,
+        "features": preprocessor.prepare_row(record)[0].tolist(),
+        "model_used": record.get("model_used"),
+        "prediction": record.get("prediction"),
+        "probability": record.get("probability"),
+        "predicted_at": record.get("timestamp"),
+        "labeled_at": datetime.now().isoformat(),
+    }
+
+def _local_labeled():
+    global _labeled
+    if _labeled is None:
+        _labeled = set()
+        if os.path.exists(OUTCOME_FILE):
+            with open(OUTCOME_FILE) as f:
+                _labeled = {json.loads(line)["index"] for line in f if line.strip()}
+    return _labeled
+
+def store_outcome(entry):
+    """Append a labeled row to the label log; returns the backend it landed in,
+    or None when that index is already labeled (the first label stands)."""
+    if USE_DB:
+        try:
+            db["outcomes"].insert_one(dict(entry))
+            return "mongodb_atlas"
+        except DuplicateKeyError:
+            return None
+        except Exception:
+            telemetry.ERRORS.inc(route="history_outcome", kind="mongo_insert")
+    # One JSON line per label: appending never rewrites the log
+    with _outcome_lock:
+        labeled = _local_labeled()
+        if entry["index"] in labeled:
+            return None
+        with open(OUTCOME_FILE, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        labeled.add(entry["index"])
+    return "local_json"
+
+# ─────────────────────────────────────────────
+# DRIFT MONITOR — seeded once from the stored history, then fed by parse_features
+# ─────────────────────────────────────────────
+DRIFT_WINDOWS = ("recent", "all")
+
+def seed_drift_monitor():
+    """Replay stored predictions into the monitor, one prepare_matrix per input encoding."""
+    by_encoding = {}
+    for r in load_history():
+        by_encoding.setdefault(r.get("encoding") or preprocessor.encoding.default, []).append(
+            [r.get(k) for k in FEATURE_KEYS])
+    seeded = 0
+    for encoding_name, rows in by_encoding.items():
+        try:
+            raw = np.array(rows, dtype=np.float64)
+            features, valid, _ = preprocessor.prepare_matrix(raw, encoding_name)
+        except (ValueError, TypeError, schema.ValidationError):
+            continue
+        imputed = np.isnan(raw[:, [FEATURE_KEYS.index(k) for k in preprocessor.optional]])
+        DRIFT.observe_matrix(features[valid], imputed[valid])
+        seeded += int(valid.sum())
+    return seeded
+
+def drift_payload(window):
+    if window not in DRIFT_WINDOWS:
+        raise ValueError(f"window must be one of {', '.join(DRIFT_WINDOWS)}")
+    return DRIFT.report(window)
+
+if DRIFT is not None:
+    try:
+        print(f"✔ Drift monitor seeded with {seed_drift_monitor()} stored predictions")
+    except Exception as e:
+        print(f"⚠ Drift monitor not seeded from history: {e}")
+
+# ─────────────────────────────────────────────
+# TIMELINE — downsampled (timestamp, probability) series for the charts
+# ─────────────────────────────────────────────
+TIMELINE_DEFAULT_POINTS = 1000
+TIMELINE_MAX_POINTS = 5000
+TIMELINE_CACHE_SIZE = 32
+
+_series_cache = (None, None)
+_timeline_cache = {}
+
+def load_series(version):
+    """(epoch-ms timestamps, probabilities) in time order, rebuilt only when the version moves.
+
+    Rows without a finite probability are left out: one NaN would otherwise
+    carry through the cumulative sums of rolling_mean and the LTTB bucket means."""
+    global _series_cache
+    cached_version, series = _series_cache
+    telemetry.record_cache("timeline_series", cached_version == version)
+    if cached_version == version:
+        return series
+
+    if USE_DB:
+        raw = collection.find({}, {"_id": 0, "timestamp": 1, "probability": 1})
+        rows = [serialize(r) for r in raw]
+    else:
+        rows = _fallback_history()
+    ts = np.array([r["timestamp"] for r in rows], dtype="datetime64[ms]")
+    prob = np.array([r["probability"] for r in rows], dtype=np.float64)
+    finite = np.isfinite(prob)
+    ts, prob = ts[finite], prob[finite]
+    order = np.argsort(ts, kind="stable")
+    series = (ts[order], prob[order])
+    _series_cache = (version, series)
+    return series
+
+def parse_timeline_args(args):
+    """points / method / rolling query parameters; ValueError with a client-facing message."""
+    try:
+        points = int(args.get("points", TIMELINE_DEFAULT_POINTS))
+        rolling = int(args.get("rolling", 0))
+    except (TypeError, ValueError):
+        raise ValueError("points and rolling must be integers")
+    method = args.get("method", "lttb")
+    if method not in downsample.METHODS:
+        raise ValueError(f"method must be one of {', '.join(downsample.METHODS)}")
+    if rolling < 0:
+        raise ValueError("rolling must be >= 0")
+    return {"points": min(max(points, 10), TIMELINE_MAX_POINTS), "method": method, "rolling": rolling}
+
+def rolling_mean(values, window):
+    """Trailing mean over `window` rows (fewer at the start) — pandas rolling(min_periods=1)."""
+    csum = np.concatenate([[0.0], np.cumsum(values)])
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    return (csum[end] - csum[start]) / (end - start)
+
+def timeline_payload(version, points, method, rolling):
+    key = (version, points, method, rolling)
+    cached = _timeline_cache.get(key)
+    telemetry.record_cache("timeline", cached is not None)
+    if cached is not None:
+        return cached
+
+    ts, prob = load_series(version)
+    keep = downsample.downsample(ts.astype(np.int64), prob, points, method)
+    payload = {
+        "total": len(ts),
+        "points": len(keep),
+        "method": method,
+        "timestamp": np.datetime_as_string(ts[keep], unit="ms").tolist(),
+        "probability": prob[keep].tolist(),
+    }
+    if rolling:
+        # Averaged over every record, then sampled at the kept rows
+        payload["rolling"] = rolling_mean(prob, rolling)[keep].tolist()
+
+    if len(_timeline_cache) >= TIMELINE_CACHE_SIZE:
+        _timeline_cache.clear()
+    _timeline_cache[key] = payload
+    return payload
+
+def home_payload():
+    return {
         "status": "CardioScan API running ✔",
         "models": MODEL_VERSION_INFO,
         "db": "mongodb_atlas" if USE_DB else "local_json",
-    })
+    }
+
+def model_info_payload():
+    return {
+        "status": "frozen_models",
+        "artifacts": ARTIFACTS.describe() if ARTIFACTS else None,
+        "models": MODEL_VERSION_INFO,
+        "preprocessing": preprocessor.describe() if preprocessor else None,
+        "calibration": CALIBRATION.describe() if CALIBRATION else None,
+        "shadow": SHADOW.describe() if SHADOW else None,
+    }
+
+def health_payload():
+    return {
+        "api": "ok",
+        "models_loaded": list(models.keys()),
+        "frozen_hashes": MODEL_VERSION_INFO,
+        "db": "mongodb_atlas" if USE_DB else "local_json",
+    }
+
+# ─────────────────────────────────────────────
+# REQUEST TIMING
+# ─────────────────────────────────────────────
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+    session = profiling.active()
+    if session is not None and request.endpoint != "admin_profile":
+        g.profile_session = session
+        g.profile = session.request_started()
+
+@app.after_request
+def _record_latency(response):
+    start = g.get("request_start")
+    if start is not None:
+        telemetry.REQUEST_LATENCY.observe(
+            time.perf_counter() - start, route=request.endpoint or "unknown"
+        )
+    return response
+
+@app.teardown_request
+def _finish_profile(exc):
+    # Runs even when the view raised, so a profiled request always releases the profiler
+    session = g.pop("profile_session", None)
+    if session is not None:
+        session.request_finished(g.get("profile"))
+
+def not_modified(etag):
+    resp = Response(status=304)
+    resp.set_etag(etag)
+    return resp
+
+def conditional_json(payload):
+    """jsonify with a strong ETag over the body; 304 when If-None-Match matches."""
+    resp = jsonify(payload)
+    resp.add_etag()
+    return resp.make_conditional(request)
+
+# ─────────────────────────────────────────────
+# ROUTES
+# ─────────────────────────────────────────────
+
+@app.route("/")
+def home():
+    return jsonify(home_payload())
 
 # NEW ✔
 @app.route("/model-info", methods=["GET"])
 def model_info():
-    return jsonify({
-        "status": "frozen_models",
-        "models": MODEL_VERSION_INFO
-    })
+    return jsonify(model_info_payload())
+
+@app.route("/model-cards", methods=["GET"])
+def model_cards():
+    resp = conditional_json(model_cards_payload())
+    resp.headers["Cache-Control"] = "max-age=300"
+    return resp
+
+@app.route("/model-cards/<name>", methods=["GET"])
+def model_card(name):
+    if name not in models:
+        return jsonify({"error": f"unknown model: {name}"}), 404
+    try:
+        resp = conditional_json(load_model_card(name))
+    except FileNotFoundError:
+        return jsonify({"error": "model card not found — re-run train_model.py"}), 404
+    resp.headers["Cache-Control"] = "max-age=300"
+    return resp
 
 @app.route("/predict", methods=["POST"])
 def predict():
-    if scaler is None:
+    if preprocessor is None:
+        return jsonify({"error": "Models not loaded"}), 503
+
+    try:
+        with telemetry.timed(telemetry.STAGE_LATENCY, stage="parse"):
+            data = request.get_json(force=True)
+
+        record = score_request(data)
+        stored_in = store_record(record)
+        return jsonify(prediction_response(record, stored_in))
+
+    except schema.ValidationError as e:
+        return jsonify(e.payload()), 400
+    except Exception as e:
+        telemetry.ERRORS.inc(route="predict", kind=type(e).__name__)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/predict/ensemble", methods=["POST"])
+def predict_ensemble():
+    if preprocessor is None:
+        return jsonify({"error": "Models not loaded"}), 503
+
+    try:
+        with telemetry.timed(telemetry.STAGE_LATENCY, stage="parse"):
+            data = request.get_json(force=True)
+
+        try:
+            record, per_model = score_ensemble(data)
+        except schema.ValidationError as e:
+            return jsonify(e.payload()), 400
+        stored_in = store_record(record)
+        return jsonify(ensemble_response(record, per_model, stored_in))
+
+    except Exception as e:
+        telemetry.ERRORS.inc(route="predict_ensemble", kind=type(e).__name__)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/predict/explain", methods=["POST"])
+def predict_explain():
+    if preprocessor is None:
         return jsonify({"error": "Models not loaded"}), 503
 
     try:
         data = request.get_json(force=True)
+        return jsonify(explain_request(data))
 
-        # Identify model
-        model_name = data.get("model", "random_forest")
-        if model_name not in models:
-            model_name = "random_forest"
-        model = models[model_name]
-
-        print(f"[PREDICT] Using model: {model_name} ({MODEL_VERSION_INFO[model_name]['sha256']})")
-
-        # Validate features
-        features = np.array([float(data[k]) for k in FEATURE_KEYS]).reshape(1, -1)
-
-        feats_scaled = scaler.transform(features)
-        pred = int(model.predict(feats_scaled)[0])
-        prob = float(model.predict_proba(feats_scaled)[0][1])
-
-        record = {k: data[k] for k in FEATURE_KEYS}
-        record["model_used"] = model_name
-        record["probability"] = prob
-        record["prediction"] = pred
-        record["timestamp"] = datetime.now().isoformat()
-
-        # Save record
-        if USE_DB:
-            try:
-                collection.insert_one(record)
-                stored_in = "mongodb_atlas"
-            except:
-                _append_fallback(record)
-                stored_in = "local_json"
-        else:
-            _append_fallback(record)
-            stored_in = "local_json"
+    except schema.ValidationError as e:
+        return jsonify(e.payload()), 400
+    except Exception as e:
+        telemetry.ERRORS.inc(route="predict_explain", kind=type(e).__name__)
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify({
-            "prediction": pred,
-            "probability": prob,
-            "model_used": model_name,
-            "model_hash": MODEL_VERSION_INFO[model_name]["sha256"],
-            "stored_in": stored_in
-        })
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    if preprocessor is None:
+        return jsonify({"error": "Models not loaded"}), 503
+
+    try:
+        model_name = resolve_model(request.args)
+        try:
+            with telemetry.timed(telemetry.STAGE_LATENCY, stage="parse"):
+                features = parse_feature_csv(request.get_data())
+            return jsonify(score_bulk(model_name, features, request.args.get("encoding")))
+        except schema.ValidationError as e:
+            return jsonify(e.payload()), 400
+        except (ValueError, UnicodeDecodeError) as e:
+            return jsonify({"error": str(e)}), 400
 
     except Exception as e:
+        telemetry.ERRORS.inc(route="predict_batch", kind=type(e).__name__)
         return jsonify({"error": str(e)}), 500
 
 @app.route("/history")
 def history():
     try:
-        if USE_DB:
-            raw = list(collection.find({}, {"_id": 0}))
-            records = [normalise_record(serialize(r)) for r in raw]
+        since = parse_since(request.args.get("since"))
+    except ValueError:
+        return jsonify({"error": "since must be a record cursor or an ISO timestamp"}), 400
+
+    try:
+        # Read the version first: a write landing mid-request then only costs
+        # the client one extra fetch, never a stale 304
+        version = history_version()
+        etag = history_etag(version)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+
+        if since is None:
+            resp = jsonify(load_history())
         else:
-            records = _read_fallback()
+            resp = jsonify(load_history_since(since, version))
+        resp.set_etag(etag)
+        return resp
+
+    except Exception as e:
+        telemetry.ERRORS.inc(route="history", kind=type(e).__name__)
+        return jsonify({"error": str(e)}), 500
+
 
-        return jsonify(records)
+@app.route("/history/outcome", methods=["POST"])
+def history_outcome():
+    if preprocessor is None:
+        return jsonify({"error": "Models not loaded"}), 503
+
+    try:
+        data = request.get_json(force=True)
+        try:
+            index, outcome = parse_outcome(data)
+            record = stored_record(index)
+            if record is None:
+                return jsonify({"error": f"no stored prediction at index {index}"}), 404
+            entry = build_outcome(index, outcome, record)
+        except schema.ValidationError as e:
+            return jsonify(e.payload()), 400
+        stored_in = store_outcome(entry)
+        if stored_in is None:
+            return jsonify({"error": f"prediction {index} already has an outcome"}), 409
+        return jsonify({**entry, "stored_in": stored_in})
 
     except Exception as e:
+        telemetry.ERRORS.inc(route="history_outcome", kind=type(e).__name__)
         return jsonify({"error": str(e)}), 500
 
+@app.route("/history/timeline")
+def history_timeline():
+    try:
+        params = parse_timeline_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        version = history_version()
+        etag = history_etag(version)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+        resp = jsonify(timeline_payload(version, **params))
+        resp.set_etag(etag)
+        return resp
+
+    except Exception as e:
+        telemetry.ERRORS.inc(route="history_timeline", kind=type(e).__name__)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/history/stream")
+def history_stream():
+    subscriber = events.broadcaster.subscribe(events.Subscriber())
+
+    def generate():
+        try:
+            cursor = history_version()
+            yield events.snapshot_event(load_history(), cursor)
+            while True:
+                message = subscriber.next()
+                if message is None:
+                    return
+                yield message or ": keepalive\n\n"
+        finally:
+            events.broadcaster.unsubscribe(subscriber)
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/monitoring/drift")
+def monitoring_drift():
+    if DRIFT is None:
+        return jsonify({"error": "drift monitoring is off — no drift_reference.json in the served run"}), 503
+    try:
+        return jsonify(drift_payload(request.args.get("window", "recent")))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 @app.route("/health")
 def health():
-    return jsonify({
-        "api": "ok",
-        "models_loaded": list(models.keys()),
-        "frozen_hashes": MODEL_VERSION_INFO,
-        "db": "mongodb_atlas" if USE_DB else "local_json",
+    return jsonify(health_payload())
+
+@app.route("/metrics")
+def metrics():
+    return Response(telemetry.render(), mimetype="text/plain; version=0.0.4")
+
+# ─────────────────────────────────────────────
+# ADMIN — PROFILER (localhost only)
+# ─────────────────────────────────────────────
+LOCAL_ADDRS = {"127.0.0.1", "::1"}
+
+@app.route("/admin/profile", methods=["POST"])
+def admin_profile():
+    """Profile live traffic for ?seconds=N or ?requests=N and return the artifact."""
+    if request.remote_addr not in LOCAL_ADDRS:
+        return jsonify({"error": "profiling is restricted to localhost"}), 403
+
+    try:
+        session = profiling.run_session(
+            mode=request.args.get("mode", "sample"),
+            seconds=request.args.get("seconds", 10, type=float),
+            max_requests=request.args.get("requests", type=int),
+            interval=request.args.get("interval", profiling.DEFAULT_INTERVAL, type=float),
+        )
+    except profiling.ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    body, mimetype, filename = session.artifact(request.args.get("format"))
+    return Response(body, mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename={filename}",
+        "X-Profile-Summary": json.dumps(session.summary()),
     })
 
 # ─────────────────────────────────────────────
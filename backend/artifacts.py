@@ -0,0 +1,133 @@
+"""
+Where the backend reads model files from: a training run's manifest, or
+the loose files in model/.
+
+model/artifacts/ (model/artifact_store.py) keeps every training run as a
+manifest of SHA-256-addressed, compressed blobs. open_run() picks the run
+named by CARDIOSCAN_RUN, else the one in artifacts/CURRENT, and every
+loader (model_store, preprocessing, calibration, the model cards) reads
+its file through the returned source: one blob read and one decompress,
+hashed once and checked against the manifest. Without a store the same
+calls read model/<name> directly, so an untracked checkout still serves.
+
+Rolling back is pointing CURRENT (or CARDIOSCAN_RUN) at an earlier run
+and restarting — blobs are shared, nothing is copied.
+"""
+import functools
+import glob
+import hashlib
+import json
+import os
+import zlib
+
+STORE_DIR = "artifacts"
+RUN = os.environ.get("CARDIOSCAN_RUN") or None
+
+
+class ArtifactError(Exception):
+    pass
+
+
+class LooseFiles:
+    """model/<name> as written by the last training run."""
+    run = None
+
+    def __init__(self, model_dir):
+        self.model_dir = model_dir
+
+    def path(self, name):
+        return os.path.join(self.model_dir, name)
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def stamp(self, name):
+        """Changes whenever the file does (cache key for re-readable files)."""
+        return os.path.getmtime(self.path(name))
+
+    def sha256(self, name):
+        return self.read(name)[1]
+
+    def read(self, name):
+        """(bytes, sha256)."""
+        with open(self.path(name), "rb") as f:
+            raw = f.read()
+        return raw, hashlib.sha256(raw).hexdigest()
+
+    def describe(self):
+        return {"run": None, "source": os.path.normpath(self.model_dir)}
+
+
+class ArtifactRun:
+    """One manifest in model/artifacts/; file names are looked up, never globbed."""
+
+    def __init__(self, store_dir, manifest):
+        self.store_dir = store_dir
+        self.run = manifest["run"]
+        self.created = manifest["created"]
+        self.meta = manifest.get("meta", {})
+        self.files = manifest["files"]
+
+    def path(self, name):
+        sha256 = self.files[name]["sha256"]
+        return os.path.join(self.store_dir, "blobs", sha256[:2], sha256)
+
+    def exists(self, name):
+        return name in self.files
+
+    def stamp(self, name):
+        return self.files[name]["sha256"]
+
+    def sha256(self, name):
+        return self.files[name]["sha256"]
+
+    def read(self, name):
+        entry = self.files.get(name)
+        if entry is None:
+            raise FileNotFoundError(f"{name} is not in run {self.run}")
+        with open(self.path(name), "rb") as f:
+            data = f.read()
+        raw = zlib.decompress(data) if entry["codec"] == "zlib" else data
+        sha256 = hashlib.sha256(raw).hexdigest()
+        if sha256 != entry["sha256"]:
+            raise ArtifactError(f"{name}: blob does not match run {self.run} (got {sha256[:12]})")
+        return raw, sha256
+
+    def describe(self):
+        return {"run": self.run, "created": self.created, "source": os.path.normpath(self.store_dir),
+                "files": len(self.files), **self.meta}
+
+
+@functools.lru_cache(maxsize=None)
+def open_run(model_dir, run=RUN):
+    """The run to serve from `model_dir` — `run`, else CURRENT, else the loose files."""
+    store_dir = os.path.join(model_dir, STORE_DIR)
+    if run is None:
+        current = os.path.join(store_dir, "CURRENT")
+        if not os.path.exists(current):
+            return LooseFiles(model_dir)
+        with open(current) as f:
+            run = f.read().strip()
+    path = os.path.join(store_dir, "manifests", f"{run}.json")
+    if not os.path.exists(path):
+        raise ArtifactError(f"no manifest for run {run!r} in {store_dir}")
+    with open(path) as f:
+        return ArtifactRun(store_dir, json.load(f))
+
+
+def find_file(model_dir, sha256):
+    """(run, name) of the newest stored file whose SHA-256 starts with `sha256`.
+
+    Raises ArtifactError when nothing matches or the prefix names more than one digest."""
+    hits = {}
+    for path in sorted(glob.glob(os.path.join(model_dir, STORE_DIR, "manifests", "*.json"))):
+        with open(path) as f:
+            manifest = json.load(f)
+        for name, entry in manifest["files"].items():
+            if entry["sha256"].startswith(sha256):
+                hits[entry["sha256"]] = (manifest["run"], name)
+    if not hits:
+        raise ArtifactError(f"no stored file with hash {sha256}")
+    if len(hits) > 1:
+        raise ArtifactError(f"hash prefix {sha256} is ambiguous ({len(hits)} files)")
+    return next(iter(hits.values()))
@@ -0,0 +1,530 @@
+"""
+ASGI serving mode for the CardioScan API.
+
+    cd backend
+    uvicorn asgi_app:app --host 127.0.0.1 --port 5000
+
+Exposes the same routes as the Flask app (see ROUTES below) and returns
+byte-identical JSON bodies — both servers build their payloads from the
+shared helpers in app.py, and a malformed JSON body fails with the same
+werkzeug BadRequest message. Differences are in how a request waits:
+
+  * model inference runs on a thread pool sized to the CPU count, so the
+    event loop never blocks on sklearn;
+  * MongoDB I/O goes through PyMongo's native AsyncMongoClient, and the
+    local JSON fallback is read/written off-loop via asyncio.to_thread;
+  * /admin/profile supports mode=sample only: cProfile follows a single
+    thread, and here one event-loop thread interleaves every request.
+"""
+import asyncio
+import json
+import os
+import time
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import BadRequest
+from werkzeug.http import generate_etag, parse_etags, quote_etag
+
+import app as core
+import events
+import profiling
+import schema
+import telemetry
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:     # pymongo < 4.9
+    AsyncMongoClient = None
+
+CPU_POOL = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1, thread_name_prefix="cardioscan-infer"
+)
+
+_async_collection = None
+
+
+# ─────────────────────────────────────────────
+# RESPONSES — match flask.jsonify byte for byte
+# ─────────────────────────────────────────────
+def _encode(payload):
+    return (core.app.json.dumps(payload, separators=(",", ":")) + "\n").encode()
+
+
+async def _send_json(send, payload, status=200, extra_headers=()):
+    body = _encode(payload)
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"access-control-allow-origin", b"*"),
+            *extra_headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _header(scope, name):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _etag_matches(scope, etag):
+    return parse_etags(_header(scope, b"if-none-match")).contains_weak(etag.strip('"'))
+
+
+async def _send_not_modified(send, etag, extra_headers=()):
+    await send({"type": "http.response.start", "status": 304,
+                "headers": [(b"etag", etag.encode()), *extra_headers]})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _send_conditional(scope, send, payload, extra_headers=()):
+    """Same ETag as app.conditional_json; an empty 304 when the client already has it."""
+    body = _encode(payload)
+    etag = quote_etag(generate_etag(body))
+    headers = [(b"etag", etag.encode()), *extra_headers]
+    if _etag_matches(scope, etag):
+        return await _send_not_modified(send, etag, extra_headers)
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"access-control-allow-origin", b"*"),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_text(send, text, content_type, extra_headers=()):
+    body = text if isinstance(text, bytes) else text.encode()
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+            *extra_headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _read_json(receive):
+    """The body as JSON; raises what Flask's request.get_json(force=True) raises."""
+    try:
+        return json.loads(await _read_body(receive))
+    except ValueError as e:
+        raise BadRequest(f"Failed to decode JSON object: {e}")
+
+
+def _query(scope):
+    return {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+
+
+def _arg(query, name, default=None, type=str):
+    """request.args.get(name, default, type=...) — the default when missing or unparsable."""
+    try:
+        return type(query[name])
+    except (KeyError, ValueError):
+        return default
+
+
+# ─────────────────────────────────────────────
+# ASYNC STORAGE
+# ─────────────────────────────────────────────
+async def _store_record(record):
+    if _async_collection is None:
+        return await asyncio.to_thread(core.store_record, record)
+
+    store_start = time.perf_counter()
+    try:
+        await _async_collection.insert_one(record)
+        stored_in = "mongodb_atlas"
+    except Exception:
+        telemetry.ERRORS.inc(route="predict", kind="mongo_insert")
+        await asyncio.to_thread(core._append_fallback, record)
+        stored_in = "local_json"
+    core.record_store_metrics(record, stored_in, time.perf_counter() - store_start)
+    if events.broadcaster.active and stored_in == "mongodb_atlas":
+        core.publish_stored(record, stored_in, await _async_collection.estimated_document_count())
+    return stored_in
+
+
+async def _load_history():
+    if _async_collection is not None:
+        raw = await _async_collection.find({}, {"_id": 0}).to_list()
+        return [core.normalise_record(core.serialize(r)) for r in raw]
+    return await asyncio.to_thread(core.load_history)
+
+
+async def _history_version():
+    if _async_collection is not None:
+        return await _async_collection.estimated_document_count()
+    return await asyncio.to_thread(core.history_version)
+
+
+async def _load_history_since(since, version):
+    if _async_collection is None:
+        return await asyncio.to_thread(core.load_history_since, since, version)
+    query, skip = core.history_query(since)
+    raw = await _async_collection.find(query, {"_id": 0}).skip(skip).to_list()
+    records = [core.normalise_record(core.serialize(r)) for r in raw]
+    return core.history_delta(since, records, version)
+
+
+# ─────────────────────────────────────────────
+# ROUTES
+# ─────────────────────────────────────────────
+async def predict(scope, receive, send):
+    if core.preprocessor is None:
+        return await _send_json(send, {"error": "Models not loaded"}, 503)
+
+    try:
+        with telemetry.timed(telemetry.STAGE_LATENCY, stage="parse"):
+            data = await _read_json(receive)
+
+        if core.batcher is not None:
+            # Await the coalesced batch without parking a pool thread per request
+            model_name = core.resolve_model(data)
+            print(f"[PREDICT] Using model: {model_name} ({core.MODEL_VERSION_INFO[model_name]['sha256']})")
+            features = core.parse_features(data)
+            with telemetry.timed(telemetry.STAGE_LATENCY, stage="batch_wait", model=model_name):
+                pred, prob = await asyncio.wrap_future(core.batcher.submit(model_name, features))
+            record = core.build_record(data, model_name, pred, prob)
+            if core.SHADOW is not None:
+                core.SHADOW.submit(data, features, record)
+        else:
+            loop = asyncio.get_running_loop()
+            record = await loop.run_in_executor(CPU_POOL, core.score_request, data)
+        stored_in = await _store_record(record)
+        await _send_json(send, core.prediction_response(record, stored_in))
+
+    except schema.ValidationError as e:
+        await _send_json(send, e.payload(), 400)
+    except Exception as e:
+        telemetry.ERRORS.inc(route="predict", kind=type(e).__name__)
+        await _send_json(send, {"error": str(e)}, 500)
+
+
+async def predict_ensemble(scope, receive, send):
+    if core.preprocessor is None:
+        return await _send_json(send, {"error": "Models not loaded"}, 503)
+
+    try:
+        with telemetry.timed(telemetry.STAGE_LATENCY, stage="parse"):
+            data = await _read_json(receive)
+
+        loop = asyncio.get_running_loop()
+        try:
+            record, per_model = await loop.run_in_executor(CPU_POOL, core.score_ensemble, data)
+        except schema.ValidationError as e:
+            return await _send_json(send, e.payload(), 400)
+        stored_in = await _store_record(record)
+        await _send_json(send, core.ensemble_response(record, per_model, stored_in))
+
+    except Exception as e:
+        telemetry.ERRORS.inc(route="predict_ensemble", kind=type(e).__name__)
+        await _send_json(send, {"error": str(e)}, 500)
+
+
+async def predict_explain(scope, receive, send):
+    if core.preprocessor is None:
+        return await _send_json(send, {"error": "Models not loaded"}, 503)
+
+    try:
+        data = await _read_json(receive)
+        loop = asyncio.get_running_loop()
+        await _send_json(send, await loop.run_in_executor(CPU_POOL, core.explain_request, data))
+
+    except schema.ValidationError as e:
+        await _send_json(send, e.payload(), 400)
+    except Exception as e:
+        telemetry.ERRORS.inc(route="predict_explain", kind=type(e).__name__)
+        await _send_json(send, {"error": str(e)}, 500)
+
+
+async def predict_batch(scope, receive, send):
+    if core.preprocessor is None:
+        return await _send_json(send, {"error": "Models not loaded"}, 503)
+
+    try:
+        query = _query(scope)
+        model_name = core.resolve_model(query)
+        body = await _read_body(receive)
+        loop = asyncio.get_running_loop()
+        try:
+            with telemetry.timed(telemetry.STAGE_LATENCY, stage="parse"):
+                features = await loop.run_in_executor(CPU_POOL, core.parse_feature_csv, body)
+            result = await loop.run_in_executor(
+                CPU_POOL, core.score_bulk, model_name, features, query.get("encoding"))
+        except schema.ValidationError as e:
+            return await _send_json(send, e.payload(), 400)
+        except (ValueError, UnicodeDecodeError) as e:
+            return await _send_json(send, {"error": str(e)}, 400)
+        await _send_json(send, result)
+
+    except Exception as e:
+        telemetry.ERRORS.inc(route="predict_batch", kind=type(e).__name__)
+        await _send_json(send, {"error": str(e)}, 500)
+
+
+async def history(scope, receive, send):
+    query = parse_qs(scope.get("query_string", b"").decode())
+    try:
+        since = core.parse_since(query.get("since", [None])[0])
+    except ValueError:
+        return await _send_json(
+            send, {"error": "since must be a record cursor or an ISO timestamp"}, 400
+        )
+
+    try:
+        version = await _history_version()
+        etag = quote_etag(core.history_etag(version))
+        if _etag_matches(scope, etag):
+            return await _send_not_modified(send, etag)
+
+        if since is None:
+            payload = await _load_history()
+        else:
+            payload = await _load_history_since(since, version)
+        await _send_json(send, payload, extra_headers=[(b"etag", etag.encode())])
+    except Exception as e:
+        telemetry.ERRORS.inc(route="history", kind=type(e).__name__)
+        await _send_json(send, {"error": str(e)}, 500)
+
+
+async def history_outcome(scope, receive, send):
+    if core.preprocessor is None:
+        return await _send_json(send, {"error": "Models not loaded"}, 503)
+
+    try:
+        data = await _read_json(receive)
+        try:
+            index, outcome = core.parse_outcome(data)
+            record = await asyncio.to_thread(core.stored_record, index)
+            if record is None:
+                return await _send_json(send, {"error": f"no stored prediction at index {index}"}, 404)
+            entry = core.build_outcome(index, outcome, record)
+        except schema.ValidationError as e:
+            return await _send_json(send, e.payload(), 400)
+        stored_in = await asyncio.to_thread(core.store_outcome, entry)
+        if stored_in is None:
+            return await _send_json(send, {"error": f"prediction {index} already has an outcome"}, 409)
+        await _send_json(send, {**entry, "stored_in": stored_in})
+
+    except Exception as e:
+        telemetry.ERRORS.inc(route="history_outcome", kind=type(e).__name__)
+        await _send_json(send, {"error": str(e)}, 500)
+
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def history_timeline(scope, receive, send):
+    query = _query(scope)
+    try:
+        params = core.parse_timeline_args(query)
+    except ValueError as e:
+        return await _send_json(send, {"error": str(e)}, 400)
+
+    try:
+        version = await _history_version()
+        etag = quote_etag(core.history_etag(version))
+        if _etag_matches(scope, etag):
+            return await _send_not_modified(send, etag)
+        payload = await asyncio.get_running_loop().run_in_executor(
+            CPU_POOL, lambda: core.timeline_payload(version, **params)
+        )
+        await _send_json(send, payload, extra_headers=[(b"etag", etag.encode())])
+    except Exception as e:
+        telemetry.ERRORS.inc(route="history_timeline", kind=type(e).__name__)
+        await _send_json(send, {"error": str(e)}, 500)
+
+
+async def history_stream(scope, receive, send):
+    subscriber = events.broadcaster.subscribe(events.AsyncSubscriber(asyncio.get_running_loop()))
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+                (b"access-control-allow-origin", b"*"),
+            ],
+        })
+        cursor = await _history_version()
+        message = events.snapshot_event(await _load_history(), cursor)
+        while message is not None:
+            await send({"type": "http.response.body",
+                        "body": (message or ": keepalive\n\n").encode(), "more_body": True})
+            pending = asyncio.ensure_future(subscriber.next())
+            await asyncio.wait({pending, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                pending.cancel()
+                return
+            message = pending.result()
+        if not disconnected.done():
+            await send({"type": "http.response.body", "body": b""})
+    except OSError:
+        pass    # client went away mid-write
+    finally:
+        events.broadcaster.unsubscribe(subscriber)
+        disconnected.cancel()
+
+
+async def home(scope, receive, send):
+    await _send_json(send, core.home_payload())
+
+
+async def health(scope, receive, send):
+    await _send_json(send, core.health_payload())
+
+
+async def model_info(scope, receive, send):
+    await _send_json(send, core.model_info_payload())
+
+
+async def model_cards(scope, receive, send):
+    await _send_conditional(scope, send, await asyncio.to_thread(core.model_cards_payload),
+                            [(b"cache-control", b"max-age=300")])
+
+
+async def model_card(scope, receive, send):
+    name = scope["path"].rsplit("/", 1)[-1]
+    if name not in core.models:
+        return await _send_json(send, {"error": f"unknown model: {name}"}, 404)
+    try:
+        await _send_conditional(scope, send, await asyncio.to_thread(core.load_model_card, name),
+                                [(b"cache-control", b"max-age=300")])
+    except FileNotFoundError:
+        await _send_json(send, {"error": "model card not found — re-run train_model.py"}, 404)
+
+
+async def monitoring_drift(scope, receive, send):
+    if core.DRIFT is None:
+        return await _send_json(
+            send, {"error": "drift monitoring is off — no drift_reference.json in the served run"}, 503)
+    query = _query(scope)
+    try:
+        await _send_json(send, core.drift_payload(query.get("window", "recent")))
+    except ValueError as e:
+        await _send_json(send, {"error": str(e)}, 400)
+
+
+async def metrics(scope, receive, send):
+    await _send_text(send, telemetry.render(), "text/plain; version=0.0.4")
+
+
+async def admin_profile(scope, receive, send):
+    """Profile live traffic for ?seconds=N or ?requests=N and return the artifact."""
+    if (scope.get("client") or (None,))[0] not in core.LOCAL_ADDRS:
+        return await _send_json(send, {"error": "profiling is restricted to localhost"}, 403)
+
+    query = _query(scope)
+    mode = query.get("mode", "sample")
+    if mode == "cprofile":
+        return await _send_json(
+            send, {"error": "cprofile mode needs the Flask server — use mode=sample under ASGI"}, 400)
+    try:
+        session = await asyncio.to_thread(
+            profiling.run_session,
+            mode=mode,
+            seconds=_arg(query, "seconds", 10, float),
+            max_requests=_arg(query, "requests", type=int),
+            interval=_arg(query, "interval", profiling.DEFAULT_INTERVAL, float),
+        )
+    except profiling.ProfilerBusy as e:
+        return await _send_json(send, {"error": str(e)}, 409)
+    except ValueError as e:
+        return await _send_json(send, {"error": str(e)}, 400)
+
+    body, mimetype, filename = session.artifact(query.get("format"))
+    await _send_text(send, body, f"{mimetype}; charset=utf-8", [
+        (b"content-disposition", f"attachment; filename={filename}".encode()),
+        (b"x-profile-summary", json.dumps(session.summary()).encode()),
+    ])
+
+
+ROUTES = {
+    ("GET", "/"): home,
+    ("POST", "/predict"): predict,
+    ("POST", "/predict/ensemble"): predict_ensemble,
+    ("POST", "/predict/explain"): predict_explain,
+    ("POST", "/predict/batch"): predict_batch,
+    ("GET", "/history"): history,
+    ("POST", "/history/outcome"): history_outcome,
+    ("GET", "/history/timeline"): history_timeline,
+    ("GET", "/history/stream"): history_stream,
+    ("GET", "/health"): health,
+    ("GET", "/model-info"): model_info,
+    ("GET", "/model-cards"): model_cards,
+    ("GET", "/monitoring/drift"): monitoring_drift,
+    ("GET", "/metrics"): metrics,
+    ("POST", "/admin/profile"): admin_profile,
+}
+
+
+# ─────────────────────────────────────────────
+# ASGI ENTRY POINT
+# ─────────────────────────────────────────────
+async def _lifespan(receive, send):
+    global _async_collection
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            if core.USE_DB and AsyncMongoClient is not None:
+                client = AsyncMongoClient(core.MONGO_URI, serverSelectionTimeoutMS=8000)
+                _async_collection = client["heartDB"]["predictions"]
+                print("✔ ASGI mode: async MongoDB client ready")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _async_collection is not None:
+                await _async_collection.database.client.close()
+            CPU_POOL.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    handler = ROUTES.get((scope["method"], scope["path"]))
+    if handler is None and scope["method"] == "GET" and scope["path"].startswith("/model-cards/"):
+        handler = model_card
+    if handler is None:
+        if any(path == scope["path"] for _, path in ROUTES):
+            return await _send_json(send, {"error": "Method not allowed"}, 405)
+        return await _send_json(send, {"error": "Not found"}, 404)
+
+    start = time.perf_counter()
+    session = profiling.active() if handler is not admin_profile else None
+    await handler(scope, receive, send)
+    if session is not None:
+        session.request_finished(None)      # counts toward ?requests=N
+    endpoint = handler.__name__
+    telemetry.REQUEST_LATENCY.observe(time.perf_counter() - start, route=endpoint)
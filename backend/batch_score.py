@@ -0,0 +1,237 @@
+"""
+Offline batch scorer — score a CSV or Parquet file without the API.
+
+    cd backend
+    python batch_score.py patients.csv scored.csv
+    python batch_score.py patients.parquet scored.parquet --model gradient_boosting --workers 8
+
+Input is read CHUNK_ROWS rows at a time (pandas chunked CSV reader /
+pyarrow iter_batches) and must have the 13 FEATURE_KEYS columns; any other
+columns are copied to the output. Each chunk's feature matrix is scored
+in a process pool whose workers load the preprocessing artifact + model
+once (preprocessing.py / model_store.py, from the same training run the
+API serves — artifacts.py, or --run to pin another), and scored chunks are
+written out in input order as they complete — CSV appended, Parquet as
+one row group per chunk under a schema fixed up front (output_schema). At most 2 chunks per worker are in flight, so
+memory stays flat however large the file is.
+
+Categorical codes are read in the --encoding given (encoding.py; the
+default is the one model/preprocessing.json names) and mapped onto the
+training codes, and empty ca/thal cells are filled with the training
+medians, before scoring. Each output row gains probability (calibrated,
+see calibration.py), prediction and risk_category; rows with any other
+missing, non-numeric, out-of-range or undefined-code feature (schema.py)
+are left unscored (empty).
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import artifacts
+import calibration
+import model_store
+import preprocessing
+
+CHUNK_ROWS = 50_000
+RISK_EDGES = [0.3, 0.6]                 # same bands as the API and dashboards
+RISK_LABELS = np.array(["Low", "Moderate", "High"], dtype=object)
+SCORED_FIELDS = [
+    pa.field("probability", pa.float64()),
+    pa.field("prediction", pa.int64()),
+    pa.field("risk_category", pa.string()),
+]
+
+
+def is_parquet(path):
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+# ─────────────────────────────────────────────
+# WORKERS — one preprocessor + model per process
+# ─────────────────────────────────────────────
+_worker = {}
+
+def _init_worker(model_dir, run, model_name, encoding_name, variant):
+    source = artifacts.open_run(model_dir, run)
+    models, info = model_store.load_frozen_models(source, names=[model_name], variant=variant)
+    _worker["preprocessor"], _worker["model"] = preprocessing.load(source), models[model_name]
+    _worker["encoding_name"] = encoding_name
+    table = calibration.load(source)
+    _worker["calibrate"] = table.calibrator(model_name, info[model_name]["variant"]) if table else None
+
+def _score(features):
+    preprocessor = _worker["preprocessor"]
+    features, valid, invalid_fields = preprocessor.prepare_matrix(features, _worker["encoding_name"])
+    _, prediction, probability = model_store.score_matrix(
+        _worker["model"], preprocessor, features, valid, _worker["calibrate"])
+    return valid, prediction, probability, invalid_fields
+
+
+# ─────────────────────────────────────────────
+# STREAMING I/O
+# ─────────────────────────────────────────────
+def read_chunks(path, chunk_rows, dtype=None):
+    if is_parquet(path):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows, dtype=dtype)
+
+
+def output_schema(input_path):
+    """Parquet output schema, fixed before the first chunk: Parquet input columns keep
+    their types, CSV input columns (which carry none) are written as text, and the
+    scored columns are appended (replacing input columns of the same name)."""
+    if is_parquet(input_path):
+        fields = list(pq.ParquetFile(input_path).schema_arrow)
+    else:
+        fields = [pa.field(name, pa.string()) for name in pd.read_csv(input_path, nrows=0).columns]
+    scored = {f.name for f in SCORED_FIELDS}
+    return pa.schema([f for f in fields if f.name not in scored] + SCORED_FIELDS)
+
+
+def feature_matrix(chunk):
+    missing = [k for k in model_store.FEATURE_KEYS if k not in chunk.columns]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+    return np.column_stack([
+        pd.to_numeric(chunk[k], errors="coerce").to_numpy(np.float64) for k in model_store.FEATURE_KEYS
+    ])
+
+
+class ChunkWriter:
+    def __init__(self, path, schema=None):
+        self.path = path
+        self.parquet = is_parquet(path)
+        self.schema = schema
+        self._writer = None
+        self._header = True
+
+    def write(self, frame):
+        if self.parquet:
+            # The declared schema, not the first chunk's: an all-invalid chunk has
+            # all-null scored columns, and CSV passthrough dtypes vary by chunk
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, self.schema)
+            self._writer.write_table(pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False))
+        else:
+            frame.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def scored_frame(chunk, valid, prediction, probability):
+    band = RISK_LABELS[np.searchsorted(RISK_EDGES, np.nan_to_num(probability), side="right")]
+    return chunk.assign(
+        probability=probability,
+        prediction=pd.Series(prediction, index=chunk.index, dtype="Int64").mask(~valid),
+        risk_category=np.where(valid, band, None),
+    )
+
+
+# ─────────────────────────────────────────────
+# MAIN
+# ─────────────────────────────────────────────
+def run(args):
+    stats = {"rows": 0, "scored": 0, "High": 0, "Moderate": 0, "Low": 0, "invalid_fields": {}}
+    parquet_out = is_parquet(args.output)
+    writer = ChunkWriter(args.output, output_schema(args.input) if parquet_out else None)
+    start = time.perf_counter()
+    ctx = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(args.workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(args.model_dir, args.run, args.model, args.encoding, args.variant)) as pool:
+        pending = deque()
+
+        def drain_one():
+            chunk, fut = pending.popleft()
+            valid, prediction, probability, invalid_fields = fut.result()
+            out = scored_frame(chunk, valid, prediction, probability)
+            writer.write(out)
+            stats["rows"] += len(out)
+            stats["scored"] += int(out["probability"].notna().sum())
+            for label, n in out["risk_category"].value_counts().items():
+                stats[label] += int(n)
+            for name, n in invalid_fields.items():
+                stats["invalid_fields"][name] = stats["invalid_fields"].get(name, 0) + n
+            elapsed = time.perf_counter() - start
+            print(f"\r  {stats['rows']:,} rows · {stats['rows'] / elapsed:,.0f} rows/s",
+                  end="", file=sys.stderr, flush=True)
+
+        try:
+            # CSV → Parquet keeps the cells as text, matching output_schema
+            for chunk in read_chunks(args.input, args.chunk_rows, dtype=str if parquet_out else None):
+                features = feature_matrix(chunk)
+                pending.append((chunk, pool.submit(_score, features)))
+                if len(pending) >= 2 * args.workers:
+                    drain_one()
+            while pending:
+                drain_one()
+        finally:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+    return stats, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="CSV or Parquet file with the 13 feature columns")
+    parser.add_argument("output", help="scored CSV or Parquet file (by extension)")
+    parser.add_argument("--model", default="random_forest", choices=sorted(model_store.MODEL_FILES))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--model-dir", default=model_store.MODEL_DIR)
+    parser.add_argument("--run", default=artifacts.RUN,
+                        help="training run id to score with (default: the one model/artifacts/CURRENT names)")
+    parser.add_argument("--variant", default=model_store.VARIANT,
+                        help="full, or a compact tree variant: pruned, quantized, pruned_quantized")
+    parser.add_argument("--encoding", help="categorical input codes, e.g. uci or form "
+                                           "(default: the one model/preprocessing.json names)")
+    args = parser.parse_args()
+    if args.workers < 1 or args.chunk_rows < 1:
+        parser.error("--workers and --chunk-rows must be positive")
+
+    try:
+        source = artifacts.open_run(args.model_dir, args.run)
+    except artifacts.ArtifactError as e:
+        parser.error(str(e))
+    args.run = source.run                # workers load exactly this run, even if CURRENT moves
+    encodings = preprocessing.load(source).encoding
+    args.encoding = args.encoding or encodings.default
+    if args.encoding not in encodings.encodings:
+        parser.error(f"--encoding must be one of {', '.join(sorted(encodings.encodings))}")
+
+    args.variant, file = model_store.model_file(args.model, source, args.variant)
+    model_hash = source.sha256(file)
+    variant = "" if args.variant == "full" else f" {args.variant}"
+    pinned = f", run {source.run}" if source.run else ""
+    print(f"Scoring {args.input} with {args.model}{variant} ({model_hash[:12]}{pinned}) · "
+          f"{args.workers} workers · {args.chunk_rows:,}-row chunks · {args.encoding} codes")
+    try:
+        stats, elapsed = run(args)
+    except (ValueError, FileNotFoundError) as e:
+        sys.exit(f"✘ {e}")
+
+    print(f"✔ {stats['rows']:,} rows in {elapsed:.1f} s ({stats['rows'] / max(elapsed, 1e-9):,.0f} rows/s) → {args.output}")
+    print(f"   scored {stats['scored']:,} · skipped {stats['rows'] - stats['scored']:,} invalid")
+    if stats["invalid_fields"]:
+        print("   invalid values: " + ", ".join(f"{k} {n:,}" for k, n in stats["invalid_fields"].items()))
+    print(f"   High {stats['High']:,} · Moderate {stats['Moderate']:,} · Low {stats['Low']:,}")
+
+
+if __name__ == "__main__":
+    main()
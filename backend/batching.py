@@ -0,0 +1,93 @@
+"""
+Dynamic micro-batching for single-row /predict traffic.
+
+Requests for the same model are queued; one dispatcher thread per model
+takes the first waiting row, keeps collecting until either `max_batch`
+rows are queued or `max_wait` seconds have passed, then runs a single
+preprocessor.transform + predict_proba on the stacked batch and resolves each
+caller's Future with its own (prediction, probability).
+
+Opt in with CARDIOSCAN_BATCHING=1; tune with CARDIOSCAN_BATCH_MAX_WAIT_MS
+(default 2) and CARDIOSCAN_BATCH_MAX_SIZE (default 32).
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import telemetry
+
+ENABLED = os.environ.get("CARDIOSCAN_BATCHING", "0") == "1"
+MAX_WAIT = float(os.environ.get("CARDIOSCAN_BATCH_MAX_WAIT_MS", "2")) / 1000.0
+MAX_BATCH = int(os.environ.get("CARDIOSCAN_BATCH_MAX_SIZE", "32"))
+
+BATCH_SIZE = telemetry.histogram(
+    "cardioscan_batch_size", "Rows per coalesced predict_proba call, by model.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+QUEUE_WAIT = telemetry.histogram(
+    "cardioscan_batch_queue_seconds", "Time a row waited in the batching queue, by model."
+)
+
+
+class MicroBatcher:
+    def __init__(self, models, preprocessor, max_wait=MAX_WAIT, max_batch=MAX_BATCH):
+        self.models = models
+        self.preprocessor = preprocessor
+        self.max_wait = max_wait
+        self.max_batch = max(1, max_batch)
+        self._queues = {}
+        for name in models:
+            q = queue.SimpleQueue()
+            self._queues[name] = q
+            threading.Thread(
+                target=self._dispatch, args=(name, q),
+                name=f"cardioscan-batch-{name}", daemon=True,
+            ).start()
+
+    def submit(self, model_name, features):
+        """Queue one raw feature row; the Future resolves to (prediction, probability)."""
+        fut = Future()
+        self._queues[model_name].put((features, fut, time.perf_counter()))
+        return fut
+
+    def _collect(self, q):
+        batch = [q.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch(self, name, q):
+        model = self.models[name]
+        stage = telemetry.STAGE_LATENCY
+        while True:
+            batch = self._collect(q)
+            now = time.perf_counter()
+            for _, _, queued_at in batch:
+                QUEUE_WAIT.observe(now - queued_at, model=name)
+            BATCH_SIZE.observe(len(batch), model=name)
+
+            try:
+                X = np.vstack([row for row, _, _ in batch])
+                with telemetry.timed(stage, stage="scale", model=name):
+                    X_scaled = self.preprocessor.transform(X)
+                with telemetry.timed(stage, stage="predict_proba", model=name):
+                    proba = model.predict_proba(X_scaled)
+                preds = model.classes_.take(np.argmax(proba, axis=1))
+            except Exception as e:
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                continue
+
+            for i, (_, fut, _) in enumerate(batch):
+                fut.set_result((int(preds[i]), float(proba[i, 1])))
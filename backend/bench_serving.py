@@ -0,0 +1,98 @@
+"""
+Concurrency-scaling benchmark for the CardioScan API.
+
+Start a server first, then point this at it:
+
+    # WSGI (Flask behind gunicorn, 1 worker / N threads)
+    gunicorn -w 1 --threads 8 -b 127.0.0.1:5000 app:app
+    # ASGI
+    uvicorn asgi_app:app --host 127.0.0.1 --port 5001
+
+    python bench_serving.py --url http://127.0.0.1:5000 --levels 1 2 4 8 16 32
+    python bench_serving.py --url http://127.0.0.1:5001 --levels 1 2 4 8 16 32
+
+Each level keeps `concurrency` requests in flight for --seconds and reports
+throughput plus p50/p95/p99 latency. Note that POST /predict writes every
+request to the prediction store; use --route /health for a read-only run.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import requests
+
+SAMPLE_PATIENT = {
+    "age": 54, "sex": 1, "cp": 2, "trestbps": 130, "chol": 246,
+    "fbs": 0, "restecg": 1, "thalach": 150, "exang": 0,
+    "oldpeak": 1.0, "slope": 1, "ca": 0, "thal": 3,
+    "model": "random_forest",
+}
+
+
+def _worker(url, route, deadline, latencies, errors):
+    session = requests.Session()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if route == "/predict":
+                resp = session.post(url + route, json=SAMPLE_PATIENT, timeout=30)
+            else:
+                resp = session.get(url + route, timeout=30)
+            if resp.status_code != 200:
+                errors.append(resp.status_code)
+                continue
+        except requests.RequestException as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run_level(url, route, concurrency, seconds):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=_worker, args=(url, route, deadline, latencies, errors))
+        for _ in range(concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if not latencies:
+        return {"concurrency": concurrency, "rps": 0.0, "errors": len(errors)}
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "concurrency": concurrency,
+        "rps": len(latencies) / seconds,
+        "p50_ms": q[49] * 1000,
+        "p95_ms": q[94] * 1000,
+        "p99_ms": q[98] * 1000,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--route", default="/predict")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.url}{args.route}")
+    print(f"{'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    base_rps = None
+    for level in args.levels:
+        r = run_level(args.url, args.route, level, args.seconds)
+        if not r["rps"]:
+            print(f"{level:>5} {'-':>9} {'-':>9} {'-':>9} {'-':>9} {r['errors']:>7}")
+            continue
+        base_rps = base_rps or r["rps"]
+        print(f"{level:>5} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['errors']:>7}   x{r['rps'] / base_rps:.2f}")
+
+
+if __name__ == "__main__":
+    main()
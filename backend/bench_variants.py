@@ -0,0 +1,78 @@
+"""
+Footprint / accuracy / latency of every served model variant, side by side.
+
+    cd backend
+    python bench_variants.py
+    python bench_variants.py --rows 10000 --repeat 300
+
+For each tree model and each variant in model/variants/ (plus the full
+pickle) this prints the file size, node count, the held-out accuracy and
+ROC-AUC deltas recorded at export (model/variants/report.json), and the
+measured predict_proba latency: median over --repeat single rows, the
+way /predict calls it, and rows/s on one --rows batch, the way
+/predict/batch and batch_score.py call it. Rows are heart.csv patients
+run through the served preprocessing.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import artifacts
+import model_store
+import preprocessing
+
+VARIANTS = ["full", "pruned", "quantized", "pruned_quantized"]
+
+
+def sample_rows(n, model_dir):
+    df = pd.read_csv(os.path.join(model_dir, "heart.csv"), header=None,
+                     names=model_store.FEATURE_KEYS + ["target"], na_values="?")
+    raw = df[model_store.FEATURE_KEYS].sample(n, replace=True, random_state=0).to_numpy(np.float64)
+    prep = preprocessing.load(artifacts.open_run(model_dir))
+    rows, valid, _ = prep.prepare_matrix(raw, "uci")
+    return prep.transform(rows[valid])
+
+
+def time_model(model, X, repeat):
+    single = []
+    for i in range(repeat):
+        row = X[i % len(X)][None, :]
+        start = time.perf_counter()
+        model.predict_proba(row)
+        single.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    model.predict_proba(X)
+    return float(np.median(single)), len(X) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10000, help="batch size for the throughput run")
+    parser.add_argument("--repeat", type=int, default=200, help="single-row calls per variant")
+    parser.add_argument("--model-dir", default=model_store.MODEL_DIR)
+    args = parser.parse_args()
+
+    source = artifacts.open_run(args.model_dir)
+    report = json.loads(source.read("variants/report.json")[0])["models"]
+    X = sample_rows(args.rows, args.model_dir)
+
+    print(f"{'model':<20}{'variant':<18}{'size':>10}{'nodes':>8}{'Δ acc':>9}{'Δ auc':>9}"
+          f"{'1-row p50':>12}{'batch':>14}")
+    for name, entry in report.items():
+        for variant in VARIANTS:
+            if variant not in entry:
+                continue
+            model, _ = model_store.load_frozen_model(name, source, variant)
+            p50, rate = time_model(model, X, args.repeat)
+            r = entry[variant]
+            print(f"{name:<20}{variant:<18}{r['bytes'] / 1024:>8.1f}KB{r['nodes']:>8}"
+                  f"{r.get('accuracy_delta', 0):>+9.4f}{r.get('roc_auc_delta', 0):>+9.4f}"
+                  f"{p50 * 1e6:>10.0f}µs{rate:>10,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
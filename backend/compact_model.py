@@ -0,0 +1,70 @@
+"""
+Numpy scorer for the compact tree-ensemble variants (model/model_variants.py).
+
+A variant .npz holds every tree of a forest or boosting model as flat
+preorder arrays — split feature (int8, -1 for a leaf), threshold or leaf
+value (float32, or float16 when quantized) and right-child index (left is
+always the next node). CompactEnsemble walks all trees for all rows at
+once: one gather + compare + select per tree level, `depth` steps in
+total, with no Python loop over trees or rows. It exposes the sklearn
+surface the backend uses (predict_proba, classes_, n_features_in_), so
+model_store can hand it to every scoring path in place of the pickle.
+
+Inputs are compared as float32, like sklearn's trees, so an unquantized
+variant reproduces the pickle's routing exactly.
+"""
+import numpy as np
+
+
+class CompactEnsemble:
+    classes_ = np.array([0, 1])
+
+    def __init__(self, arrays):
+        self.kind = str(arrays["kind"])
+        self.n_features_in_ = int(arrays["n_features"])
+        self.depth = int(arrays["depth"])
+        self.feature = arrays["feature"].astype(np.intp)
+        self.is_leaf = self.feature < 0
+        self.feature[self.is_leaf] = 0                   # any column; leaves never compare
+        self.value = arrays["value"].astype(np.float32)
+        self.right = arrays["right"].astype(np.intp)
+        self.roots = arrays["roots"].astype(np.intp)
+        if self.kind == "gradient_boosting":
+            self.learning_rate = float(arrays["learning_rate"])
+            self.init = float(arrays["init"])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(dict(arrays))
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.value, self.right, self.roots))
+
+    def leaf_values(self, X):
+        """(n, trees) leaf value each row reaches in each tree."""
+        X32 = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X32))[:, None]
+        node = np.broadcast_to(self.roots, (len(X32), self.n_trees)).copy()
+        for _ in range(self.depth):
+            go_left = X32[rows, self.feature[node]] <= self.value[node]
+            step = np.where(go_left, node + 1, self.right[node])
+            node = np.where(self.is_leaf[node], node, step)
+        return self.value[node].astype(np.float64)
+
+    def predict_proba(self, X):
+        leaves = self.leaf_values(X)
+        if self.kind == "gradient_boosting":
+            raw = self.init + self.learning_rate * leaves.sum(axis=1)
+            positive = 1.0 / (1.0 + np.exp(-raw))
+        else:
+            positive = leaves.mean(axis=1)
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -0,0 +1,74 @@
+"""
+Point-count reduction for time-series charts.
+
+Both functions take x (sorted, numeric — epoch ms for timelines) and y
+arrays and return the *indices* of the points to keep, so any other
+column sampled at the same rows (a rolling mean, a label) stays aligned.
+The first and last points are always kept.
+
+  lttb    Largest-Triangle-Three-Buckets: one point per bucket, chosen to
+          maximise the triangle it forms with the previously kept point
+          and the next bucket's mean. Preserves the visual shape of a
+          line chart at roughly one point per pixel.
+  minmax  The lowest and highest point of each equal-count bucket, in x
+          order. Never hides an outlier; returns up to 2 points per bucket.
+"""
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb(x, y, n_out):
+    n = len(x)
+    n_out = max(n_out, 3)
+    if n_out >= n:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    # Next-bucket means for every bucket at once; the last bucket looks at the final point
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        cx, cy = mean_x[b + 1], mean_y[b + 1]
+        # Twice the triangle area (a, candidate, next-bucket mean); the constant factor is irrelevant
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[b + 1] = a
+    return keep
+
+
+def minmax(x, y, n_out):
+    n = len(x)
+    n_out = max(n_out, 4)
+    if n_out >= n:
+        return np.arange(n)
+
+    inner = np.asarray(y, dtype=np.float64)[1:n - 1]
+    n_buckets = (n_out - 2) // 2
+    bucket = np.arange(n - 2) * n_buckets // (n - 2)
+    starts = np.searchsorted(bucket, np.arange(n_buckets))
+    picked = [[0], [n - 1]]
+    for extreme in (np.minimum, np.maximum):
+        # First row in each bucket that equals the bucket's extreme
+        hits = np.flatnonzero(inner == extreme.reduceat(inner, starts)[bucket])
+        first = np.ones(len(hits), dtype=bool)
+        first[1:] = bucket[hits[1:]] != bucket[hits[:-1]]
+        picked.append(hits[first] + 1)
+    return np.unique(np.concatenate(picked))
+
+
+def downsample(x, y, n_out, method="lttb"):
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    return lttb(x, y, n_out) if method == "lttb" else minmax(x, y, n_out)
@@ -0,0 +1,179 @@
+"""
+Drift and data-quality monitoring over the live prediction stream.
+
+model/drift_reference.json (model/drift_spec.py) gives, per feature, bin
+edges and the share of heart.csv rows in each bin. DriftMonitor keeps a
+histogram per feature over the same bins and adds every scored request
+to it. That is one compare against a (13, bins) edge table plus one
+indexed increment, so the cost per request does not depend on how much
+history has been stored. Counts are kept twice:
+
+    all     every prediction since startup (seeded from the stored history)
+    recent  a ring of WINDOW_BLOCKS blocks of BLOCK_ROWS predictions each,
+            so the oldest block drops out as a new one starts
+
+report() turns either into per-feature drift scores against the reference:
+
+    psi  population stability index, sum((live - ref) * ln(live / ref))
+         over the bins; < 0.1 stable, 0.1-0.25 moderate, > 0.25 drift
+    ks   largest gap between the live and reference CDFs at the bin
+         edges (the binned Kolmogorov-Smirnov statistic)
+
+Data quality is tracked alongside: how often each optional field was left
+out and imputed, and how many requests schema.py rejected, per field.
+CARDIOSCAN_DRIFT=0 turns the monitor off.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+import artifacts
+from model_store import FEATURE_KEYS, MODEL_DIR
+
+ENABLED = os.environ.get("CARDIOSCAN_DRIFT", "1") != "0"
+DRIFT_FILE = "drift_reference.json"
+BLOCK_ROWS = int(os.environ.get("CARDIOSCAN_DRIFT_BLOCK_ROWS", "250"))
+WINDOW_BLOCKS = 8
+MIN_ROWS = 50
+PSI_BANDS = (0.1, 0.25)
+STATUSES = ("insufficient_data", "stable", "moderate", "drift")
+EPS = 1e-4                    # floor for empty bins, so ln() stays finite
+
+
+def psi_status(psi, rows):
+    if rows < MIN_ROWS:
+        return "insufficient_data"
+    if psi < PSI_BANDS[0]:
+        return "stable"
+    return "moderate" if psi < PSI_BANDS[1] else "drift"
+
+
+class DriftMonitor:
+    def __init__(self, spec, optional, sha256=None):
+        features = spec["features"]
+        if list(features) != FEATURE_KEYS:
+            raise ValueError("drift reference does not match the model's feature order")
+        self.version = spec["version"]
+        self.sha256 = sha256
+        self.reference_rows = spec["rows"]
+        self.kinds = [f["kind"] for f in features.values()]
+        self.codes = [f.get("codes") for f in features.values()]
+        self.n_bins = np.array([len(f["reference"]) for f in features.values()])
+
+        # Ragged edges padded with +inf, which no value exceeds
+        width = int(self.n_bins.max())
+        self.edges = np.full((len(FEATURE_KEYS), width - 1), np.inf)
+        self.reference = np.zeros((len(FEATURE_KEYS), width))
+        for i, f in enumerate(features.values()):
+            self.edges[i, :len(f["edges"])] = f["edges"]
+            self.reference[i, :len(f["reference"])] = f["reference"]
+
+        self._features = np.arange(len(FEATURE_KEYS))
+        self.total = np.zeros((len(FEATURE_KEYS), width), dtype=np.int64)
+        self.blocks = np.zeros((WINDOW_BLOCKS, len(FEATURE_KEYS), width), dtype=np.int64)
+        self.block = 0
+        self.block_rows = 0
+        self.rows = 0
+
+        self.optional = list(optional)
+        self.imputed = np.zeros(len(self.optional), dtype=np.int64)
+        self.rejected = 0
+        self.rejected_fields = {}
+        self._lock = threading.Lock()
+
+    # ── updates ─────────────────────────────────
+    def _roll(self):
+        self.block = (self.block + 1) % WINDOW_BLOCKS
+        self.blocks[self.block] = 0
+        self.block_rows = 0
+
+    def observe(self, row, imputed=None):
+        """Add one (1, 13) row in training codes; `imputed` flags the optional fields left out."""
+        bins = (row[0][:, None] > self.edges).sum(axis=1)
+        with self._lock:
+            self.total[self._features, bins] += 1
+            self.blocks[self.block, self._features, bins] += 1
+            if imputed is not None:
+                self.imputed += imputed
+            self.rows += 1
+            self.block_rows += 1
+            if self.block_rows == BLOCK_ROWS:
+                self._roll()
+
+    def observe_matrix(self, rows, imputed=None):
+        """observe() for every row of an (n, 13) matrix, in order — for seeding from history."""
+        bins = (rows[:, :, None] > self.edges).sum(axis=2)
+        features = np.broadcast_to(self._features, bins.shape)
+        with self._lock:
+            np.add.at(self.total, (features, bins), 1)
+            if imputed is not None:
+                self.imputed += imputed.sum(axis=0)
+            self.rows += len(rows)
+            start = 0
+            while start < len(rows):
+                stop = start + min(BLOCK_ROWS - self.block_rows, len(rows) - start)
+                np.add.at(self.blocks[self.block], (features[start:stop], bins[start:stop]), 1)
+                self.block_rows += stop - start
+                if self.block_rows == BLOCK_ROWS:
+                    self._roll()
+                start = stop
+
+    def reject(self, fields):
+        with self._lock:
+            self.rejected += 1
+            for name in fields:
+                self.rejected_fields[name] = self.rejected_fields.get(name, 0) + 1
+
+    # ── report ──────────────────────────────────
+    def report(self, window="recent"):
+        with self._lock:
+            counts = self.blocks.sum(axis=0) if window == "recent" else self.total.copy()
+            imputed = self.imputed.tolist()
+            rows, rejected, rejected_fields = self.rows, self.rejected, dict(self.rejected_fields)
+
+        n = int(counts[0].sum())
+        live = counts / max(n, 1)
+        live_s, ref_s = np.maximum(live, EPS), np.maximum(self.reference, EPS)
+        psi = ((live_s - ref_s) * np.log(live_s / ref_s)).sum(axis=1)
+        ks = np.abs(np.cumsum(live, axis=1) - np.cumsum(self.reference, axis=1)).max(axis=1)
+
+        features = {}
+        for i, name in enumerate(FEATURE_KEYS):
+            nb = self.n_bins[i]
+            # Padding bins are empty on both sides, so they add exactly 0 to psi
+            features[name] = {
+                "kind": self.kinds[i],
+                "psi": round(float(psi[i]), 4),
+                "ks": round(float(ks[i]), 4),
+                "status": psi_status(psi[i], n),
+                "edges": self.edges[i, :nb - 1].tolist(),
+                "codes": self.codes[i],
+                "reference": np.round(self.reference[i, :nb], 4).tolist(),
+                "live": np.round(live[i, :nb], 4).tolist(),
+            }
+        return {
+            "window": window,
+            "rows": n,
+            "window_rows": BLOCK_ROWS * WINDOW_BLOCKS if window == "recent" else None,
+            "min_rows": MIN_ROWS,
+            "status": max((f["status"] for f in features.values()), key=STATUSES.index),
+            "reference": {"version": self.version, "sha256": self.sha256, "rows": self.reference_rows},
+            "features": features,
+            "data_quality": {
+                "predictions": rows,
+                "imputed": dict(zip(self.optional, imputed)),
+                "rejected_requests": rejected,
+                "rejected_fields": rejected_fields,
+            },
+        }
+
+
+def load(source=None, optional=()):
+    """The monitor for the served run's reference, or None (off, or no reference file)."""
+    source = source or artifacts.open_run(MODEL_DIR)
+    if not ENABLED or not source.exists(DRIFT_FILE):
+        return None
+    raw, sha256 = source.read(DRIFT_FILE)
+    return DriftMonitor(json.loads(raw), optional, sha256)
@@ -0,0 +1,168 @@
+"""
+Server-Sent Events fan-out for GET /history/stream.
+
+Every record that lands in the history store is pushed to each connected
+client as two events:
+
+    event: prediction   id: <cursor>   data: {"cursor": N, "record": {...}}
+    event: rollup                      data: {"total": 1, "risk": {...}, ...}
+
+`cursor` is the same record count /history?since= uses, so a client that
+sees a gap simply fetches the delta. On connect the stream opens with a
+`snapshot` event (current cursor + full rollup). Each client has a bounded
+queue; one that falls QUEUE_SIZE messages behind is disconnected and is
+expected to reconnect and resync.
+
+Fan-out is per process: with several gunicorn workers a client only sees
+predictions served by the worker it is connected to (the ASGI server and
+a single-worker Flask app see everything).
+"""
+import asyncio
+import json
+import queue
+import threading
+
+import telemetry
+
+QUEUE_SIZE = 256
+KEEPALIVE = 15.0
+
+# Same bands as the dashboards: Low < 0.3 <= Moderate < 0.6 <= High
+RISK_BANDS = ((0.3, "Low"), (0.6, "Moderate"), (float("inf"), "High"))
+
+MESSAGES = telemetry.counter(
+    "cardioscan_sse_messages_total", "Server-sent event messages queued to clients, by event."
+)
+
+
+def risk_band(probability):
+    for upper, label in RISK_BANDS:
+        if probability < upper:
+            return label
+
+
+# ─────────────────────────────────────────────
+# ROLLUPS
+# ─────────────────────────────────────────────
+def rollup_delta(record):
+    return {
+        "total": 1,
+        "probability_sum": record["probability"],
+        "risk": {risk_band(record["probability"]): 1},
+        "model": {record.get("model_used", "unknown"): 1},
+    }
+
+
+def rollup(records):
+    out = {"total": 0, "probability_sum": 0.0,
+           "risk": {label: 0 for _, label in RISK_BANDS}, "model": {}}
+    for r in records:
+        out["total"] += 1
+        out["probability_sum"] += r["probability"]
+        out["risk"][risk_band(r["probability"])] += 1
+        model = r.get("model_used", "unknown")
+        out["model"][model] = out["model"].get(model, 0) + 1
+    return out
+
+
+def format_event(event, data, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+# ─────────────────────────────────────────────
+# SUBSCRIBERS
+# ─────────────────────────────────────────────
+class Subscriber:
+    """A client served by a WSGI thread."""
+
+    def __init__(self, maxsize=QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize)
+        self.closed = False
+
+    def offer(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.closed = True
+
+    def next(self, timeout=KEEPALIVE):
+        """Next message; "" on timeout (send a keepalive), None once closed."""
+        if self.closed:
+            return None
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None if self.closed else ""
+
+
+class AsyncSubscriber:
+    """A client served by the ASGI event loop; offers arrive from worker threads."""
+
+    def __init__(self, loop, maxsize=QUEUE_SIZE):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.closed = False
+
+    def offer(self, message):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.closed = True
+
+    async def next(self, timeout=KEEPALIVE):
+        if self.closed:
+            return None
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None if self.closed else ""
+
+
+class Broadcaster:
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return bool(self._subscribers)
+
+    def subscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.offer(message)
+            except RuntimeError:    # its event loop has already shut down
+                self.unsubscribe(sub)
+
+
+broadcaster = Broadcaster()
+
+
+def publish_prediction(record, cursor):
+    """Queue the prediction + rollup events for every connected client."""
+    if not broadcaster.active:
+        return
+    message = (format_event("prediction", {"cursor": cursor, "record": record}, event_id=cursor)
+               + format_event("rollup", rollup_delta(record)))
+    broadcaster.publish(message)
+    MESSAGES.inc(event="prediction")
+
+
+def snapshot_event(records, cursor):
+    MESSAGES.inc(event="snapshot")
+    return format_event("snapshot", {"cursor": cursor, "rollup": rollup(records)}, event_id=cursor)
@@ -0,0 +1,242 @@
+"""
+Per-prediction feature attributions for the frozen models.
+
+Tree ensembles (random forest, gradient boosting) use exact path-dependent
+TreeSHAP. Every tree is flattened once into per-leaf tables:
+
+    z[l, f]   product of cover fractions for splits on feature f on the
+              path to leaf l (1 where f is not on the path)
+    present   whether feature f appears on that path at all
+    steps     the (feature, threshold, went_left) conditions on the path
+
+For a patient x, o[l, f] is 1 when x satisfies every split on f along the
+path, else 0. A leaf's weight under "features in S are known" is
+prod_{f in S} o_f * prod_{f not in S} z_f, so its Shapley contribution to
+feature i is
+
+    v_l * (o_i - z_i) * sum_k Q_i[k] * k! (m-1-k)! / m!
+
+where m is the number of distinct path features and Q_i is the polynomial
+prod_{f != i} (z_f + o_f t). All leaves of all trees are handled at once
+with array ops — one polynomial build over the 13 features, one
+vectorised deflation per feature — so cost is O(leaves * F^2) NumPy work
+rather than a Python walk per tree.
+
+Logistic regression uses the closed form coef_i * (x_i - mean_i), with a
+zero mean because inputs are already standardised.
+
+Random forest attributions are in probability space (it averages leaf
+class fractions); gradient boosting and logistic regression are in
+log-odds space, which is where their outputs are additive.
+"""
+import threading
+from collections import OrderedDict
+from math import factorial
+
+import numpy as np
+
+import telemetry
+
+CACHE_SIZE = 4096
+
+
+# ─────────────────────────────────────────────
+# TREE FLATTENING
+# ─────────────────────────────────────────────
+def _flatten_tree(tree, n_features, value_fn):
+    """Return per-leaf arrays (value, z, present, step_feat, step_thr, step_left)."""
+    t = tree.tree_
+    cover = t.weighted_n_node_samples
+    leaves = []
+
+    stack = [(0, np.ones(n_features), np.zeros(n_features, bool), [])]
+    while stack:
+        node, z, present, steps = stack.pop()
+        left, right = t.children_left[node], t.children_right[node]
+        if left == -1:
+            leaves.append((value_fn(t.value[node]), z, present, steps))
+            continue
+        f, thr = t.feature[node], t.threshold[node]
+        for child, went_left in ((left, True), (right, False)):
+            z_child = z.copy()
+            z_child[f] *= cover[child] / cover[node]
+            p_child = present.copy()
+            p_child[f] = True
+            stack.append((child, z_child, p_child, steps + [(f, thr, went_left)]))
+    return leaves
+
+
+class LeafTable:
+    """All leaves of a tree ensemble, stacked for vectorised TreeSHAP."""
+
+    def __init__(self, trees, n_features, value_fn, tree_scale):
+        rows = []
+        for tree in trees:
+            rows.extend(_flatten_tree(tree, n_features, value_fn))
+
+        depth = max(len(steps) for *_, steps in rows)
+        L = len(rows)
+        self.n_features = n_features
+        self.value = np.array([r[0] for r in rows]) * tree_scale
+        self.z = np.array([r[1] for r in rows])
+        self.present = np.array([r[2] for r in rows])
+        self.m = self.present.sum(axis=1)
+
+        feat = np.zeros((L, depth), dtype=np.intp)
+        thr = np.zeros((L, depth), dtype=np.float64)
+        went_left = np.zeros((L, depth), dtype=bool)
+        valid = np.zeros((L, depth), dtype=bool)
+        for i, (*_, steps) in enumerate(rows):
+            for j, (f, t, lft) in enumerate(steps):
+                feat[i, j], thr[i, j], went_left[i, j], valid[i, j] = f, t, lft, True
+        # Only real path steps are kept, flattened; step_slot indexes (leaf, feature)
+        self.step_feat = feat[valid]
+        self.step_thr = thr[valid]
+        self.step_left = went_left[valid]
+        self.step_slot = (np.nonzero(valid)[0] * n_features + self.step_feat)
+
+        # E[f(X)] with nothing known: every leaf weighted by its cover product
+        self.expected = float((self.value * self.z.prod(axis=1)).sum())
+
+        # Shapley weights W[k, m] = k! (m-1-k)! / m!
+        F = n_features
+        self.weights = np.zeros((F + 1, F + 1))
+        for m in range(1, F + 1):
+            for k in range(m):
+                self.weights[k, m] = factorial(k) * factorial(m - 1 - k) / factorial(m)
+
+    def shap_values(self, x):
+        """Exact path-dependent TreeSHAP for one (already scaled) row."""
+        F = self.n_features
+        L = len(self.value)
+        # Trees split on float32 inputs: x <= threshold goes left
+        x32 = x.astype(np.float32).astype(np.float64)
+        failed = (x32[self.step_feat] <= self.step_thr) != self.step_left
+        n_failed = np.bincount(self.step_slot[failed], minlength=L * F).reshape(L, F)
+        o = ((n_failed == 0) & self.present).astype(float)
+        z = self.z
+
+        # P(t) = prod_f (z_f + o_f t), coefficient-major (F+1, L);
+        # absent features have z=1, o=0 so their factor is 1
+        P = np.zeros((F + 1, L))
+        P[0] = 1.0
+        for f in range(F):
+            zf, of = z[:, f], o[:, f]
+            P[1:] = zf * P[1:] + of * P[:-1]
+            P[0] *= zf
+
+        # S_i = sum_k Q_i[k] W[k, m] with Q_i(t) = P(t) / (z_i + o_i t)
+        W = self.weights[:, self.m]                      # (F+1, L)
+        # o_i == 0: Q_i = P / z_i
+        S_zero = (P * W).sum(axis=0)[:, None] / z
+        # o_i == 1: deflate by (z_i + t) from the top coefficient down
+        S_one = np.zeros((L, F))
+        q = np.zeros((L, F))
+        for k in range(F, 0, -1):
+            q = P[k][:, None] - z * q
+            S_one += q * W[k - 1][:, None]
+        S = np.where(o == 1.0, S_one, S_zero)
+
+        phi = self.value[:, None] * (o - z) * S * self.present
+        return phi.sum(axis=0)
+
+    def predict(self, x):
+        """Ensemble output for one row: the sum of the leaves it reaches."""
+        x32 = x.astype(np.float32).astype(np.float64)
+        failed = (x32[self.step_feat] <= self.step_thr) != self.step_left
+        leaf_failed = np.bincount(self.step_slot[failed] // self.n_features,
+                                  minlength=len(self.value))
+        return float(self.value[leaf_failed == 0].sum())
+
+
+# ─────────────────────────────────────────────
+# MODEL ADAPTERS
+# ─────────────────────────────────────────────
+def _positive_fraction(value):
+    row = value[0]
+    return row[1] / row.sum()
+
+
+def _regression_value(value):
+    return value[0, 0]
+
+
+class Explainer:
+    def __init__(self, model, n_features):
+        self.model = model
+        self.kind = None
+        self.table = None
+
+        if hasattr(model, "estimators_") and hasattr(model, "learning_rate"):
+            # Gradient boosting: raw = init + lr * sum(tree outputs), in log-odds
+            trees = [est[0] for est in model.estimators_]
+            self.table = LeafTable(trees, n_features, _regression_value, model.learning_rate)
+            self.kind = "gradient_boosting"
+            self.output_space = "log_odds"
+            # The init estimator (class prior) is constant, so recover it once
+            x0 = np.zeros((1, n_features))
+            self.init_raw = float(model.decision_function(x0)[0]) - self.table.predict(x0[0])
+        elif hasattr(model, "estimators_"):
+            trees = model.estimators_
+            self.table = LeafTable(trees, n_features, _positive_fraction, 1.0 / len(trees))
+            self.kind = "random_forest"
+            self.output_space = "probability"
+        elif hasattr(model, "coef_"):
+            self.kind = "linear"
+            self.output_space = "log_odds"
+        else:
+            raise TypeError(f"no explainer for {type(model).__name__}")
+
+    def explain(self, x_scaled):
+        """Return (base_value, contributions) with base + sum(contribs) == model output."""
+        if self.kind == "linear":
+            coef = self.model.coef_[0]
+            return float(self.model.intercept_[0]), coef * x_scaled[0]
+
+        phi = self.table.shap_values(x_scaled[0])
+        base = self.table.expected
+        if self.kind == "gradient_boosting":
+            base += self.init_raw
+        return base, phi
+
+
+# ─────────────────────────────────────────────
+# CACHED ENTRY POINT
+# ─────────────────────────────────────────────
+_explainers = {}
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_explainer(model_hash, model, n_features):
+    with _lock:
+        explainer = _explainers.get(model_hash)
+    if explainer is None:
+        explainer = Explainer(model, n_features)
+        with _lock:
+            _explainers[model_hash] = explainer
+    return explainer
+
+
+def explain(model_hash, model, features, scale):
+    """Attributions for one raw row, memoised on (model hash, raw feature vector).
+
+    `scale` maps the raw row to model inputs; it is only called on a cache miss.
+    """
+    key = (model_hash, features.tobytes())
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+    telemetry.record_cache("explain", hit is not None)
+    if hit is not None:
+        return hit
+
+    explainer = get_explainer(model_hash, model, features.shape[1])
+    base, phi = explainer.explain(scale(features))
+    result = (explainer.output_space, float(base), phi.tolist())
+    with _lock:
+        _cache[key] = result
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
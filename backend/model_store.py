@@ -0,0 +1,98 @@
+"""
+Frozen model loading and vectorised scoring.
+
+Shared by the API (app.py) and the offline batch scorer (batch_score.py),
+so both serve exactly the same pickles, the same SHA-256 version info and
+the same 13-feature input contract. Scaling comes from the preprocessing
+artifact (preprocessing.py), not a pickled scaler. Importing this module
+has no side effects — no database connection, no web framework.
+
+Files come from the served training run (artifacts.py): the manifest in
+model/artifacts/ when there is one, else the loose files in model/.
+
+CARDIOSCAN_MODEL_VARIANT=pruned|quantized|pruned_quantized serves the
+compact tree-ensemble variants from model/variants/ (compact_model.py)
+instead of the full pickles; models without that variant (logistic
+regression) stay on their pickle.
+"""
+import io
+import os
+
+import joblib
+import numpy as np
+
+import artifacts
+from compact_model import CompactEnsemble
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "..", "model")
+VARIANT = os.environ.get("CARDIOSCAN_MODEL_VARIANT", "full")
+
+MODEL_FILES = {
+    "random_forest": "random_forest.pkl",
+    "logistic_regression": "logistic_regression.pkl",
+    "gradient_boosting": "gradient_boosting.pkl",
+}
+
+FEATURE_KEYS = [
+    "age", "sex", "cp", "trestbps", "chol",
+    "fbs", "restecg", "thalach", "exang",
+    "oldpeak", "slope", "ca", "thal"
+]
+
+# Positive label at or above this calibrated probability (re-exported as calibration.THRESHOLD)
+THRESHOLD = 0.5
+
+
+# ─────────────────────────────────────────────
+# LOAD MODELS (FROZEN)
+# ─────────────────────────────────────────────
+def model_file(name, source, variant="full"):
+    """(variant actually served, file name) — the pickle when `name` has no such variant."""
+    file = f"variants/{name}.{variant}.npz"
+    if variant != "full" and source.exists(file):
+        return variant, file
+    return "full", MODEL_FILES[name]
+
+
+def load_frozen_model(name, source=None, variant="full"):
+    """Load one model; returns (model, {"path", "sha256", "variant"})."""
+    source = source or artifacts.open_run(MODEL_DIR)
+    variant, file = model_file(name, source, variant)
+    raw, sha256 = source.read(file)
+    model = joblib.load(io.BytesIO(raw)) if variant == "full" else CompactEnsemble.load(io.BytesIO(raw))
+    return model, {"path": source.path(file), "sha256": sha256, "variant": variant}
+
+
+def load_frozen_models(source=None, names=None, variant=VARIANT):
+    """({name: model}, {name: version info}) for every model, or just `names`."""
+    models, version_info = {}, {}
+    for name in names or MODEL_FILES:
+        models[name], version_info[name] = load_frozen_model(name, source, variant)
+    return models, version_info
+
+
+# ─────────────────────────────────────────────
+# VECTORISED SCORING
+# ─────────────────────────────────────────────
+def score_matrix(model, preprocessor, features, valid=None, calibrate=None):
+    """Score the `valid` rows of an (n, 13) float matrix with one transform + predict_proba.
+
+    Returns (valid, prediction, probability); rows not scored keep
+    prediction 0 / probability NaN. `features` are already in training
+    codes (Preprocessor.prepare_matrix); `valid` defaults to the rows with
+    no NaN or inf feature. With `calibrate` (calibration.py) probabilities
+    are mapped and predictions thresholded at THRESHOLD on the calibrated scale."""
+    if valid is None:
+        valid = np.isfinite(features).all(axis=1)
+    probability = np.full(len(features), np.nan)
+    prediction = np.zeros(len(features), dtype=int)
+    if valid.any():
+        proba = model.predict_proba(preprocessor.transform(features[valid]))
+        if calibrate is None:
+            probability[valid] = proba[:, 1]
+            prediction[valid] = model.classes_[proba.argmax(axis=1)]
+        else:
+            probability[valid] = calibrate(proba[:, 1])
+            prediction[valid] = probability[valid] >= THRESHOLD
+    return valid, prediction, probability
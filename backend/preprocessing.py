@@ -0,0 +1,70 @@
+"""
+Request preprocessing — imputation, categorical encoding and scaling from
+the one artifact training saves (model/preprocessing.json, written by
+model/preprocessing_spec.py).
+
+    prepare_row(data)               JSON body -> (1, 13) row in training codes
+    prepare_matrix(features, name)  (n, 13) matrix -> (rows, valid, {field: bad count})
+    transform(X)                    StandardScaler.transform as plain numpy
+
+Fields listed as "optional" (the ones heart.csv has gaps in) may be left
+out; they are filled with the training median, exactly as training
+filled them, instead of failing the request. Everything else must be
+present and valid (schema.py). Scaling uses the saved mean/scale arrays,
+so the backend never unpickles the scaler and pays no sklearn overhead
+on single rows.
+"""
+import json
+
+import numpy as np
+
+import artifacts
+import schema
+from encoding import FeatureEncoding
+from model_store import FEATURE_KEYS, MODEL_DIR
+
+PREPROCESSING_FILE = "preprocessing.json"
+
+
+class Preprocessor:
+    def __init__(self, spec, sha256=None):
+        if spec["features"] != FEATURE_KEYS:
+            raise ValueError("preprocessing artifact does not match the model's feature order")
+        self.version = spec["version"]
+        self.sha256 = sha256
+        self.median = np.array(spec["median"], dtype=np.float64)
+        self.mean = np.array(spec["mean"], dtype=np.float64)
+        self.scale = np.array(spec["scale"], dtype=np.float64)
+        self.optional = spec["optional"]
+        self._optional = np.isin(FEATURE_KEYS, self.optional)
+        self.encoding = FeatureEncoding(spec["encoding"])
+        self.parse_row = schema.compile_parser(self.optional)
+
+    def describe(self):
+        return {"version": self.version, "sha256": self.sha256,
+                "imputed": self.optional, "encoding": self.encoding.describe()}
+
+    def prepare_row(self, data):
+        """Validated, canonicalised and imputed (1, 13) row; raises schema.ValidationError."""
+        row = self.encoding.canonicalize_row(self.parse_row(data), data.get("encoding"))
+        missing = np.isnan(row[0])
+        if missing.any():
+            row[0, missing] = self.median[missing]
+        return row
+
+    def prepare_matrix(self, features, encoding_name=None):
+        """(rows, valid, invalid_fields) for an (n, 13) matrix; NaN in optional columns is imputed."""
+        missing = np.isnan(features) & self._optional
+        rows = self.encoding.canonicalize(features, encoding_name)
+        np.copyto(rows, self.median, where=missing)
+        valid, invalid_fields = schema.check_matrix(rows)
+        return rows, valid, invalid_fields
+
+    def transform(self, X):
+        return (X - self.mean) / self.scale
+
+
+def load(source=None):
+    """The Preprocessor of the served run (artifacts.py)."""
+    raw, sha256 = (source or artifacts.open_run(MODEL_DIR)).read(PREPROCESSING_FILE)
+    return Preprocessor(json.loads(raw), sha256)
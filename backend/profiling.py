@@ -0,0 +1,206 @@
+"""
+On-demand profiling for the CardioScan API.
+
+Two modes, both started from the localhost-only /admin/profile route:
+
+  sample    a background thread snapshots every thread's stack via
+            sys._current_frames() at a fixed interval and returns
+            collapsed stacks ("a;b;c 42"), ready for flamegraph.pl
+            or speedscope.
+  cprofile  each request handled during the window runs under its own
+            cProfile.Profile; the per-request stats are merged into a
+            single pstats artifact. Only one request is profiled at a
+            time: from Python 3.12 cProfile sits on sys.monitoring, and a
+            second enable() while another profile is active raises. A
+            request that overlaps a profiled one is served unprofiled,
+            and the summary counts it under requests_unprofiled.
+
+A session ends after `seconds` or after `max_requests` requests, whichever
+comes first. Only one session may run at a time, durations and sample
+rates are clamped, and when no session is active the request hooks cost
+a single attribute check.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+
+MAX_SECONDS = 60.0
+MIN_INTERVAL = 0.001          # 1 kHz ceiling on the sampler
+DEFAULT_INTERVAL = 0.01
+MAX_STACK_DEPTH = 64
+MAX_DISTINCT_STACKS = 20000
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+# ─────────────────────────────────────────────
+# STACK SAMPLER
+# ─────────────────────────────────────────────
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame):
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        parts.append(_frame_label(frame))
+        frame = frame.f_back
+    parts.reverse()
+    return ";".join(parts)
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval, ignore_threads):
+        super().__init__(name="cardioscan-sampler", daemon=True)
+        self.interval = interval
+        self.ignore = set(ignore_threads)
+        self.stacks = {}
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        self.ignore.add(threading.get_ident())
+        while not self._stop_event.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid in self.ignore:
+                    continue
+                key = _collapse(frame)
+                if key not in self.stacks and len(self.stacks) >= MAX_DISTINCT_STACKS:
+                    key = "[truncated]"
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# ─────────────────────────────────────────────
+# SESSION
+# ─────────────────────────────────────────────
+class ProfileSession:
+    def __init__(self, mode, seconds, max_requests=None, interval=DEFAULT_INTERVAL):
+        if mode not in ("sample", "cprofile"):
+            raise ValueError(f"unknown profiling mode: {mode}")
+        self.mode = mode
+        self.seconds = min(max(float(seconds), 0.1), MAX_SECONDS)
+        self.max_requests = max_requests
+        self.interval = max(float(interval), MIN_INTERVAL)
+        self.requests_seen = 0
+        self.requests_unprofiled = 0
+        self.started_at = None
+        self.elapsed = 0.0
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._profiling = threading.Lock()   # held while a request runs under cProfile
+        self._sampler = None
+        self._stats = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        if self.mode == "sample":
+            self._sampler = _Sampler(self.interval, [threading.get_ident()])
+            self._sampler.start()
+
+    def wait(self):
+        self._done.wait(self.seconds)
+        self._done.set()
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.elapsed = time.perf_counter() - self.started_at
+
+    # Request hooks — called by the app for every request in the window
+    def request_started(self):
+        if self.mode != "cprofile" or self._done.is_set():
+            return None
+        if not self._profiling.acquire(blocking=False):
+            with self._lock:
+                self.requests_unprofiled += 1
+            return None
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:       # another profiler (a debugger, coverage) owns the hook
+            self._profiling.release()
+            with self._lock:
+                self.requests_unprofiled += 1
+            return None
+        return prof
+
+    def request_finished(self, prof):
+        if prof is not None:
+            prof.disable()
+            self._profiling.release()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(prof)
+                else:
+                    self._stats.add(prof)
+        with self._lock:
+            self.requests_seen += 1
+            if self.max_requests and self.requests_seen >= self.max_requests:
+                self._done.set()
+
+    # Artifacts
+    def artifact(self, fmt=None):
+        """Return (body, mimetype, filename) for the finished session."""
+        if self.mode == "sample":
+            lines = [f"{stack} {count}" for stack, count in
+                     sorted(self._sampler.stacks.items(), key=lambda kv: -kv[1])]
+            return "\n".join(lines) + "\n", "text/plain", "profile.collapsed"
+
+        if self._stats is None:
+            return "no requests were profiled in the window\n", "text/plain", "profile.txt"
+        if fmt == "text":
+            buf = io.StringIO()
+            self._stats.stream = buf
+            self._stats.sort_stats("cumulative").print_stats(50)
+            return buf.getvalue(), "text/plain", "profile.txt"
+        # Same bytes pstats.Stats.dump_stats() would write
+        return marshal.dumps(self._stats.stats), "application/octet-stream", "profile.pstats"
+
+    def summary(self):
+        out = {
+            "mode": self.mode,
+            "elapsed_s": round(self.elapsed, 3),
+            "requests_seen": self.requests_seen,
+        }
+        if self.mode == "cprofile":
+            out["requests_unprofiled"] = self.requests_unprofiled
+        if self._sampler is not None:
+            out["samples"] = self._sampler.samples
+            out["interval_s"] = self.interval
+        return out
+
+
+_active = None
+_active_lock = threading.Lock()
+
+
+def active():
+    return _active
+
+
+def run_session(mode, seconds, max_requests=None, interval=DEFAULT_INTERVAL):
+    """Run a profiling session to completion and return it. Blocks the caller."""
+    global _active
+    session = ProfileSession(mode, seconds, max_requests, interval)
+    with _active_lock:
+        if _active is not None:
+            raise ProfilerBusy("a profiling session is already running")
+        _active = session
+    try:
+        session.start()
+        session.wait()
+    finally:
+        with _active_lock:
+            _active = None
+    return session
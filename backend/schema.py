@@ -0,0 +1,143 @@
+"""
+Input schema for the 13 model features, compiled once at import.
+
+    parse_row(data)          JSON body -> (1, 13) float64 row, or ValidationError
+    compile_parser(optional) parse_row that reads missing `optional` fields as NaN
+    check_matrix(features)   (n, 13) matrix -> (valid rows, {field: bad count})
+
+FEATURES gives each field either an inclusive numeric range or a set of
+allowed integer codes. The categorical code sets are the union of every
+input encoding (the Predict form's 0-based cp/slope/thal and heart.csv's
+cp 1-4, slope 1-3, thal 3/6/7); encoding.py then checks a row against the
+encoding it was sent in and maps it onto the training codes.
+
+parse_row is generated from FEATURES as straight-line Python: one
+itemgetter call fetches all 13 values, one chained boolean expression
+checks every range and code, and the tuple goes into numpy in a single
+call. Only a body that fails that check takes the slow path, which works
+out which fields are wrong (and still accepts numeric strings). Neither
+path accepts JSON true/false, although Python treats them as 1 and 0.
+"""
+import functools
+import operator
+
+import numpy as np
+
+from model_store import FEATURE_KEYS
+
+# name -> (low, high) inclusive, or a set of allowed codes
+FEATURES = {
+    "age": (1, 120),
+    "sex": {0, 1},
+    "cp": {0, 1, 2, 3, 4},
+    "trestbps": (0, 300),
+    "chol": (0, 1000),
+    "fbs": {0, 1},
+    "restecg": {0, 1, 2},
+    "thalach": (0, 250),
+    "exang": {0, 1},
+    "oldpeak": (0, 10),
+    "slope": {0, 1, 2, 3},
+    "ca": {0, 1, 2, 3},
+    "thal": {0, 1, 2, 3, 6, 7},
+}
+
+
+class ValidationError(ValueError):
+    """One or more invalid fields; `fields` maps each to a message."""
+
+    def __init__(self, fields):
+        super().__init__("invalid input: " + ", ".join(f"{k} {v}" for k, v in fields.items()))
+        self.fields = fields
+
+    def payload(self):
+        return {"error": "invalid input", "fields": self.fields}
+
+
+def _rule(spec):
+    if isinstance(spec, set):
+        return f"must be one of {', '.join(str(c) for c in sorted(spec))}"
+    return f"must be between {spec[0]} and {spec[1]}"
+
+
+# ─────────────────────────────────────────────
+# SINGLE ROW — compiled fast path
+# ─────────────────────────────────────────────
+def _compile(fields, optional=frozenset()):
+    names = [f"x{i}" for i in range(len(fields))]
+    env = {"_get": operator.itemgetter(*fields), "_array": np.array, "_f64": np.float64, "_bool": bool,
+           "_slow": functools.partial(_parse_slow, optional=frozenset(optional))}
+    checks = []
+    for i, (name, spec) in enumerate(fields.items()):
+        checks.append(f"type({names[i]}) is not _bool")     # True == 1 passes the checks below
+        if isinstance(spec, set):
+            env[f"_codes{i}"] = frozenset(spec)
+            checks.append(f"{names[i]} in _codes{i}")
+        else:
+            checks.append(f"{spec[0]!r} <= {names[i]} <= {spec[1]!r}")
+    source = "\n".join([
+        "def parse_row(data):",
+        "    try:",
+        f"        row = {', '.join(names)} = _get(data)",
+        f"        if {' and '.join(checks)}:",
+        "            return _array((row,), _f64)",
+        "    except (KeyError, TypeError):",
+        "        pass",
+        "    return _slow(data)",
+    ])
+    exec(compile(source, "<schema>", "exec"), env)
+    return env["parse_row"]
+
+
+def _parse_slow(data, optional=frozenset()):
+    if not isinstance(data, dict):
+        raise ValidationError({"body": "must be a JSON object"})
+    row, errors = [], {}
+    for name, spec in FEATURES.items():
+        if data.get(name) is None:
+            if name in optional:
+                row.append(np.nan)
+            else:
+                errors[name] = "is required"
+            continue
+        try:
+            if isinstance(data[name], bool):       # float(True) is 1.0; true/false are not codes
+                raise TypeError
+            value = float(data[name])
+        except (TypeError, ValueError):
+            errors[name] = "must be a number"
+            continue
+        ok = value in spec if isinstance(spec, set) else spec[0] <= value <= spec[1]
+        if not ok:
+            errors[name] = _rule(spec)
+        row.append(value)
+    if errors:
+        raise ValidationError(errors)
+    return np.array((row,), np.float64)
+
+
+assert list(FEATURES) == FEATURE_KEYS, "schema must follow the model's feature order"
+parse_row = _compile(FEATURES)
+
+
+def compile_parser(optional=()):
+    """parse_row variant where the `optional` fields may be null or absent (NaN)."""
+    return _compile(FEATURES, optional)
+
+
+# ─────────────────────────────────────────────
+# MATRIX — /predict/batch and batch_score.py
+# ─────────────────────────────────────────────
+_LOW = np.array([min(s) if isinstance(s, set) else s[0] for s in FEATURES.values()], dtype=np.float64)
+_HIGH = np.array([max(s) if isinstance(s, set) else s[1] for s in FEATURES.values()], dtype=np.float64)
+_CODES = [(i, np.array(sorted(s), dtype=np.float64))
+          for i, s in enumerate(FEATURES.values()) if isinstance(s, set)]
+
+
+def check_matrix(features):
+    """(valid, bad_counts): a row mask and {field: rows failing it}; NaN fails every check."""
+    ok = (features >= _LOW) & (features <= _HIGH)
+    for i, codes in _CODES:
+        ok[:, i] &= np.isin(features[:, i], codes)
+    bad = len(features) - ok.sum(axis=0)
+    return ok.all(axis=1), {name: int(n) for name, n in zip(FEATURE_KEYS, bad) if n}
@@ -0,0 +1,200 @@
+"""
+Shadow scoring — a candidate model scores live /predict traffic off the
+response path and is compared with the model that answered.
+
+CARDIOSCAN_SHADOW lists candidates by SHA-256 (a unique prefix is
+enough), comma-separated. Each one is looked up in the artifact store
+(artifacts.find_file): a model pickle or compact variant from any stored
+training run, loaded with that run's preprocessing and calibration. It
+shadows the served model of the same name, so a retrained random forest
+(or random_forest.pruned.npz) is compared with the random_forest that
+/predict serves.
+
+After a /predict response is built, the request only queues its row
+(one SimpleQueue.put). A daemon thread per candidate drains whatever has
+queued, up to MAX_BATCH rows, and scores it with one predict_proba. The
+candidate therefore never runs on the request thread, and under load it
+scores in batches rather than paying sklearn's per-call overhead per row.
+If the backlog passes MAX_BACKLOG rows, new rows are dropped and counted
+rather than queued.
+
+Per candidate it records agreement of the served labels, label flips,
+and the candidate-minus-served probability delta, on the served
+(calibrated) scale. app.py reports this next to MODEL_VERSION_INFO in
+/model-info.
+"""
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+import artifacts
+import calibration
+import model_store
+import preprocessing
+import telemetry
+
+CANDIDATES = [h.strip() for h in os.environ.get("CARDIOSCAN_SHADOW", "").split(",") if h.strip()]
+MAX_BATCH = 256
+MAX_BACKLOG = int(os.environ.get("CARDIOSCAN_SHADOW_MAX_BACKLOG", "10000"))
+DELTA_EDGES = (0.01, 0.05, 0.1, 0.2, 0.5)
+DELTA_LABELS = [f"<{DELTA_EDGES[0]}"] + [f"{lo}-{hi}" for lo, hi in zip(DELTA_EDGES, DELTA_EDGES[1:])] \
+    + [f">={DELTA_EDGES[-1]}"]
+
+SHADOW_ROWS = telemetry.counter(
+    "cardioscan_shadow_rows_total", "Rows seen by shadow candidates, by served model and outcome."
+)
+
+
+def _model_name(file):
+    """("random_forest", "full") for random_forest.pkl, ("random_forest", "pruned") for a variant."""
+    base = os.path.basename(file)
+    if file.startswith("variants/"):
+        name, variant, _ = base.split(".")
+        return name, variant
+    for name, model_file in model_store.MODEL_FILES.items():
+        if model_file == base:
+            return name, "full"
+    raise artifacts.ArtifactError(f"{file} is not a model file")
+
+
+class ShadowModel:
+    def __init__(self, model_dir, sha256, served_preprocessing=None):
+        run, file = artifacts.find_file(model_dir, sha256)
+        self.name, variant = _model_name(file)
+        source = artifacts.open_run(model_dir, run)
+        self.model, info = model_store.load_frozen_model(self.name, source, variant)
+        self.preprocessor = preprocessing.load(source)
+        table = calibration.load(source)
+        self.calibrate = table.calibrator(self.name, info["variant"]) if table else None
+        # Same preprocessing artifact as the served run: reuse the row /predict already parsed
+        self.reuse_rows = self.preprocessor.sha256 == served_preprocessing
+        self.info = {"sha256": info["sha256"], "run": run, "file": file, "variant": info["variant"],
+                     "preprocessing": self.preprocessor.sha256}
+
+        self.scored = self.agree = self.errors = self.dropped = 0
+        self.flips = {"0→1": 0, "1→0": 0}
+        self.delta_sum = self.abs_delta_sum = self.max_abs_delta = 0.0
+        self.delta_bins = np.zeros(len(DELTA_EDGES) + 1, dtype=np.int64)
+        self.busy_seconds = 0.0
+        self._backlog = 0
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        threading.Thread(target=self._drain, name=f"cardioscan-shadow-{self.info['sha256'][:8]}",
+                         daemon=True).start()
+
+    def submit(self, data, features, prediction, probability):
+        """Queue one served row; returns at once (drops the row when the backlog is full)."""
+        with self._lock:
+            if self._backlog >= MAX_BACKLOG:
+                self.dropped += 1
+                SHADOW_ROWS.inc(model=self.name, outcome="dropped")
+                return
+            self._backlog += 1
+        self._queue.put((data, features, prediction, probability))
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        while len(batch) < MAX_BATCH:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _rows(self, batch):
+        if self.reuse_rows:
+            return np.vstack([features for _, features, _, _ in batch]), np.ones(len(batch), dtype=bool)
+        rows, ok = [], []
+        for data, _, _, _ in batch:
+            try:
+                rows.append(self.preprocessor.prepare_row(data))
+                ok.append(True)
+            except ValueError:
+                rows.append(np.zeros((1, len(model_store.FEATURE_KEYS))))
+                ok.append(False)
+        return np.vstack(rows), np.array(ok)
+
+    def _drain(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            try:
+                X, ok = self._rows(batch)
+                probability = self.model.predict_proba(self.preprocessor.transform(X))[:, 1]
+                if self.calibrate is not None:
+                    probability = self.calibrate(probability)
+                self._record(batch, ok, probability, time.perf_counter() - start)
+            except Exception:
+                with self._lock:
+                    self.errors += len(batch)
+                    self._backlog -= len(batch)
+                SHADOW_ROWS.inc(len(batch), model=self.name, outcome="error")
+
+    def _record(self, batch, ok, probability, elapsed):
+        served_pred = np.array([p for _, _, p, _ in batch])[ok]
+        delta = probability[ok] - np.array([p for _, _, _, p in batch])[ok]
+        pred = (probability[ok] >= calibration.THRESHOLD).astype(int)
+        agree = int((pred == served_pred).sum())
+        with self._lock:
+            self._backlog -= len(batch)
+            self.errors += int((~ok).sum())
+            self.scored += len(delta)
+            self.agree += agree
+            self.flips["0→1"] += int(((served_pred == 0) & (pred == 1)).sum())
+            self.flips["1→0"] += int(((served_pred == 1) & (pred == 0)).sum())
+            self.delta_sum += float(delta.sum())
+            self.abs_delta_sum += float(np.abs(delta).sum())
+            self.max_abs_delta = max(self.max_abs_delta, float(np.abs(delta).max(initial=0.0)))
+            self.delta_bins += np.bincount(np.searchsorted(DELTA_EDGES, np.abs(delta)),
+                                           minlength=len(self.delta_bins))
+            self.busy_seconds += elapsed
+        SHADOW_ROWS.inc(agree, model=self.name, outcome="agree")
+        SHADOW_ROWS.inc(len(delta) - agree, model=self.name, outcome="disagree")
+
+    def describe(self):
+        with self._lock:
+            n = max(self.scored, 1)
+            return {
+                "candidate": self.info,
+                "scored": self.scored,
+                "agreement": round(self.agree / n, 4) if self.scored else None,
+                "flips": dict(self.flips),
+                "mean_delta": round(self.delta_sum / n, 4),
+                "mean_abs_delta": round(self.abs_delta_sum / n, 4),
+                "max_abs_delta": round(self.max_abs_delta, 4),
+                "abs_delta_bins": dict(zip(DELTA_LABELS, self.delta_bins.tolist())),
+                "ms_per_row": round(self.busy_seconds / n * 1000, 3),
+                "backlog": self._backlog,
+                "dropped": self.dropped,
+                "errors": self.errors,
+            }
+
+
+class ShadowScorer:
+    def __init__(self, candidates):
+        self.by_model = {}
+        for candidate in candidates:
+            self.by_model.setdefault(candidate.name, []).append(candidate)
+
+    def submit(self, data, features, record):
+        """Hand one served /predict row to every candidate shadowing its model."""
+        for candidate in self.by_model.get(record["model_used"], ()):
+            candidate.submit(data, features, record["prediction"], record["probability"])
+
+    def describe(self):
+        return {name: [c.describe() for c in candidates] for name, candidates in self.by_model.items()}
+
+
+def load(model_dir, served_models, served_preprocessing=None, hashes=CANDIDATES):
+    """ShadowScorer for the CARDIOSCAN_SHADOW candidates, or None when none is set."""
+    if not hashes:
+        return None
+    candidates = [ShadowModel(model_dir, h, served_preprocessing) for h in hashes]
+    for c in candidates:
+        if c.name not in served_models:
+            raise artifacts.ArtifactError(f"candidate {c.info['sha256'][:12]} shadows {c.name}, "
+                                          f"which is not served")
+    return ShadowScorer(candidates)
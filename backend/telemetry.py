@@ -0,0 +1,186 @@
+"""
+In-process latency histograms and counters for the CardioScan API.
+
+Everything here is rendered in Prometheus text format by the /metrics
+route in app.py. Set CARDIOSCAN_METRICS=0 to turn every recording call
+into a no-op (the /metrics route then only reports that it is disabled).
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = os.environ.get("CARDIOSCAN_METRICS", "1") != "0"
+
+# Seconds — sub-millisecond sklearn calls up to the 8 s Mongo timeout
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_REGISTRY = []
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+# ─────────────────────────────────────────────
+# METRIC TYPES
+# ─────────────────────────────────────────────
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not ENABLED:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}   # label key -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not ENABLED:
+            return
+        key = _label_key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[idx] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            running = 0
+            for bound, count in zip(self.buckets, series):
+                running += count
+                le = _format_labels(key, [("le", repr(bound))])
+                lines.append(f"{self.name}_bucket{le} {running}")
+            running += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {running}")
+        return lines
+
+
+def counter(name, help_text):
+    metric = Counter(name, help_text)
+    _REGISTRY.append(metric)
+    return metric
+
+
+def histogram(name, help_text, buckets=LATENCY_BUCKETS):
+    metric = Histogram(name, help_text, buckets)
+    _REGISTRY.append(metric)
+    return metric
+
+
+# ─────────────────────────────────────────────
+# TIMERS
+# ─────────────────────────────────────────────
+class _Timer:
+    __slots__ = ("hist", "labels", "start")
+
+    def __init__(self, hist, labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(hist, **labels):
+    """Context manager that observes the elapsed wall time into `hist`."""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(hist, labels)
+
+
+# ─────────────────────────────────────────────
+# STANDARD METRICS
+# ─────────────────────────────────────────────
+REQUEST_LATENCY = histogram(
+    "cardioscan_request_seconds", "End-to-end request latency by route."
+)
+STAGE_LATENCY = histogram(
+    "cardioscan_predict_stage_seconds",
+    "Latency of each /predict stage (parse, scale, predict, predict_proba, store).",
+)
+PREDICTIONS = counter(
+    "cardioscan_predictions_total", "Predictions served, by model."
+)
+STORAGE_WRITES = counter(
+    "cardioscan_storage_writes_total", "Prediction records written, by storage backend."
+)
+ERRORS = counter(
+    "cardioscan_errors_total", "Request errors, by route and exception type."
+)
+CACHE_LOOKUPS = counter(
+    "cardioscan_cache_lookups_total", "Cache lookups, by cache name and result (hit/miss)."
+)
+
+
+def record_cache(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def render():
+    if not ENABLED:
+        return "# cardioscan metrics disabled (CARDIOSCAN_METRICS=0)\n"
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
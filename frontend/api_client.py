@@ -0,0 +1,313 @@
+"""
+Shared CardioScan API client for the Streamlit pages.
+
+Every page talks to the backend through this module so that:
+
+  * one pooled requests.Session (held in st.cache_resource) is reused by
+    every page and every browser session, instead of a new TCP connection
+    per call;
+  * the backend address comes from CARDIOSCAN_API_URL (default
+    http://127.0.0.1:5000);
+  * GETs send If-None-Match with the last ETag seen for that path, and a
+    304 reuses the payload already in memory;
+  * /history is synced incrementally: one shared DataFrame per process,
+    refreshed at most once per HISTORY_TTL seconds with a ?since=<cursor>
+    delta fetch, so a refresh costs O(new rows) and the Dashboard and
+    Prediction Analytics share the same snapshot;
+  * start_live_feed() follows /history/stream (Server-Sent Events) in a
+    background thread and appends pushed predictions as they happen, so
+    pages can rerun on live_version() changes instead of polling.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+import pandas as pd
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+import history_frame
+
+API_URL = os.environ.get("CARDIOSCAN_API_URL", "http://127.0.0.1:5000").rstrip("/")
+HISTORY_TTL = int(os.environ.get("CARDIOSCAN_HISTORY_TTL", "30"))
+CARDS_TTL = 300
+LIVE_RESYNC = 300           # full delta check while the live feed is connected
+LIVE_RETRY = 5              # seconds between stream reconnect attempts
+LIVE_READ_TIMEOUT = 60      # > the backend's 15 s keepalive
+CARDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model", "cards")
+
+
+# ─────────────────────────────────────────────
+# SHARED SESSION + CONDITIONAL GET
+# ─────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def _session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_resource(show_spinner=False)
+def _etag_store():
+    """path -> (etag, payload) for the last 200 response of each GET."""
+    return {}, threading.Lock()
+
+
+def get_json(path, timeout=5):
+    store, lock = _etag_store()
+    with lock:
+        cached = store.get(path)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+
+    resp = _session().get(API_URL + path, headers=headers, timeout=timeout)
+    if resp.status_code == 304 and cached:
+        return cached[1]
+    resp.raise_for_status()
+    payload = resp.json()
+
+    etag = resp.headers.get("ETag")
+    if etag:
+        with lock:
+            store[path] = (etag, payload)
+    return payload
+
+
+def post_json(path, payload, timeout=10):
+    """POST and return the raw response so callers can inspect the status."""
+    return _session().post(API_URL + path, json=payload, timeout=timeout)
+
+
+# ─────────────────────────────────────────────
+# CACHED ENDPOINTS
+# ─────────────────────────────────────────────
+class _HistorySync:
+    """Local copy of /history, grown by appending the rows after `cursor`."""
+
+    def __init__(self):
+        self.frame = pd.DataFrame()
+        self.cursor = 0
+        self.etag = None
+        self.checked_at = 0.0
+        self.version = 0        # bumped whenever rows are added
+        self.live = False       # a _LiveFeed is connected and pushing rows
+        self.pending = []       # pushed records not yet concatenated
+        self.summary = (None, None)     # (version, history_frame.summarize result)
+        self.lock = threading.Lock()
+
+    def refresh(self, force=False):
+        with self.lock:
+            self._refresh(force)
+            return self.frame
+
+    def prepared(self, force=False):
+        """(frame, summary) with the summary recomputed only when the data version moves.
+        summary["version"] is the version of this frame — a cache key for derived charts."""
+        with self.lock:
+            self._refresh(force)
+            version, summary = self.summary
+            if version != self.version:
+                summary = {**history_frame.summarize(self.frame), "version": self.version}
+                self.summary = (self.version, summary)
+            return self.frame, summary
+
+    def _refresh(self, force):
+        ttl = LIVE_RESYNC if self.live else HISTORY_TTL
+        if force or time.monotonic() - self.checked_at >= ttl:
+            self._pull()
+            self.checked_at = time.monotonic()
+        self._flush()
+
+    def _flush(self):
+        # Only the new rows are prepared; the frame on hand already is
+        if self.pending:
+            self.frame = history_frame.append(self.frame, self.pending)
+            self.pending = []
+
+    def _pull(self):
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        resp = _session().get(API_URL + "/history", params={"since": self.cursor},
+                              headers=headers, timeout=5)
+        if resp.status_code == 304:
+            return
+        resp.raise_for_status()
+        body = resp.json()
+
+        if body["cursor"] < self.cursor:
+            # The store shrank (reset or switched backend) — start over
+            self.frame, self.cursor, self.etag, self.pending = pd.DataFrame(), 0, None, []
+            self.version += 1
+            return self._pull()
+        if body["records"]:
+            self.pending.extend(body["records"])
+            self.version += 1
+        self.cursor = body["cursor"]
+        self.etag = resp.headers.get("ETag")
+
+    def apply(self, cursor, record):
+        """One pushed record; anything but the next cursor falls back to a delta fetch."""
+        with self.lock:
+            if cursor <= self.cursor:
+                return
+            if cursor == self.cursor + 1:
+                self.pending.append(record)
+                self.cursor = cursor
+                self.version += 1
+            else:
+                self._pull()
+
+    def catch_up(self, cursor):
+        with self.lock:
+            if cursor != self.cursor:
+                self._pull()
+
+    def mark_stale(self):
+        self.checked_at = 0.0
+
+
+class _LiveFeed(threading.Thread):
+    """Follows /history/stream and feeds pushed predictions into the shared history."""
+
+    def __init__(self, sync):
+        super().__init__(name="cardioscan-live-feed", daemon=True)
+        self.sync = sync
+
+    def run(self):
+        while True:
+            try:
+                self._follow()
+            except Exception:
+                pass
+            self.sync.live = False
+            time.sleep(LIVE_RETRY)
+
+    def _follow(self):
+        # Own connection: a stream would pin one of the pooled session's sockets
+        with requests.get(API_URL + "/history/stream", stream=True,
+                          timeout=(5, LIVE_READ_TIMEOUT)) as resp:
+            resp.raise_for_status()
+            event, data = None, []
+            for line in resp.iter_lines(decode_unicode=True):
+                if line:
+                    field, _, value = line.partition(":")
+                    if field == "event":
+                        event = value.strip()
+                    elif field == "data":
+                        data.append(value[1:] if value.startswith(" ") else value)
+                    continue
+                if data:
+                    self._dispatch(event, json.loads("\n".join(data)))
+                event, data = None, []
+
+    def _dispatch(self, event, payload):
+        # rollup events are for lightweight consumers; the rows carry everything here
+        if event == "snapshot":
+            self.sync.catch_up(payload["cursor"])
+            self.sync.live = True
+        elif event == "prediction":
+            self.sync.apply(payload["cursor"], payload["record"])
+
+
+@st.cache_resource(show_spinner=False)
+def _history():
+    return _HistorySync()
+
+
+@st.cache_resource(show_spinner=False)
+def start_live_feed():
+    """Start (once per process) the background listener for pushed predictions."""
+    feed = _LiveFeed(_history())
+    feed.start()
+    return feed
+
+
+def live_version():
+    """Changes whenever new history rows arrive; cheap enough to poll from a fragment."""
+    return _history().version
+
+
+def fetch_history(force=False):
+    """All predictions, prepared by history_frame (a copy — callers may add columns)."""
+    return _history().refresh(force).copy()
+
+
+def fetch_prepared_history(force=False):
+    """(frame, summary) for the analytics pages. The frame is shared — do not modify it."""
+    return _history().prepared(force)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _timeline(query, version):
+    return get_json("/history/timeline?" + query)
+
+
+def fetch_timeline(points, method="lttb", rolling=0):
+    """At most ~`points` rows of (timestamp, probability[, rolling]), downsampled by the
+    backend; re-requested only when the history version moves."""
+    query = urlencode({"points": points, "method": method, "rolling": rolling})
+    return history_frame.timeline_frame(_timeline(query, live_version()))
+
+
+@st.cache_data(ttl=CARDS_TTL, show_spinner=False)
+def fetch_model_cards():
+    """Model cards from the backend, or straight from model/cards when it is down."""
+    try:
+        return get_json("/model-cards")["cards"]
+    except Exception:
+        cards = {}
+        for path in glob.glob(os.path.join(CARDS_DIR, "*.json")):
+            with open(path) as f:
+                card = json.load(f)
+            cards[card["model"]] = card
+        return cards
+
+
+def fetch_drift(window="recent"):
+    """Live-vs-training drift scores and data-quality counters (/monitoring/drift)."""
+    return get_json("/monitoring/drift?" + urlencode({"window": window}))
+
+
+def _validation_message(body):
+    """One line from a 400 body: {"error", "fields": {name: message}} or a plain {"error"}."""
+    fields = body.get("fields")
+    if not fields:
+        return body.get("error", "invalid input")
+    return "; ".join(f"{name} {message}" for name, message in fields.items())
+
+
+def predict(endpoint, data, timeout=10):
+    """Score one patient; the next history read fetches it without waiting out the TTL."""
+    resp = post_json(endpoint, data, timeout=timeout)
+    if resp.status_code == 400:
+        raise ValueError(_validation_message(resp.json()))
+    resp.raise_for_status()
+    _history().mark_stale()
+    return resp.json()
+
+
+def explain(data, timeout=10):
+    return post_json("/predict/explain", data, timeout=timeout).json()
+
+
+def score_csv(csv_bytes, model, encoding=None, session=None, timeout=60):
+    """Score one CSV chunk with /predict/batch (columnar result, nothing stored).
+
+    `encoding` names the file's categorical codes ("uci" or "form"; the
+    backend default otherwise). Bulk jobs run off the script thread and
+    pass their own session."""
+    params = {"model": model}
+    if encoding:
+        params["encoding"] = encoding
+    resp = (session or _session()).post(
+        API_URL + "/predict/batch", params=params, data=csv_bytes,
+        headers={"Content-Type": "text/csv"}, timeout=timeout,
+    )
+    if resp.status_code == 400:
+        raise ValueError(_validation_message(resp.json()))
+    resp.raise_for_status()
+    return resp.json()
@@ -0,0 +1,93 @@
+"""
+Benchmark: preparing the prediction history for the analytics pages.
+
+    cd frontend
+    python bench_history.py --rows 1000000
+
+Compares the old per-rerun preparation (row-wise .apply for risk labels,
+untyped to_datetime, full re-sort, one boolean mask per risk band) with
+history_frame.prepare + summarize, and with appending a small batch of
+new rows to an already prepared frame — what a live refresh costs now.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import history_frame
+
+
+def synthetic_history(n, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2025-01-01T00:00:00")
+    offsets = np.sort(rng.integers(0, 365 * 24 * 3600 * 10**6, n)).astype("timedelta64[us]")
+    return pd.DataFrame({
+        "age": rng.integers(29, 78, n),
+        "chol": rng.integers(126, 565, n),
+        "model_used": rng.choice(["random_forest", "logistic_regression", "gradient_boosting"], n),
+        "probability": rng.random(n),
+        "prediction": rng.integers(0, 2, n),
+        "timestamp": np.datetime_as_string(start + offsets, unit="us"),
+    })
+
+
+def legacy_prepare(raw):
+    df = raw.copy()
+    df["risk_category"] = df["probability"].apply(
+        lambda x: "Low" if x < 0.3 else ("Moderate" if x < 0.6 else "High")
+    )
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df = df.sort_values("timestamp")
+    return {
+        "total": len(df),
+        "High": len(df[df["risk_category"] == "High"]),
+        "Moderate": len(df[df["risk_category"] == "Moderate"]),
+        "Low": len(df[df["risk_category"] == "Low"]),
+        "avg": df["probability"].mean(),
+    }
+
+
+def vectorised_prepare(raw):
+    df = history_frame.prepare(raw.copy())
+    return history_frame.summarize(df)
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--new-rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw = synthetic_history(args.rows)
+    print(f"{args.rows:,} rows")
+
+    t_old, old = best_of(lambda: legacy_prepare(raw), args.repeat)
+    t_new, new = best_of(lambda: vectorised_prepare(raw), args.repeat)
+    assert old["total"] == new["total"]
+    assert all(old[k] == new["risk_counts"][k] for k in history_frame.RISK_LABELS)
+    print(f"  row-wise prepare + masks   {t_old * 1000:9.1f} ms")
+    print(f"  vectorised prepare         {t_new * 1000:9.1f} ms   x{t_old / t_new:.1f}")
+
+    prepared = history_frame.prepare(raw.copy())
+    tail = synthetic_history(args.new_rows, seed=1)
+    tail["timestamp"] = pd.Timestamp("2026-06-01").isoformat()
+    rows = tail.to_dict("records")
+    t_app, _ = best_of(lambda: history_frame.append(prepared, rows), args.repeat)
+    t_sum, _ = best_of(lambda: history_frame.summarize(prepared), args.repeat)
+    print(f"  append {args.new_rows} new rows         {t_app * 1000:9.1f} ms")
+    print(f"  summarize (on version bump) {t_sum * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Background bulk scoring for the Bulk Scoring page.
+
+A BulkJob reads an uploaded CSV or Parquet file CHUNK_ROWS rows at a time
+(pandas chunked reader / pyarrow iter_batches), posts only the feature
+columns of each chunk to /predict/batch as CSV, and appends the scored
+chunk — original columns plus probability, prediction, risk_category and
+model_used — to a CSV file on disk. Up to IN_FLIGHT chunks are at the
+backend at once, and output order always matches input order.
+
+The job runs in its own thread, so the Streamlit script only polls its
+progress and summary; nothing but the current chunks is held in memory
+beyond the upload itself.
+"""
+import io
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import requests
+
+import api_client
+import history_frame
+
+FEATURE_COLUMNS = [
+    "age", "sex", "cp", "trestbps", "chol",
+    "fbs", "restecg", "thalach", "exang",
+    "oldpeak", "slope", "ca", "thal",
+]
+CHUNK_ROWS = 5000           # the backend accepts up to 10 000 rows per request
+IN_FLIGHT = 2
+
+
+def is_parquet(filename):
+    return filename.lower().endswith((".parquet", ".pq"))
+
+
+class BulkJob(threading.Thread):
+    def __init__(self, data, filename, model, encoding=None, chunk_rows=CHUNK_ROWS):
+        super().__init__(name="cardioscan-bulk", daemon=True)
+        self.source = io.BytesIO(data)
+        self.size = len(data)
+        self.filename = filename
+        self.model = model
+        self.encoding = encoding
+        self.chunk_rows = chunk_rows
+        self.total_rows = pq.ParquetFile(self.source).metadata.num_rows if is_parquet(filename) else None
+
+        self.rows = 0
+        self.scored = 0
+        self.probability_sum = 0.0
+        self.risk_counts = dict.fromkeys(history_frame.RISK_LABELS, 0)
+        self.invalid_fields = {}
+        self.error = None
+        self.done = False
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+        fd, self.output_path = tempfile.mkstemp(prefix="cardioscan-scored-", suffix=".csv")
+        os.close(fd)
+        self._cancel = threading.Event()
+
+    # ── Progress ───────────────────────────────────────────────
+    @property
+    def progress(self):
+        if self.done:
+            return 1.0
+        if self.total_rows:
+            return min(self.rows / self.total_rows, 1.0)
+        # CSV: how far the chunked reader has got through the upload
+        return min(self.source.tell() / max(self.size, 1), 1.0)
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def summary(self):
+        return {
+            "rows": self.rows,
+            "scored": self.scored,
+            "invalid": self.rows - self.scored,
+            "risk_counts": dict(self.risk_counts),
+            "invalid_fields": dict(self.invalid_fields),
+            "avg_probability": self.probability_sum / self.scored if self.scored else 0.0,
+            "rows_per_second": self.rows / self.elapsed if self.elapsed else 0.0,
+        }
+
+    def cancel(self):
+        self._cancel.set()
+
+    def discard(self):
+        self.cancel()
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    # ── Worker ─────────────────────────────────────────────────
+    def chunks(self):
+        self.source.seek(0)
+        if is_parquet(self.filename):
+            for batch in pq.ParquetFile(self.source).iter_batches(batch_size=self.chunk_rows):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(self.source, chunksize=self.chunk_rows)
+
+    def run(self):
+        try:
+            with requests.Session() as session, ThreadPoolExecutor(IN_FLIGHT) as pool:
+                pending = deque()
+                for chunk in self.chunks():
+                    if self._cancel.is_set():
+                        break
+                    missing = [c for c in FEATURE_COLUMNS if c not in chunk.columns]
+                    if missing:
+                        raise ValueError(f"missing columns: {', '.join(missing)}")
+                    body = chunk[FEATURE_COLUMNS].to_csv(index=False).encode()
+                    pending.append((chunk, pool.submit(api_client.score_csv, body, self.model, self.encoding, session)))
+                    if len(pending) >= IN_FLIGHT:
+                        self._write(*pending.popleft())
+                while pending and not self._cancel.is_set():
+                    self._write(*pending.popleft())
+                for _, fut in pending:
+                    fut.cancel()
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.done = True
+            self.finished_at = time.monotonic()
+
+    def _write(self, chunk, future):
+        result = future.result()
+        prob = pd.to_numeric(pd.Series(result["probability"], index=chunk.index, dtype=object))
+        out = chunk.assign(
+            probability=prob,
+            prediction=pd.Series(result["prediction"], index=chunk.index, dtype="Int64"),
+            risk_category=history_frame.categorize(prob),
+            model_used=result["model_used"],
+        )
+        out.to_csv(self.output_path, mode="a", header=self.rows == 0, index=False)
+
+        counts = out["risk_category"].value_counts(sort=False)
+        for label in history_frame.RISK_LABELS:
+            self.risk_counts[label] += int(counts.get(label, 0))
+        for name, n in result.get("invalid_fields", {}).items():
+            self.invalid_fields[name] = self.invalid_fields.get(name, 0) + n
+        self.probability_sum += float(np.nansum(prob))
+        self.scored += result["scored"]
+        self.rows += len(chunk)
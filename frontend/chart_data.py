@@ -0,0 +1,149 @@
+"""
+Bounded chart payloads for the analytics pages.
+
+The pages hold the whole prediction history in the Streamlit process; what
+must stay small is what gets shipped to the browser.
+
+  * Scatter charts draw at most POINT_BUDGET points. Above it rows are
+    sampled — stratified by risk band, so the rare High-risk points stay
+    visible — and above WEBGL_THRESHOLD points they are drawn with
+    go.Scattergl instead of SVG.
+  * Box and violin charts are drawn from precomputed statistics
+    (quartiles, whisker fences, mean/sd, a Gaussian KDE on a fixed grid)
+    rather than from every raw value, so their size does not grow with
+    the history.
+
+The derived data is cached per history version — summary["version"] from
+api_client.fetch_prepared_history.
+
+    CARDIOSCAN_CHART_RENDER   auto (default) | svg | webgl
+    CARDIOSCAN_CHART_POINTS   per-chart point budget (default 2000)
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+RENDER_MODE = os.environ.get("CARDIOSCAN_CHART_RENDER", "auto")
+POINT_BUDGET = int(os.environ.get("CARDIOSCAN_CHART_POINTS", "2000"))
+WEBGL_THRESHOLD = 1000
+KDE_GRID = 100
+KDE_BINS = 512
+
+
+def scatter_cls(n_points):
+    """go.Scatter or go.Scattergl for a trace of `n_points` points."""
+    if RENDER_MODE == "webgl" or (RENDER_MODE == "auto" and n_points > WEBGL_THRESHOLD):
+        return go.Scattergl
+    return go.Scatter
+
+
+# ─────────────────────────────────────────────
+# POINT BUDGET
+# ─────────────────────────────────────────────
+def _allocate(sizes, budget):
+    """Per-group sample sizes: a guaranteed floor each, the rest proportional."""
+    floor = np.minimum(sizes, budget // (4 * len(sizes)))
+    room = sizes - floor
+    if room.sum() == 0:
+        return floor
+    extra = np.floor((budget - floor.sum()) * room / room.sum()).astype(int)
+    return floor + np.minimum(extra, room)
+
+
+def sample_rows(df, budget=POINT_BUDGET, stratify=None, seed=0):
+    """At most `budget` rows of df, in their original order."""
+    if len(df) <= budget:
+        return df
+    if stratify is None:
+        return df.sample(n=budget, random_state=seed).sort_index()
+
+    groups = [(key, part) for key, part in df.groupby(stratify, observed=True)]
+    sizes = np.array([len(part) for _, part in groups])
+    parts = [part.sample(n=k, random_state=seed)
+             for (_, part), k in zip(groups, _allocate(sizes, budget)) if k]
+    return pd.concat(parts).sort_index()
+
+
+# ─────────────────────────────────────────────
+# BOX / VIOLIN STATISTICS
+# ─────────────────────────────────────────────
+def box_stats(values):
+    v = np.asarray(values, dtype=np.float64)
+    v = v[~np.isnan(v)]
+    q1, median, q3 = np.percentile(v, [25, 50, 75])
+    iqr = q3 - q1
+    return {
+        "n": len(v),
+        "q1": q1, "median": median, "q3": q3,
+        # Whiskers end at the furthest values within 1.5 IQR, as Plotly draws them
+        "lowerfence": v[v >= q1 - 1.5 * iqr].min(),
+        "upperfence": v[v <= q3 + 1.5 * iqr].max(),
+        "mean": v.mean(),
+        "sd": v.std(ddof=1) if len(v) > 1 else 0.0,
+    }
+
+
+def kde(values, grid_points=KDE_GRID):
+    """(grid, density) of a Gaussian KDE with Silverman's bandwidth, from a binned histogram."""
+    v = np.asarray(values, dtype=np.float64)
+    v = v[~np.isnan(v)]
+    q1, q3 = np.percentile(v, [25, 75])
+    spread = min(v.std(), (q3 - q1) / 1.34) or v.std() or 1.0
+    h = 0.9 * spread * len(v) ** -0.2
+
+    counts, edges = np.histogram(v, bins=KDE_BINS)
+    centres = (edges[:-1] + edges[1:]) / 2
+    grid = np.linspace(v.min() - 2 * h, v.max() + 2 * h, grid_points)
+    z = (grid[:, None] - centres[None, :]) / h
+    density = (np.exp(-0.5 * z * z) @ counts) / (len(v) * h * np.sqrt(2 * np.pi))
+    return grid, density
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def group_distributions(_df, version, column, by="risk_category"):
+    """{group: {"stats", "grid", "density"}} for every non-empty group; `version` keys the cache."""
+    out = {}
+    for key, part in _df.groupby(by, observed=True)[column]:
+        part = part.dropna()
+        if len(part):
+            grid, density = kde(part)
+            out[key] = {"stats": box_stats(part), "grid": grid, "density": density}
+    return out
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def scatter_sample(_df, version, columns, budget=POINT_BUDGET, stratify="risk_category"):
+    """Budgeted rows for a scatter chart plus an OLS fit over *all* rows."""
+    full = _df.dropna(subset=list(columns))
+    fit = np.polyfit(full[columns[0]].to_numpy(float), full[columns[1]].to_numpy(float), 1) \
+        if len(full) >= 2 else None
+    sampled = sample_rows(full[list(columns) + [stratify]], budget, stratify)
+    return sampled, fit, len(full)
+
+
+# ─────────────────────────────────────────────
+# TRACES
+# ─────────────────────────────────────────────
+def box_trace(stats, x, color, fillcolor, **kwargs):
+    """A go.Box drawn from precomputed statistics (no raw points)."""
+    return go.Box(
+        x=[x], q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+        lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]],
+        mean=[stats["mean"]], sd=[stats["sd"]],
+        line=dict(color=color), fillcolor=fillcolor, **kwargs,
+    )
+
+
+def violin_trace(dist, x, color, fillcolor, half_width=0.4, **kwargs):
+    """A violin outline at numeric position `x`, from a precomputed KDE."""
+    grid, density = dist["grid"], dist["density"]
+    offset = density / density.max() * half_width
+    return go.Scatter(
+        x=np.concatenate([x - offset, (x + offset)[::-1]]),
+        y=np.concatenate([grid, grid[::-1]]),
+        fill="toself", fillcolor=fillcolor, mode="lines",
+        line=dict(color=color, width=1.5), hoverinfo="skip", **kwargs,
+    )
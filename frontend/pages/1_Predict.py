@@ -2,6 +2,8 @@ import streamlit as st
 import requests
 import plotly.graph_objects as go
 
+import api_client
+
 st.set_page_config(page_title="CardioScan · Risk Prediction", layout="wide", page_icon="🫀")
 
 st.markdown("""
@@ -182,7 +184,7 @@ st.markdown(
 
 model_choice = st.selectbox(
     "Prediction model",
-    ["random_forest", "logistic_regression", "gradient_boosting"],
+    ["random_forest", "logistic_regression", "gradient_boosting", "ensemble"],
     label_visibility="collapsed"
 )
 st.markdown(
@@ -220,7 +222,7 @@ with col2:
 with col3:
     st.markdown('<div class="param-card"><p class="card-label">Angiography & Thal</p>', unsafe_allow_html=True)
     slope    = st.slider("Slope of Peak ST Segment", 0, 2, help="0=Upsloping, 1=Flat, 2=Downsloping")
-    ca       = st.slider("Major Vessels Colored by Fluoroscopy", 0, 4)
+    ca       = st.slider("Major Vessels Colored by Fluoroscopy", 0, 3)
     thal     = st.slider("Thalassemia Type", 0, 3, help="0=Normal, 1=Fixed defect, 2=Reversible defect, 3=Unknown")
     st.markdown('<br><br>', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
@@ -236,14 +238,15 @@ if predict_clicked:
         "age": age, "sex": sex, "cp": cp, "trestbps": trestbps, "chol": chol,
         "fbs": fbs, "restecg": restecg, "thalach": thalach, "exang": exang,
         "oldpeak": oldpeak, "slope": slope, "ca": ca, "thal": thal,
-        "model": model_choice          # ← was missing in original
+        "model": model_choice,         # ← was missing in original
+        "encoding": "form",            # 0-based codes above; the backend maps them to the training codes
     }
 
     try:
         with st.spinner("Analyzing patient data…"):
-            response = requests.post("http://127.0.0.1:5000/predict", json=data, timeout=10)
-            response.raise_for_status()
-            result      = response.json()
+            # Ensemble scores every model in one call and stores a single record
+            endpoint = "/predict/ensemble" if model_choice == "ensemble" else "/predict"
+            result      = api_client.predict(endpoint, data)
             probability = result["probability"]
             pct         = probability * 100
 
@@ -322,6 +325,51 @@ if predict_clicked:
                 </p>
             </div>""", unsafe_allow_html=True)
 
+            if "models" in result:
+                rows = "".join(
+                    f"<span style='color:#64748B;'>{name.replace('_', ' ').title()}:</span> "
+                    f"{info['probability']*100:.1f}% "
+                    f"<span style='color:#334155;'>(w={result['weights'][name]:.2f})</span><br>"
+                    for name, info in result["models"].items()
+                )
+                st.markdown(f"""
+                <div style="background:rgba(255,255,255,0.03); border:1px solid rgba(255,255,255,0.06);
+                            border-radius:12px; padding:16px 20px; margin-top:12px;">
+                    <p style="font-size:11px; color:#475569; font-weight:600; letter-spacing:0.1em;
+                               text-transform:uppercase; margin-bottom:10px;">Per-Model Scores</p>
+                    <p style="font-size:13px; color:#94A3B8; margin:0;">{rows}</p>
+                </div>""", unsafe_allow_html=True)
+
+        # ── Per-patient attributions ───────────────────────────
+        if model_choice != "ensemble":
+            try:
+                exp = api_client.explain(data)
+                contribs = sorted(exp["contributions"].items(), key=lambda kv: abs(kv[1]))
+                unit = "probability" if exp["output_space"] == "probability" else "log-odds"
+
+                st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
+                st.markdown('<p class="section-header">Why This Score</p>', unsafe_allow_html=True)
+                st.markdown(f'<p class="section-sub">Per-feature contribution to this prediction '
+                            f'({unit} of the raw model output, before calibration, relative to a baseline of '
+                            f'{exp["base_value"]:.3f}).</p>',
+                            unsafe_allow_html=True)
+
+                fig_exp = go.Figure(go.Bar(
+                    x=[v for _, v in contribs], y=[k for k, _ in contribs], orientation="h",
+                    marker=dict(color=["#F87171" if v > 0 else "#34D399" for _, v in contribs]),
+                    hovertemplate="<b>%{y}</b><br>%{x:+.4f}<extra></extra>",
+                ))
+                fig_exp.update_layout(
+                    paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+                    margin=dict(t=10, b=10, l=20, r=20), height=360,
+                    font=dict(family='DM Sans', color='#64748B'),
+                    xaxis=dict(gridcolor='rgba(255,255,255,0.05)', zerolinecolor='rgba(255,255,255,0.15)'),
+                    yaxis=dict(tickfont=dict(size=11, color='#94A3B8')),
+                )
+                st.plotly_chart(fig_exp, use_container_width=True)
+            except Exception:
+                pass    # attributions are optional — the prediction above still stands
+
     except requests.exceptions.ConnectionError:
         st.markdown("""
         <div style="background:rgba(220,38,38,0.08); border:1px solid rgba(220,38,38,0.25);
@@ -1,10 +1,13 @@
 import streamlit as st
-import requests
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 
+from api_client import API_URL, fetch_prepared_history, fetch_timeline, live_version, start_live_feed
+from history_frame import RISK_COLORS
+import chart_data
+
 st.set_page_config(page_title="CardioScan · Analytics", layout="wide", page_icon="📊")
 
 st.markdown("""
@@ -39,15 +42,7 @@ html, body, [class*="css"] { font-family:'DM Sans',sans-serif; background-color:
 PLOT_CONFIG = dict(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
                    font=dict(family='DM Sans', color='#64748B'), margin=dict(t=20, b=20, l=10, r=10))
 GRID_STYLE  = dict(gridcolor='rgba(255,255,255,0.05)', zerolinecolor='rgba(255,255,255,0.05)')
-
-
-# ─────────────────────────────────────────────
-# CACHED DATA FETCH
-# ─────────────────────────────────────────────
-@st.cache_data(ttl=30, show_spinner=False)
-def fetch_history():
-    resp = requests.get("http://127.0.0.1:5000/history", timeout=5)
-    return resp.json()
+TIMELINE_POINTS = 800   # ≈ one point per pixel of the 2/3-width timeline column
 
 
 # ── Hero ───────────────────────────────────────────────────────
@@ -56,19 +51,29 @@ st.markdown('<h1 class="hero-title">Cardiac Risk <span>Analytics</span></h1>', u
 st.markdown('<p class="hero-subtitle">Real-time overview of all prediction results and patient risk trends.</p>',
             unsafe_allow_html=True)
 
-if st.button("↻  Refresh data", type="secondary"):
-    st.cache_data.clear()
-    st.rerun()
+force_refresh = st.button("↻  Refresh data", type="secondary")
 
 
 # ── Data Fetch ─────────────────────────────────────────────────
+start_live_feed()
+seen_version = live_version()
 try:
-    data = fetch_history()
+    df, summary = fetch_prepared_history(force=force_refresh)
 except Exception:
-    data = []
-    st.error("⚠  Backend unreachable. Start Flask at http://127.0.0.1:5000")
+    df, summary = pd.DataFrame(), None
+    st.error(f"⚠  Backend unreachable. Start Flask at {API_URL}")
+
+
+# Pushed predictions land in the shared history in the background;
+# this only reruns the page once something new has actually arrived
+@st.fragment(run_every="2s")
+def watch_live_updates():
+    if live_version() != seen_version:
+        st.rerun()
+
+watch_live_updates()
 
-if not data:
+if df.empty:
     st.markdown("""
     <div class="empty-state">
         <div class="empty-icon">🫀</div>
@@ -78,19 +83,12 @@ if not data:
     st.stop()
 
 
-# ── Prepare DataFrame ──────────────────────────────────────────
-df = pd.DataFrame(data)
-df["risk_category"] = df["probability"].apply(
-    lambda x: "Low" if x < 0.3 else ("Moderate" if x < 0.6 else "High")
-)
-df["timestamp"] = pd.to_datetime(df["timestamp"])
-df = df.sort_values("timestamp")
-
-total    = len(df)
-high     = len(df[df["risk_category"] == "High"])
-moderate = len(df[df["risk_category"] == "Moderate"])
-low      = len(df[df["risk_category"] == "Low"])
-avg_risk = df["probability"].mean()
+# ── Summary (df is already prepared — see history_frame.py) ───
+total    = summary["total"]
+high     = summary["risk_counts"]["High"]
+moderate = summary["risk_counts"]["Moderate"]
+low      = summary["risk_counts"]["Low"]
+avg_risk = summary["avg_probability"]
 
 
 # ── KPI Cards ──────────────────────────────────────────────────
@@ -128,12 +126,13 @@ with c1:
     st.markdown('<p class="section-header">Risk Distribution</p>', unsafe_allow_html=True)
     st.markdown('<p class="section-sub">Breakdown of prediction outcomes.</p>', unsafe_allow_html=True)
 
-    risk_counts = df["risk_category"].value_counts().reset_index()
-    risk_counts.columns = ["category", "count"]
+    risk_counts = pd.DataFrame(
+        [(k, v) for k, v in summary["risk_counts"].items() if v], columns=["category", "count"]
+    )
 
     fig_pie = go.Figure(go.Pie(
         labels=risk_counts["category"], values=risk_counts["count"], hole=0.6,
-        marker=dict(colors=["#34D399", "#FBBF24", "#F87171"],
+        marker=dict(colors=[RISK_COLORS[c] for c in risk_counts["category"]],
                     line=dict(color='#0D0F14', width=3)),
         textfont=dict(family='DM Sans', size=13, color='#E8EAF0'),
         hovertemplate="<b>%{label}</b><br>Count: %{value}<br>Share: %{percent}<extra></extra>",
@@ -160,15 +159,17 @@ with c2:
                            annotation_text=lbl, annotation_font=dict(color=col, size=10),
                            annotation_position="right")
 
+    # Downsampled server-side (LTTB) so the payload stays bounded for any history size
+    timeline = fetch_timeline(TIMELINE_POINTS)
     for cat, color in color_map.items():
-        sub = df[df["risk_category"] == cat]
+        sub = timeline[timeline["risk_category"] == cat]
         fig_line.add_trace(go.Scatter(
             x=sub["timestamp"], y=sub["probability"], mode="markers", name=cat,
             marker=dict(color=color, size=8, opacity=0.9, line=dict(color='#0D0F14', width=1.5)),
             hovertemplate=f"<b>{cat} Risk</b><br>%{{x|%b %d, %H:%M}}<br>Score: %{{y:.2%}}<extra></extra>",
         ))
     fig_line.add_trace(go.Scatter(
-        x=df["timestamp"], y=df["probability"], mode="lines", name="Trend",
+        x=timeline["timestamp"], y=timeline["probability"], mode="lines", name="Trend",
         line=dict(color='rgba(255,255,255,0.12)', width=1.5), showlegend=False, hoverinfo='skip',
     ))
 
@@ -192,18 +193,18 @@ if "age" in df.columns and df["age"].notna().any():
         st.markdown('<p class="section-sub">Correlation between patient age and cardiac probability.</p>',
                     unsafe_allow_html=True)
 
-        df_age = df.dropna(subset=["age"]).copy()
-        df_age["age"] = pd.to_numeric(df_age["age"], errors="coerce")
-        df_age = df_age.dropna(subset=["age"])
+        # At most POINT_BUDGET points, stratified by risk band; the trend uses every row
+        df_age, coeffs, n_age = chart_data.scatter_sample(df, summary["version"], ("age", "probability"))
+        trace_cls = chart_data.scatter_cls(len(df_age))
 
         fig_age = go.Figure()
 
         # Scatter points coloured by risk category — no statsmodels needed
-        for cat, color in {"Low": "#34D399", "Moderate": "#FBBF24", "High": "#F87171"}.items():
+        for cat, color in RISK_COLORS.items():
             sub = df_age[df_age["risk_category"] == cat]
             if len(sub) == 0:
                 continue
-            fig_age.add_trace(go.Scatter(
+            fig_age.add_trace(trace_cls(
                 x=sub["age"], y=sub["probability"],
                 mode="markers", name=cat,
                 marker=dict(color=color, size=9, opacity=0.85,
@@ -212,11 +213,8 @@ if "age" in df.columns and df["age"].notna().any():
             ))
 
         # Manual OLS trendline using numpy — no statsmodels dependency
-        if len(df_age) >= 2:
-            x_vals = df_age["age"].values.astype(float)
-            y_vals = df_age["probability"].values.astype(float)
-            coeffs = np.polyfit(x_vals, y_vals, 1)
-            x_line = np.linspace(x_vals.min(), x_vals.max(), 100)
+        if coeffs is not None:
+            x_line = np.linspace(df_age["age"].min(), df_age["age"].max(), 100)
             y_line = np.polyval(coeffs, x_line)
             fig_age.add_trace(go.Scatter(
                 x=x_line, y=y_line,
@@ -224,6 +222,8 @@ if "age" in df.columns and df["age"].notna().any():
                 line=dict(color='rgba(255,255,255,0.2)', width=2, dash='dot'),
                 hoverinfo='skip', showlegend=False,
             ))
+        if len(df_age) < n_age:
+            st.caption(f"Showing a stratified sample of {len(df_age):,} of {n_age:,} predictions.")
 
         fig_age.update_layout(**PLOT_CONFIG, height=280,
             xaxis=dict(title="Age", **GRID_STYLE, tickfont=dict(size=11)),
@@ -236,23 +236,23 @@ if "chol" in df.columns and df["chol"].notna().any():
         st.markdown('<p class="section-header">Cholesterol Distribution</p>', unsafe_allow_html=True)
         st.markdown('<p class="section-sub">Cholesterol levels segmented by risk category.</p>',
                     unsafe_allow_html=True)
+        # Violins from a KDE and box statistics computed here — no raw points are sent
+        dists = chart_data.group_distributions(df, summary["version"], "chol")
         fig_chol = go.Figure()
-        for cat, color in {"Low": "#34D399", "Moderate": "#FBBF24", "High": "#F87171"}.items():
-            sub = df[df["risk_category"] == cat].dropna(subset=["chol"])
-            if len(sub) == 0:
-                continue
-            h    = color.lstrip('#')
-            fill = f"rgba({int(h[0:2],16)},{int(h[2:4],16)},{int(h[4:6],16)},0.15)"
-            fig_chol.add_trace(go.Violin(
-                x=sub["risk_category"], y=sub["chol"], name=cat,
-                box_visible=True, meanline_visible=True,
-                fillcolor=fill, line_color=color, points="outliers",
+        for pos, (cat, dist) in enumerate(dists.items()):
+            color = RISK_COLORS[cat]
+            h     = color.lstrip('#')
+            fill  = f"rgba({int(h[0:2],16)},{int(h[2:4],16)},{int(h[4:6],16)},0.15)"
+            fig_chol.add_trace(chart_data.violin_trace(dist, pos, color, fill, name=cat, legendgroup=cat))
+            fig_chol.add_trace(chart_data.box_trace(
+                dist["stats"], pos, color, 'rgba(0,0,0,0)', name=cat, legendgroup=cat,
+                width=0.12, boxmean=True, showlegend=False,
             ))
         fig_chol.update_layout(**PLOT_CONFIG, height=280,
-            xaxis=dict(**GRID_STYLE, tickfont=dict(size=11)),
+            xaxis=dict(**GRID_STYLE, tickfont=dict(size=11),
+                       tickvals=list(range(len(dists))), ticktext=list(dists)),
             yaxis=dict(title="Cholesterol (mg/dl)", **GRID_STYLE, tickfont=dict(size=11)),
-            legend=dict(bgcolor='rgba(0,0,0,0)', font=dict(color='#94A3B8', size=11)),
-            violingap=0.3)
+            legend=dict(bgcolor='rgba(0,0,0,0)', font=dict(color='#94A3B8', size=11)))
         st.plotly_chart(fig_chol, use_container_width=True)
 
 st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
@@ -1,10 +1,7 @@
 import streamlit as st
-import joblib
-import matplotlib.pyplot as plt
-import json
-import seaborn as sns
-import numpy as np
-import os
+import plotly.graph_objects as go
+
+from api_client import fetch_model_cards
 
 st.set_page_config(page_title="CardioScan · Model Performance", layout="wide", page_icon="📈")
 
@@ -146,23 +143,13 @@ html, body, [class*="css"] {
 </style>
 """, unsafe_allow_html=True)
 
-# ── Matplotlib dark theme ─────────────────────
-DARK_BG   = "#0D0F14"
-SURFACE   = "#141820"
-BORDER    = "#1E293B"
-TEXT_MUT  = "#475569"
-TEXT_MAIN = "#CBD5E1"
-
-def apply_dark_style(fig, ax_list):
-    fig.patch.set_facecolor(DARK_BG)
-    for ax in (ax_list if isinstance(ax_list, list) else [ax_list]):
-        ax.set_facecolor(SURFACE)
-        ax.tick_params(colors=TEXT_MUT, labelsize=10)
-        ax.xaxis.label.set_color(TEXT_MUT)
-        ax.yaxis.label.set_color(TEXT_MUT)
-        ax.title.set_color(TEXT_MAIN)
-        for spine in ax.spines.values():
-            spine.set_edgecolor(BORDER)
+PLOT_CFG = dict(
+    paper_bgcolor='rgba(0,0,0,0)',
+    plot_bgcolor='rgba(0,0,0,0)',
+    font=dict(family='DM Sans', color='#64748B'),
+    margin=dict(t=24, b=24, l=10, r=10),
+)
+GRID = dict(gridcolor='rgba(255,255,255,0.05)', zerolinecolor='rgba(255,255,255,0.04)')
 
 
 # ── Hero ──────────────────────────────────────
@@ -171,14 +158,26 @@ st.markdown('<h1 class="hero-title">Performance <span>Metrics</span></h1>', unsa
 st.markdown('<p class="hero-subtitle">Detailed evaluation of trained cardiac risk models — accuracy, curves, and feature analysis.</p>', unsafe_allow_html=True)
 
 
-# ── Load Metrics ──────────────────────────────
-try:
-    with open("../model/metrics.json") as f:
-        metrics = json.load(f)
-except Exception:
-    st.error("⚠  `metrics.json` not found. Please re-run the training script.")
+# ── Load Model Cards ──────────────────────────
+cards = fetch_model_cards()
+if not cards:
+    st.error("⚠  No model cards found. Please re-run the training script.")
     st.stop()
 
+names = sorted(cards, key=lambda n: not cards[n].get("is_best"))
+model_choice = st.selectbox(
+    "Select model", names,
+    format_func=lambda n: cards[n]["display_name"] + ("  ★ best" if cards[n].get("is_best") else ""),
+    label_visibility="collapsed"
+)
+card = cards[model_choice]
+st.markdown(
+    f"<p style='font-size:12px; color:#475569; margin-top:4px; margin-bottom:20px;'>"
+    f"Showing: <strong style='color:#94A3B8'>{card['display_name']}</strong> · "
+    f"evaluated on {card['n_test']} held-out patients</p>",
+    unsafe_allow_html=True
+)
+
 
 # ── KPI Cards ─────────────────────────────────
 st.markdown('<p class="section-header">Evaluation Metrics</p>', unsafe_allow_html=True)
@@ -192,6 +191,7 @@ METRIC_META = [
     ("ROC-AUC",   "roc_auc",   "#60A5FA", "Area under the receiver operating curve"),
 ]
 
+metrics = card["metrics"]
 cols = st.columns(5, gap="medium")
 for col, (label, key, color, desc) in zip(cols, METRIC_META):
     val  = metrics.get(key, 0)
@@ -204,6 +204,24 @@ for col, (label, key, color, desc) in zip(cols, METRIC_META):
     </div>
     """, unsafe_allow_html=True)
 
+# ── Calibration ───────────────────────────────
+cal = card.get("calibration")
+if cal and cal["method"] == "identity":
+    rejected = cal.get("rejected") or {}
+    st.caption(
+        "Served probabilities are the model's raw output: the calibration map fitted in training did not "
+        "lower held-out Brier score and log loss"
+        + (f" (Brier {rejected['brier_raw']:.4f} → {rejected['brier']:.4f} · log loss "
+           f"{rejected['log_loss_raw']:.4f} → {rejected['log_loss']:.4f})." if rejected else ".")
+    )
+elif cal:
+    st.caption(
+        f"Served probabilities are calibrated ({'Platt / sigmoid' if cal['method'] == 'sigmoid' else 'isotonic'}, "
+        f"{cal['knots']}-knot lookup table fitted on out-of-fold predictions). Held-out Brier score "
+        f"{cal['brier_raw']:.4f} → {cal['brier']:.4f} · log loss {cal['log_loss_raw']:.4f} → {cal['log_loss']:.4f} "
+        f"· expected calibration error {cal['ece_raw']:.4f} → {cal['ece']:.4f} (raw → calibrated)."
+    )
+
 st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
 
 
@@ -211,53 +229,75 @@ st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
 roc_col, cm_col = st.columns(2, gap="large")
 
 with roc_col:
-    st.markdown('<p class="section-header">ROC Curve</p>', unsafe_allow_html=True)
-    st.markdown('<p class="section-sub">True positive rate vs. false positive rate across thresholds.</p>', unsafe_allow_html=True)
-
-    roc_path = "../model/roc_curve.png"
-    if os.path.exists(roc_path):
-        st.image(roc_path, use_container_width=True)
-    else:
-        st.markdown("""
-        <div class="empty-state">
-            <div style="font-size:36px;">📈</div>
-            <p>ROC curve image not found.<br>Re-run the training script to generate it.</p>
-        </div>""", unsafe_allow_html=True)
+    st.markdown('<p class="section-header">ROC & Precision-Recall</p>', unsafe_allow_html=True)
+    st.markdown('<p class="section-sub">Classifier trade-offs across every decision threshold.</p>', unsafe_allow_html=True)
+
+    roc_tab, pr_tab = st.tabs(["ROC", "Precision-Recall"])
+
+    with roc_tab:
+        roc = card["roc"]
+        fig_roc = go.Figure()
+        fig_roc.add_trace(go.Scatter(
+            x=[0, 1], y=[0, 1], mode="lines", showlegend=False, hoverinfo="skip",
+            line=dict(color='rgba(255,255,255,0.15)', width=1, dash='dash'),
+        ))
+        fig_roc.add_trace(go.Scatter(
+            x=roc["fpr"], y=roc["tpr"], customdata=roc["thresholds"],
+            mode="lines", name=f"AUC = {metrics['roc_auc']:.3f}",
+            line=dict(color="#818CF8", width=2.5, shape="hv"),
+            fill="tozeroy", fillcolor="rgba(129,140,248,0.08)",
+            hovertemplate="FPR %{x:.2f} · TPR %{y:.2f}<br>threshold %{customdata:.2f}<extra></extra>",
+        ))
+        fig_roc.update_layout(
+            **PLOT_CFG, height=300,
+            xaxis=dict(**GRID, title="False Positive Rate", range=[0, 1], tickfont=dict(size=11)),
+            yaxis=dict(**GRID, title="True Positive Rate", range=[0, 1.02], tickfont=dict(size=11)),
+            legend=dict(x=0.55, y=0.08, bgcolor='rgba(0,0,0,0)', font=dict(size=12, color='#94A3B8')),
+        )
+        st.plotly_chart(fig_roc, use_container_width=True)
+
+    with pr_tab:
+        pr = card.get("pr")
+        if pr:
+            fig_pr = go.Figure(go.Scatter(
+                x=pr["recall"], y=pr["precision"], customdata=pr["thresholds"],
+                mode="lines", name=f"AP = {metrics.get('average_precision', 0):.3f}",
+                line=dict(color="#34D399", width=2.5, shape="hv"),
+                hovertemplate="Recall %{x:.2f} · Precision %{y:.2f}<br>threshold %{customdata:.2f}<extra></extra>",
+            ))
+            fig_pr.update_layout(
+                **PLOT_CFG, height=300, showlegend=True,
+                xaxis=dict(**GRID, title="Recall", range=[0, 1], tickfont=dict(size=11)),
+                yaxis=dict(**GRID, title="Precision", range=[0, 1.02], tickfont=dict(size=11)),
+                legend=dict(x=0.05, y=0.08, bgcolor='rgba(0,0,0,0)', font=dict(size=12, color='#94A3B8')),
+            )
+            st.plotly_chart(fig_pr, use_container_width=True)
+        else:
+            st.markdown("""
+            <div class="empty-state">
+                <div style="font-size:36px;">📈</div>
+                <p>This card has no precision-recall data.<br>Re-run the training script to generate it.</p>
+            </div>""", unsafe_allow_html=True)
 
 with cm_col:
     st.markdown('<p class="section-header">Confusion Matrix</p>', unsafe_allow_html=True)
     st.markdown('<p class="section-sub">Actual vs. predicted classifications across both classes.</p>', unsafe_allow_html=True)
 
-    cm_path = "../model/confusion_matrix.npy"
-    if os.path.exists(cm_path):
-        cm = np.load(cm_path)
-        fig_cm, ax_cm = plt.subplots(figsize=(5, 4))
-        apply_dark_style(fig_cm, ax_cm)
-
-        from matplotlib.colors import LinearSegmentedColormap
-        indigo_cmap = LinearSegmentedColormap.from_list(
-            "indigo_dark", ["#141820", "#312E81", "#818CF8"]
-        )
-        sns.heatmap(
-            cm, annot=True, fmt="d",
-            cmap=indigo_cmap,
-            linewidths=2, linecolor=DARK_BG,
-            ax=ax_cm, cbar=False,
-            annot_kws={"size": 20, "weight": "bold", "color": "#F1F5F9"},
-        )
-        ax_cm.set_xlabel("Predicted Label", labelpad=10)
-        ax_cm.set_ylabel("Actual Label", labelpad=10)
-        ax_cm.set_xticklabels(["No Disease", "Disease"], color=TEXT_MUT)
-        ax_cm.set_yticklabels(["No Disease", "Disease"], color=TEXT_MUT, rotation=0)
-        fig_cm.tight_layout(pad=1.5)
-        st.pyplot(fig_cm)
-        plt.close(fig_cm)
-    else:
-        st.markdown("""
-        <div class="empty-state">
-            <div style="font-size:36px;">📊</div>
-            <p>Confusion matrix not found.<br>Re-run the training script to generate it.</p>
-        </div>""", unsafe_allow_html=True)
+    cm = card["confusion_matrix"]
+    labels = ["No Disease", "Disease"]
+    fig_cm = go.Figure(go.Heatmap(
+        z=cm, x=labels, y=labels, showscale=False, xgap=4, ygap=4,
+        colorscale=[[0, "#141820"], [0.5, "#312E81"], [1, "#818CF8"]],
+        text=cm, texttemplate="%{text}",
+        textfont=dict(size=24, color="#F1F5F9", family="DM Sans"),
+        hovertemplate="Actual %{y}<br>Predicted %{x}<br>%{z} patients<extra></extra>",
+    ))
+    fig_cm.update_layout(
+        **PLOT_CFG, height=340,
+        xaxis=dict(title="Predicted Label", tickfont=dict(size=11), side="bottom"),
+        yaxis=dict(title="Actual Label", tickfont=dict(size=11), autorange="reversed"),
+    )
+    st.plotly_chart(fig_cm, use_container_width=True)
 
 st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
 
@@ -266,76 +306,27 @@ st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
 st.markdown('<p class="section-header">Feature Importance</p>', unsafe_allow_html=True)
 st.markdown('<p class="section-sub">Which clinical variables drive the model\'s predictions most?</p>', unsafe_allow_html=True)
 
-model_choice = st.selectbox(
-    "Select model",
-    ["random_forest", "gradient_boosting", "logistic_regression"],
-    label_visibility="collapsed"
-)
-st.markdown(
-    f"<p style='font-size:12px; color:#475569; margin-top:4px; margin-bottom:20px;'>"
-    f"Showing: <strong style='color:#94A3B8'>{model_choice.replace('_', ' ').title()}</strong></p>",
-    unsafe_allow_html=True
-)
-
-FEATURES = ["age","sex","cp","trestbps","chol","fbs",
-            "restecg","thalach","exang","oldpeak","slope","ca","thal"]
-
-model_path = f"../model/{model_choice}.pkl"
-
-try:
-    model = joblib.load(model_path)
-
-    if hasattr(model, "feature_importances_"):
-        scores = model.feature_importances_
-        label  = "Feature Importance"
-    elif hasattr(model, "coef_"):
-        scores = np.abs(model.coef_[0])
-        label  = "Coefficient Magnitude"
-    else:
-        scores = None
-
-    if scores is not None:
-        sorted_idx  = np.argsort(scores)
-        feat_names  = np.array(FEATURES)[sorted_idx]
-        feat_scores = scores[sorted_idx]
-
-        norm       = (feat_scores - feat_scores.min()) / (feat_scores.max() - feat_scores.min() + 1e-9)
-        bar_colors = plt.cm.get_cmap("Blues")(0.3 + norm * 0.65)
-
-        fig_feat, ax_feat = plt.subplots(figsize=(10, 5))
-        apply_dark_style(fig_feat, ax_feat)
-
-        bars = ax_feat.barh(feat_names, feat_scores, color=bar_colors,
-                            height=0.65, edgecolor=DARK_BG, linewidth=0.5)
-
-        for bar, val in zip(bars, feat_scores):
-            ax_feat.text(
-                bar.get_width() + feat_scores.max() * 0.01,
-                bar.get_y() + bar.get_height() / 2,
-                f"{val:.3f}", va="center", ha="left",
-                fontsize=9, color=TEXT_MUT
-            )
-
-        ax_feat.set_xlabel(label, labelpad=10)
-        ax_feat.set_xlim(0, feat_scores.max() * 1.18)
-        ax_feat.tick_params(axis='y', labelsize=10, colors=TEXT_MUT)
-        ax_feat.grid(axis='x', color=BORDER, linestyle='--', linewidth=0.6, alpha=0.8)
-        ax_feat.set_axisbelow(True)
-        fig_feat.tight_layout(pad=2)
-
-        # ── Render directly — no wrapper div that causes the empty box ──
-        st.pyplot(fig_feat)
-        plt.close(fig_feat)
-
-    else:
-        st.warning("This model type does not expose feature importance or coefficients.")
-
-except FileNotFoundError:
-    st.markdown(f"""
-    <div class="empty-state">
-        <div style="font-size:36px;">🤖</div>
-        <p>Model file <code>{model_path}</code> not found.<br>Re-run the training script.</p>
-    </div>""", unsafe_allow_html=True)
+if card.get("importances"):
+    ranked = sorted(zip(card["feature_names"], card["importances"]), key=lambda kv: kv[1])
+    feat_names  = [k for k, _ in ranked]
+    feat_scores = [v for _, v in ranked]
+    top = max(feat_scores) or 1.0
+
+    fig_feat = go.Figure(go.Bar(
+        x=feat_scores, y=feat_names, orientation="h",
+        marker=dict(color=feat_scores, colorscale="Blues", cmin=-top * 0.45, cmax=top),
+        text=[f"{v:.3f}" for v in feat_scores], textposition="outside",
+        textfont=dict(size=10, color="#475569"),
+        hovertemplate="<b>%{y}</b><br>%{x:.4f}<extra></extra>",
+    ))
+    fig_feat.update_layout(
+        **PLOT_CFG, height=420,
+        xaxis=dict(**GRID, title=card["importance_kind"], range=[0, top * 1.18], tickfont=dict(size=11)),
+        yaxis=dict(tickfont=dict(size=11, color='#94A3B8')),
+    )
+    st.plotly_chart(fig_feat, use_container_width=True)
+else:
+    st.warning("This model type does not expose feature importance or coefficients.")
 
 st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
 
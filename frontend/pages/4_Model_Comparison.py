@@ -3,6 +3,8 @@ import json
 import pandas as pd
 import plotly.graph_objects as go
 
+from api_client import fetch_model_cards
+
 st.set_page_config(page_title="CardioScan · Model Comparison", layout="wide", page_icon="🏆")
 
 st.markdown("""
@@ -312,6 +314,56 @@ st.plotly_chart(fig_radar, use_container_width=True)
 st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
 
 
+# ── ROC / PR Overlay ───────────────────────────────────────────
+cards = fetch_model_cards()
+if cards:
+    st.markdown('<p class="section-header">ROC & Precision-Recall Curves</p>', unsafe_allow_html=True)
+    st.markdown('<p class="section-sub">Every model on the same held-out split — hover for the decision threshold at each point.</p>', unsafe_allow_html=True)
+
+    fig_roc = go.Figure(go.Scatter(
+        x=[0, 1], y=[0, 1], mode="lines", showlegend=False, hoverinfo="skip",
+        line=dict(color='rgba(255,255,255,0.15)', width=1, dash='dash'),
+    ))
+    fig_pr = go.Figure()
+    for i, (name, card) in enumerate(cards.items()):
+        color = MODEL_COLORS.get(name, DEFAULT_COLORS[i % len(DEFAULT_COLORS)])
+        display = card["display_name"]
+        fig_roc.add_trace(go.Scatter(
+            x=card["roc"]["fpr"], y=card["roc"]["tpr"], customdata=card["roc"]["thresholds"],
+            mode="lines", name=f"{display} · AUC {card['metrics']['roc_auc']:.3f}",
+            line=dict(color=color, width=2, shape="hv"),
+            hovertemplate="FPR %{x:.2f} · TPR %{y:.2f}<br>threshold %{customdata:.2f}<extra>" + display + "</extra>",
+        ))
+        if card.get("pr"):
+            fig_pr.add_trace(go.Scatter(
+                x=card["pr"]["recall"], y=card["pr"]["precision"], customdata=card["pr"]["thresholds"],
+                mode="lines", name=f"{display} · AP {card['metrics'].get('average_precision', 0):.3f}",
+                line=dict(color=color, width=2, shape="hv"),
+                hovertemplate="Recall %{x:.2f} · Precision %{y:.2f}<br>threshold %{customdata:.2f}<extra>" + display + "</extra>",
+            ))
+
+    curve_legend = dict(orientation="h", y=-0.2, x=0.5, xanchor='center',
+                        font=dict(size=11, color='#94A3B8'), bgcolor='rgba(0,0,0,0)')
+    fig_roc.update_layout(
+        **PLOT_CFG, height=340, legend=curve_legend,
+        xaxis=dict(**GRID, title="False Positive Rate", range=[0, 1]),
+        yaxis=dict(**GRID, title="True Positive Rate", range=[0, 1.02]),
+    )
+    fig_pr.update_layout(
+        **PLOT_CFG, height=340, legend=curve_legend,
+        xaxis=dict(**GRID, title="Recall", range=[0, 1]),
+        yaxis=dict(**GRID, title="Precision", range=[0, 1.02]),
+    )
+
+    roc_col, pr_col = st.columns(2, gap="large")
+    with roc_col:
+        st.plotly_chart(fig_roc, use_container_width=True)
+    with pr_col:
+        st.plotly_chart(fig_pr, use_container_width=True)
+
+    st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
+
+
 # ── Ranking Table ──────────────────────────────────────────────
 metric_options = {"Accuracy": "Accuracy", "ROC-AUC": "ROC_AUC"}
 sort_by_label  = st.selectbox("Rank by", list(metric_options.keys()), label_visibility="collapsed")
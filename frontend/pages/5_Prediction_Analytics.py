@@ -1,9 +1,11 @@
 import streamlit as st
-import requests
-import pandas as pd
 import plotly.graph_objects as go
 import numpy as np
 
+from api_client import API_URL, fetch_prepared_history, fetch_timeline
+from history_frame import RISK_COLORS
+import chart_data
+
 st.set_page_config(page_title="CardioScan · Prediction Analytics", layout="wide", page_icon="📈")
 
 st.markdown("""
@@ -133,6 +135,7 @@ PLOT_CFG = dict(
     margin=dict(t=24, b=24, l=10, r=10),
 )
 GRID = dict(gridcolor='rgba(255,255,255,0.05)', zerolinecolor='rgba(255,255,255,0.04)')
+TIMELINE_POINTS = 800   # ≈ one point per pixel of the 2/3-width timeline column
 
 
 # ── Helper: convert #RRGGBB → rgba(r,g,b,alpha) ────────────────
@@ -157,18 +160,17 @@ st.markdown('<p class="hero-subtitle">Aggregated risk scores and temporal trends
 
 # ── Data Fetch ─────────────────────────────────────────────────
 try:
-    response = requests.get("http://127.0.0.1:5000/history", timeout=5)
-    records  = response.json()
+    df, summary = fetch_prepared_history()
 except Exception:
-    st.markdown("""
+    st.markdown(f"""
     <div class="empty-state">
         <div class="empty-state-icon">⚡</div>
         <div class="empty-state-title">Backend Unreachable</div>
-        <div class="empty-state-desc">Start the Flask server at <code>http://127.0.0.1:5000</code> and refresh.</div>
+        <div class="empty-state-desc">Start the Flask server at <code>{API_URL}</code> and refresh.</div>
     </div>""", unsafe_allow_html=True)
     st.stop()
 
-if len(records) == 0:
+if df.empty:
     st.markdown("""
     <div class="empty-state">
         <div class="empty-state-icon">🫀</div>
@@ -179,17 +181,10 @@ if len(records) == 0:
 
 
 # ── Prepare Data ───────────────────────────────────────────────
-df = pd.DataFrame(records)
-df["risk_percent"] = df["probability"] * 100
-df["timestamp"]    = pd.to_datetime(df["timestamp"])
-df["risk_label"]   = df["risk_percent"].apply(
-    lambda x: "Low" if x < 30 else ("Moderate" if x < 60 else "High")
-)
-df = df.sort_values("timestamp").reset_index(drop=True)
-
-total    = len(df)
-avg_risk = df["risk_percent"].mean()
-high_n   = len(df[df["risk_percent"] > 60])
+# df arrives sorted, with risk_percent / risk_category — see history_frame.py
+total    = summary["total"]
+avg_risk = summary["avg_probability"] * 100
+high_n   = summary["risk_counts"]["High"]
 recent   = df["risk_percent"].iloc[-1]
 
 
@@ -252,7 +247,8 @@ with time_col:
     st.markdown('<p class="section-header">Risk Score Over Time</p>', unsafe_allow_html=True)
     st.markdown('<p class="section-sub">Individual prediction scores and rolling average trend.</p>', unsafe_allow_html=True)
 
-    rolling  = df["risk_percent"].rolling(window=max(1, total//5), min_periods=1).mean()
+    # Downsampled server-side (LTTB); the rolling mean is taken over every record first
+    timeline = fetch_timeline(TIMELINE_POINTS, rolling=max(1, total//5))
     color_map = {"Low": "#34D399", "Moderate": "#FBBF24", "High": "#F87171"}
 
     fig_time = go.Figure()
@@ -267,10 +263,10 @@ with time_col:
                            annotation_position="right")
 
     for label, color in color_map.items():
-        mask = df["risk_label"] == label
+        mask = timeline["risk_category"] == label
         fig_time.add_trace(go.Scatter(
-            x=df.loc[mask, "timestamp"],
-            y=df.loc[mask, "risk_percent"],
+            x=timeline.loc[mask, "timestamp"],
+            y=timeline.loc[mask, "risk_percent"],
             mode="markers", name=label,
             marker=dict(color=color, size=8, opacity=0.85,
                         line=dict(color='#0D0F14', width=1.5)),
@@ -278,7 +274,7 @@ with time_col:
         ))
 
     fig_time.add_trace(go.Scatter(
-        x=df["timestamp"], y=rolling,
+        x=timeline["timestamp"], y=timeline["rolling"] * 100,
         mode="lines", name="Rolling avg",
         line=dict(color='rgba(255,255,255,0.2)', width=2),
         hoverinfo='skip', showlegend=True,
@@ -342,19 +338,13 @@ with box_col:
     st.markdown('<p class="section-header">Risk by Category</p>', unsafe_allow_html=True)
     st.markdown('<p class="section-sub">Score spread within each risk classification.</p>', unsafe_allow_html=True)
 
+    # Quartiles, fences and mean/sd computed here — the chart carries no raw points
+    dists = chart_data.group_distributions(df, summary["version"], "risk_percent")
     fig_box = go.Figure()
-    for label, color in [("Low","#34D399"), ("Moderate","#FBBF24"), ("High","#F87171")]:
-        sub = df[df["risk_label"] == label]["risk_percent"]
-        if len(sub) == 0:
-            continue
-        fig_box.add_trace(go.Box(
-            y=sub, name=label,
-            marker=dict(color=color, size=5, line=dict(color='#0D0F14', width=1)),
-            line=dict(color=color),
-            # ✔ FIX: use proper hex_rgba() instead of broken .replace() hack
-            fillcolor=hex_rgba(color, 0.10),
-            boxmean='sd',
-            hovertemplate="<b>" + label + "</b><br>%{y:.1f}%<extra></extra>",
+    for label, dist in dists.items():
+        color = RISK_COLORS[label]
+        fig_box.add_trace(chart_data.box_trace(
+            dist["stats"], label, color, hex_rgba(color, 0.10), name=label, boxmean='sd',
         ))
 
     fig_box.update_layout(
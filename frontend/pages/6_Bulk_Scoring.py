@@ -0,0 +1,139 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+
+from api_client import API_URL
+from bulk_scoring import BulkJob, CHUNK_ROWS, FEATURE_COLUMNS
+from history_frame import RISK_COLORS
+
+st.set_page_config(page_title="CardioScan · Bulk Scoring", layout="wide", page_icon="📂")
+
+st.markdown("""
+<style>
+@import url('https://fonts.googleapis.com/css2?family=DM+Serif+Display&family=DM+Sans:wght@300;400;500;600&display=swap');
+html, body, [class*="css"] { font-family:'DM Sans',sans-serif; background-color:#0D0F14; color:#E8EAF0; }
+[data-testid="stAppViewContainer"] { background:radial-gradient(ellipse 70% 40% at 50% -5%,rgba(96,165,250,0.10) 0%,#0D0F14 55%); }
+#MainMenu, footer, header { visibility:hidden; }
+.hero-badge { display:inline-block; background:rgba(96,165,250,0.10); border:1px solid rgba(96,165,250,0.30); border-radius:999px; padding:4px 14px; font-size:11px; font-weight:600; letter-spacing:0.12em; text-transform:uppercase; color:#93C5FD; margin-bottom:14px; }
+.hero-title { font-family:'DM Serif Display',serif; font-size:clamp(30px,4vw,54px); font-weight:400; line-height:1.1; letter-spacing:-0.02em; margin:0 0 8px 0; color:#F1F5F9; }
+.hero-title span { color:#93C5FD; }
+.hero-subtitle { font-size:14px; color:#475569; font-weight:300; margin:0 0 36px 0; }
+.fancy-divider { border:none; height:1px; background:linear-gradient(90deg,transparent,rgba(255,255,255,0.07),transparent); margin:36px 0; }
+.kpi-card { background:rgba(255,255,255,0.03); border:1px solid rgba(255,255,255,0.06); border-radius:16px; padding:24px 22px 20px; }
+.kpi-label { font-size:11px; font-weight:600; letter-spacing:0.12em; text-transform:uppercase; color:#475569; margin-bottom:10px; }
+.kpi-value { font-family:'DM Serif Display',serif; font-size:40px; font-weight:400; line-height:1; color:#F1F5F9; }
+.kpi-sub { font-size:12px; color:#334155; margin-top:6px; }
+.section-header { font-family:'DM Serif Display',serif; font-size:22px; color:#F1F5F9; margin:0 0 2px 0; }
+.section-sub { font-size:13px; color:#475569; margin-bottom:20px; }
+</style>
+""", unsafe_allow_html=True)
+
+PLOT_CONFIG = dict(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+                   font=dict(family='DM Sans', color='#64748B'), margin=dict(t=20, b=20, l=10, r=10))
+GRID_STYLE  = dict(gridcolor='rgba(255,255,255,0.05)', zerolinecolor='rgba(255,255,255,0.05)')
+ENCODINGS   = {"uci": "Dataset (cp 1-4, thal 3/6/7)", "form": "Predict form (cp 0-3, thal 0-3)"}
+
+
+# ── Hero ───────────────────────────────────────────────────────
+st.markdown('<div class="hero-badge">Bulk Scoring</div>', unsafe_allow_html=True)
+st.markdown('<h1 class="hero-title">Score an <span>Intake File</span></h1>', unsafe_allow_html=True)
+st.markdown('<p class="hero-subtitle">Upload a CSV or Parquet file of patients and download it back with a risk score '
+            'for every row. Bulk results are not added to the prediction history.</p>', unsafe_allow_html=True)
+
+
+# ── Upload ─────────────────────────────────────────────────────
+u1, u2 = st.columns([3, 1], gap="large")
+with u1:
+    uploaded = st.file_uploader("Patient file", type=["csv", "parquet"])
+    st.caption("Required columns: " + ", ".join(FEATURE_COLUMNS) + ". Any other columns are kept in the output.")
+with u2:
+    model_choice = st.selectbox("Model", ["random_forest", "logistic_regression", "gradient_boosting"],
+                                format_func=lambda m: m.replace('_', ' ').title())
+    encoding_choice = st.selectbox("Categorical codes", list(ENCODINGS), format_func=ENCODINGS.get,
+                                   help="How cp, slope and thal are coded in the file")
+    start = st.button("Score file", type="primary", disabled=uploaded is None, use_container_width=True)
+
+job = st.session_state.get("bulk_job")
+if start and uploaded is not None:
+    if job is not None:
+        job.discard()
+    # The upload is streamed to the backend in CHUNK_ROWS-row requests from a
+    # background thread — this script only polls the job
+    job = BulkJob(uploaded.getvalue(), uploaded.name, model_choice, encoding_choice)
+    job.start()
+    st.session_state["bulk_job"] = job
+
+if job is None:
+    st.stop()
+
+st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
+
+
+# ── Progress ───────────────────────────────────────────────────
+@st.fragment(run_every="1s")
+def show_progress():
+    st.progress(job.progress, text=f"{job.filename} · {job.rows:,} rows scored "
+                                   f"· {job.elapsed:.1f} s · {CHUNK_ROWS:,}-row chunks")
+    if not job.done:
+        if st.button("Cancel", type="secondary"):
+            job.cancel()
+    elif st.session_state.get("bulk_job_shown") is not job:
+        # The job finished since the last full run — rerun to render the results
+        st.rerun()
+
+if job.done:
+    st.session_state["bulk_job_shown"] = job
+show_progress()
+
+if not job.done:
+    st.stop()
+
+if job.error:
+    st.error(f"⚠  Scoring stopped after {job.rows:,} rows: {job.error}  (backend: {API_URL})")
+    if job.rows == 0:
+        st.stop()
+
+
+# ── Summary ────────────────────────────────────────────────────
+summary = job.summary()
+k1, k2, k3, k4 = st.columns(4, gap="medium")
+cards = [
+    (k1, "Rows",          f"{summary['rows']:,}",                    f"{summary['rows_per_second']:,.0f} rows/s"),
+    (k2, "Scored",        f"{summary['scored']:,}",                  f"{summary['invalid']:,} invalid rows skipped"),
+    (k3, "High Risk",     f"{summary['risk_counts']['High']:,}",     f"{summary['risk_counts']['High'] / max(summary['scored'], 1) * 100:.0f}% of scored"),
+    (k4, "Avg. Risk",     f"{summary['avg_probability'] * 100:.1f}%", "Mean probability"),
+]
+for col, label, value, sub in cards:
+    with col:
+        st.markdown(f"""<div class="kpi-card"><div class="kpi-label">{label}</div>
+        <div class="kpi-value">{value}</div><div class="kpi-sub">{sub}</div></div>""",
+        unsafe_allow_html=True)
+
+if summary["invalid_fields"]:
+    st.caption("Rows skipped for missing or out-of-range values — "
+               + ", ".join(f"{name}: {n:,}" for name, n in summary["invalid_fields"].items()))
+
+st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
+
+c1, c2 = st.columns([1, 2], gap="large")
+with c1:
+    st.markdown('<p class="section-header">Risk Distribution</p>', unsafe_allow_html=True)
+    st.markdown('<p class="section-sub">Scored rows per risk category.</p>', unsafe_allow_html=True)
+    fig_bar = go.Figure(go.Bar(
+        x=list(summary["risk_counts"]), y=list(summary["risk_counts"].values()),
+        marker=dict(color=[RISK_COLORS[label] for label in summary["risk_counts"]]),
+        hovertemplate="<b>%{x}</b><br>%{y:,} patients<extra></extra>",
+    ))
+    fig_bar.update_layout(**PLOT_CONFIG, height=260,
+        xaxis=dict(**GRID_STYLE, tickfont=dict(size=12, color='#94A3B8')),
+        yaxis=dict(**GRID_STYLE, tickfont=dict(size=11)))
+    st.plotly_chart(fig_bar, use_container_width=True)
+
+with c2:
+    st.markdown('<p class="section-header">Scored File</p>', unsafe_allow_html=True)
+    st.markdown('<p class="section-sub">First rows of the output; the download has every row.</p>',
+                unsafe_allow_html=True)
+    st.dataframe(pd.read_csv(job.output_path, nrows=20), use_container_width=True, height=260)
+    with open(job.output_path, "rb") as f:
+        st.download_button("⬇  Download scored CSV", f, type="primary",
+                           file_name=job.filename.rsplit(".", 1)[0] + "_scored.csv", mime="text/csv")
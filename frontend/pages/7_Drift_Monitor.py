@@ -0,0 +1,155 @@
+import streamlit as st
+import plotly.graph_objects as go
+
+from api_client import API_URL, fetch_drift
+
+st.set_page_config(page_title="CardioScan · Drift Monitor", layout="wide", page_icon="📡")
+
+st.markdown("""
+<style>
+@import url('https://fonts.googleapis.com/css2?family=DM+Serif+Display&family=DM+Sans:wght@300;400;500;600&display=swap');
+html, body, [class*="css"] { font-family:'DM Sans',sans-serif; background-color:#0D0F14; color:#E8EAF0; }
+[data-testid="stAppViewContainer"] { background:radial-gradient(ellipse 70% 40% at 50% -5%,rgba(251,191,36,0.09) 0%,#0D0F14 55%); }
+#MainMenu, footer, header { visibility:hidden; }
+.hero-badge { display:inline-block; background:rgba(251,191,36,0.10); border:1px solid rgba(251,191,36,0.30); border-radius:999px; padding:4px 14px; font-size:11px; font-weight:600; letter-spacing:0.12em; text-transform:uppercase; color:#FCD34D; margin-bottom:14px; }
+.hero-title { font-family:'DM Serif Display',serif; font-size:clamp(30px,4vw,54px); font-weight:400; line-height:1.1; letter-spacing:-0.02em; margin:0 0 8px 0; color:#F1F5F9; }
+.hero-title span { color:#FCD34D; }
+.hero-subtitle { font-size:14px; color:#475569; font-weight:300; margin:0 0 36px 0; }
+.fancy-divider { border:none; height:1px; background:linear-gradient(90deg,transparent,rgba(255,255,255,0.07),transparent); margin:36px 0; }
+.kpi-card { background:rgba(255,255,255,0.03); border:1px solid rgba(255,255,255,0.06); border-radius:16px; padding:24px 22px 20px; }
+.kpi-label { font-size:11px; font-weight:600; letter-spacing:0.12em; text-transform:uppercase; color:#475569; margin-bottom:10px; }
+.kpi-value { font-family:'DM Serif Display',serif; font-size:40px; font-weight:400; line-height:1; color:var(--val-color, #F1F5F9); }
+.kpi-sub { font-size:12px; color:#334155; margin-top:6px; }
+.section-header { font-family:'DM Serif Display',serif; font-size:22px; color:#F1F5F9; margin:0 0 2px 0; }
+.section-sub { font-size:13px; color:#475569; margin-bottom:20px; }
+</style>
+""", unsafe_allow_html=True)
+
+PLOT_CONFIG = dict(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+                   font=dict(family='DM Sans', color='#64748B'), margin=dict(t=20, b=20, l=10, r=10))
+GRID_STYLE  = dict(gridcolor='rgba(255,255,255,0.05)', zerolinecolor='rgba(255,255,255,0.05)')
+STATUS_COLORS = {"stable": "#34D399", "moderate": "#FBBF24", "drift": "#F87171", "insufficient_data": "#475569"}
+STATUS_LABELS = {"stable": "Stable", "moderate": "Moderate", "drift": "Drift", "insufficient_data": "Too few rows"}
+WINDOWS = {"recent": "Recent predictions", "all": "Everything since startup"}
+
+
+# ── Hero ───────────────────────────────────────────────────────
+st.markdown('<div class="hero-badge">Monitoring</div>', unsafe_allow_html=True)
+st.markdown('<h1 class="hero-title">Input <span>Drift</span></h1>', unsafe_allow_html=True)
+st.markdown('<p class="hero-subtitle">How the patients being scored compare with the training data, feature by feature, '
+            'and how often requests arrive incomplete or invalid.</p>', unsafe_allow_html=True)
+
+
+# ── Load ───────────────────────────────────────────────────────
+w1, w2 = st.columns([3, 1], gap="large")
+with w2:
+    window = st.radio("Window", list(WINDOWS), format_func=WINDOWS.get, horizontal=True,
+                      label_visibility="collapsed")
+    st.button("Refresh", use_container_width=True)
+
+try:
+    report = fetch_drift(window)
+except Exception as e:
+    st.error(f"⚠  Drift monitoring unavailable ({API_URL}): {e}")
+    st.stop()
+
+features = report["features"]
+with w1:
+    span = (f"last {report['rows']:,} of up to {report['window_rows']:,} predictions"
+            if report["window_rows"] else f"{report['rows']:,} predictions since startup")
+    st.caption(f"Compared with {report['reference']['rows']} training patients · {span} · "
+               f"scores need at least {report['min_rows']} predictions.")
+
+
+# ── KPI Cards ──────────────────────────────────────────────────
+quality = report["data_quality"]
+drifting = [n for n, f in features.items() if f["status"] in ("moderate", "drift")]
+worst = max(features, key=lambda n: features[n]["psi"])
+k1, k2, k3, k4 = st.columns(4, gap="medium")
+cards = [
+    (k1, "Overall",       STATUS_LABELS[report["status"]], STATUS_COLORS[report["status"]], "Worst feature status"),
+    (k2, "Drifting",      f"{len(drifting)} / {len(features)}", "#F1F5F9",
+     ", ".join(drifting) if drifting else "No feature above PSI 0.1"),
+    (k3, "Highest PSI",   f"{features[worst]['psi']:.2f}", STATUS_COLORS[features[worst]["status"]],
+     f"{worst} · KS {features[worst]['ks']:.2f}"),
+    (k4, "Rejected",      f"{quality['rejected_requests']:,}", "#F1F5F9",
+     f"of {quality['predictions'] + quality['rejected_requests']:,} requests since startup"),
+]
+for col, label, value, color, sub in cards:
+    with col:
+        st.markdown(f"""<div class="kpi-card" style="--val-color:{color};"><div class="kpi-label">{label}</div>
+        <div class="kpi-value">{value}</div><div class="kpi-sub">{sub}</div></div>""",
+        unsafe_allow_html=True)
+
+st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
+
+
+# ── Drift per Feature ──────────────────────────────────────────
+c1, c2 = st.columns([1, 1], gap="large")
+with c1:
+    st.markdown('<p class="section-header">Population Stability</p>', unsafe_allow_html=True)
+    st.markdown('<p class="section-sub">PSI per feature — below 0.1 stable, 0.1–0.25 moderate, above 0.25 drift.</p>',
+                unsafe_allow_html=True)
+    ranked = sorted(features, key=lambda n: features[n]["psi"])
+    fig_psi = go.Figure(go.Bar(
+        x=[features[n]["psi"] for n in ranked], y=ranked, orientation="h",
+        marker=dict(color=[STATUS_COLORS[features[n]["status"]] for n in ranked]),
+        customdata=[[features[n]["ks"], STATUS_LABELS[features[n]["status"]]] for n in ranked],
+        hovertemplate="<b>%{y}</b><br>PSI %{x:.3f} · KS %{customdata[0]:.3f}<br>%{customdata[1]}<extra></extra>",
+    ))
+    for band in (0.1, 0.25):
+        fig_psi.add_vline(x=band, line=dict(color='rgba(255,255,255,0.15)', width=1, dash='dash'))
+    fig_psi.update_layout(**PLOT_CONFIG, height=420,
+        xaxis=dict(**GRID_STYLE, title="PSI", tickfont=dict(size=11)),
+        yaxis=dict(tickfont=dict(size=11, color='#94A3B8')))
+    st.plotly_chart(fig_psi, use_container_width=True)
+
+with c2:
+    st.markdown('<p class="section-header">Live vs. Training</p>', unsafe_allow_html=True)
+    st.markdown('<p class="section-sub">Share of patients per bin, in training codes after imputation.</p>',
+                unsafe_allow_html=True)
+    feature = st.selectbox("Feature", list(features), index=list(features).index(worst),
+                           label_visibility="collapsed")
+    f = features[feature]
+    if f["codes"]:
+        bins = [f"{c:g}" for c in f["codes"]]
+    else:
+        edges = [f"{e:g}" for e in f["edges"]]
+        bins = [f"≤ {edges[0]}"] + [f"{lo}–{hi}" for lo, hi in zip(edges, edges[1:])] + [f"> {edges[-1]}"]
+    fig_bins = go.Figure()
+    fig_bins.add_trace(go.Bar(x=bins, y=f["reference"], name="Training", marker=dict(color="#475569"),
+                              hovertemplate="%{x}<br>training %{y:.1%}<extra></extra>"))
+    fig_bins.add_trace(go.Bar(x=bins, y=f["live"], name="Live", marker=dict(color=STATUS_COLORS[f["status"]]),
+                              hovertemplate="%{x}<br>live %{y:.1%}<extra></extra>"))
+    fig_bins.update_layout(**PLOT_CONFIG, height=360, barmode="group",
+        xaxis=dict(**GRID_STYLE, tickfont=dict(size=11, color='#94A3B8'), type="category"),
+        yaxis=dict(**GRID_STYLE, tickformat=".0%", tickfont=dict(size=11)),
+        legend=dict(orientation="h", x=0, y=1.1, bgcolor='rgba(0,0,0,0)', font=dict(size=12, color='#94A3B8')))
+    st.plotly_chart(fig_bins, use_container_width=True)
+    st.caption(f"PSI {f['psi']:.3f} · KS {f['ks']:.3f} · {STATUS_LABELS[f['status']]}")
+
+st.markdown('<hr class="fancy-divider"/>', unsafe_allow_html=True)
+
+
+# ── Data Quality ───────────────────────────────────────────────
+st.markdown('<p class="section-header">Data Quality</p>', unsafe_allow_html=True)
+st.markdown('<p class="section-sub">Optional fields left out (and imputed with the training median), '
+            'and the fields that got requests rejected, since startup.</p>', unsafe_allow_html=True)
+q1, q2 = st.columns(2, gap="large")
+with q1:
+    scored = max(quality["predictions"], 1)
+    for name, n in quality["imputed"].items():
+        st.progress(min(n / scored, 1.0), text=f"{name} imputed · {n:,} of {quality['predictions']:,} predictions")
+with q2:
+    if quality["rejected_fields"]:
+        ranked = sorted(quality["rejected_fields"].items(), key=lambda kv: kv[1])
+        fig_rej = go.Figure(go.Bar(
+            x=[n for _, n in ranked], y=[k for k, _ in ranked], orientation="h",
+            marker=dict(color="#F87171"), hovertemplate="<b>%{y}</b><br>%{x:,} rejected requests<extra></extra>",
+        ))
+        fig_rej.update_layout(**PLOT_CONFIG, height=max(160, 28 * len(ranked)),
+            xaxis=dict(**GRID_STYLE, tickfont=dict(size=11)),
+            yaxis=dict(tickfont=dict(size=11, color='#94A3B8')))
+        st.plotly_chart(fig_rej, use_container_width=True)
+    else:
+        st.caption("No requests rejected since startup.")
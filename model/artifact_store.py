@@ -0,0 +1,268 @@
+"""
+Content-addressed store for training outputs, one manifest per run.
+
+Every file a training run produces is stored once under its SHA-256 (the
+digest /model-info reports for each served model) and described by a
+manifest:
+
+    artifacts/
+        blobs/ab/ab12…ef        file contents, zlib-compressed when that helps
+        manifests/<run>.json    {name: sha256, bytes, stored, codec} + run metadata
+        CURRENT                 run id the backend serves
+
+A file that is byte-identical to one from an earlier run (an unchanged
+model, heart.csv, a card) adds no new blob, and nothing is overwritten:
+the loose files in this folder are only the working copy of the latest
+run. The run id is the UTC publish time plus the first 8 hex digits of a
+hash over the manifest's file digests, so two runs with the same outputs
+share the suffix.
+
+The backend reads CURRENT, then each blob once (backend/artifacts.py).
+Rolling back is rewriting CURRENT — no file is copied:
+
+    cd model
+    python artifact_store.py publish          # store the loose files as a new run
+    python artifact_store.py list
+    python artifact_store.py rollback <run>
+    python artifact_store.py checkout <run>   # restore a run's files as the working copy
+    python artifact_store.py gc               # delete blobs no manifest references
+
+train_model.py publishes automatically at the end of training; retrain.py
+checks out CURRENT, then publishes a run only when a model improved. The
+standalone rebuilds (model_cards.py, calibration_spec.py, model_variants.py,
+preprocessing_spec.py, drift_spec.py) check out CURRENT, rewrite their
+files and publish the result (checkout_current / publish_rebuild) — the
+backend never reads the loose files while a store exists.
+"""
+import glob
+import hashlib
+import json
+import os
+import sys
+import zlib
+from datetime import datetime, timezone
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(MODEL_DIR, "artifacts")
+MANIFEST_FORMAT = 1
+CURRENT_FILE = "CURRENT"
+
+# Outputs of one training run, relative to MODEL_DIR
+RUN_FILES = [
+    "heart.csv",
+    "logistic_regression.pkl",
+    "random_forest.pkl",
+    "gradient_boosting.pkl",
+    "preprocessing.json",
+    "calibration.json",
+    "drift_reference.json",
+    "metrics.json",
+    "model_comparison.json",
+    "confusion_matrix.npy",
+    "*.png",
+    "cards/*.json",
+    "variants/*.npz",
+    "variants/report.json",
+]
+
+
+# ─────────────────────────────────────────────
+# BLOBS
+# ─────────────────────────────────────────────
+def blob_path(sha256, store_dir=STORE_DIR):
+    return os.path.join(store_dir, "blobs", sha256[:2], sha256)
+
+
+def put_blob(raw, store_dir=STORE_DIR):
+    """Store `raw` under its SHA-256 unless it is already there; returns its manifest entry."""
+    sha256 = hashlib.sha256(raw).hexdigest()
+    packed = zlib.compress(raw, 6)
+    codec = "zlib" if len(packed) < len(raw) else "raw"
+    data = packed if codec == "zlib" else raw
+    path = blob_path(sha256, store_dir)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return {"sha256": sha256, "bytes": len(raw), "stored": len(data), "codec": codec}
+
+
+# ─────────────────────────────────────────────
+# RUNS
+# ─────────────────────────────────────────────
+def run_files(model_dir=MODEL_DIR):
+    names = set()
+    for pattern in RUN_FILES:
+        names.update(os.path.relpath(p, model_dir) for p in glob.glob(os.path.join(model_dir, pattern)))
+    return sorted(n.replace(os.sep, "/") for n in names)
+
+
+def run_meta(model_dir=MODEL_DIR):
+    """Best model and its held-out accuracy, from the cards and metrics.json the run wrote."""
+    meta = {}
+    for path in sorted(glob.glob(os.path.join(model_dir, "cards", "*.json"))):
+        with open(path) as f:
+            card = json.load(f)
+        if card.get("is_best"):
+            meta["best_model"] = os.path.splitext(os.path.basename(path))[0]
+    metrics = os.path.join(model_dir, "metrics.json")
+    if os.path.exists(metrics):
+        with open(metrics) as f:
+            meta["accuracy"] = round(json.load(f)["accuracy"], 4)
+    return meta
+
+
+def current_run(store_dir=STORE_DIR):
+    path = os.path.join(store_dir, CURRENT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read().strip() or None
+
+
+def set_current(run, store_dir=STORE_DIR):
+    if not os.path.exists(os.path.join(store_dir, "manifests", f"{run}.json")):
+        raise ValueError(f"no manifest for run {run!r}")
+    tmp = os.path.join(store_dir, f"{CURRENT_FILE}.tmp")
+    with open(tmp, "w") as f:
+        f.write(run + "\n")
+    os.replace(tmp, os.path.join(store_dir, CURRENT_FILE))
+
+
+def publish(meta=None, model_dir=MODEL_DIR, store_dir=STORE_DIR, activate=True):
+    """Store every run file in `model_dir` and write its manifest; returns the manifest."""
+    files = {}
+    for name in run_files(model_dir):
+        with open(os.path.join(model_dir, name), "rb") as f:
+            files[name] = put_blob(f.read(), store_dir)
+
+    digest = hashlib.sha256(json.dumps({n: e["sha256"] for n, e in files.items()},
+                                       sort_keys=True).encode()).hexdigest()
+    created = datetime.now(timezone.utc)
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "run": f"{created:%Y%m%dT%H%M%SZ}-{digest[:8]}",
+        "created": created.isoformat(timespec="seconds"),
+        "parent": current_run(store_dir),
+        "meta": meta or run_meta(model_dir),
+        "files": files,
+    }
+    os.makedirs(os.path.join(store_dir, "manifests"), exist_ok=True)
+    with open(os.path.join(store_dir, "manifests", f"{manifest['run']}.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    if activate:
+        set_current(manifest["run"], store_dir)
+    return manifest
+
+
+def read_blob(entry, store_dir=STORE_DIR):
+    with open(blob_path(entry["sha256"], store_dir), "rb") as f:
+        data = f.read()
+    return zlib.decompress(data) if entry["codec"] == "zlib" else data
+
+
+def checkout(run, model_dir=MODEL_DIR, store_dir=STORE_DIR):
+    """Write `run`'s files into `model_dir` where they differ; returns the names rewritten."""
+    written = []
+    for name, entry in load_manifest(run, store_dir)["files"].items():
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                if hashlib.sha256(f.read()).hexdigest() == entry["sha256"]:
+                    continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(read_blob(entry, store_dir))
+        written.append(name)
+    return written
+
+
+def checkout_current(model_dir=MODEL_DIR, store_dir=STORE_DIR):
+    """Make the served run the working copy before a rebuild; returns its id (None without a store)."""
+    run = current_run(store_dir)
+    if run is not None:
+        checkout(run, model_dir, store_dir)
+    return run
+
+
+def publish_rebuild(script, model_dir=MODEL_DIR, store_dir=STORE_DIR):
+    """Publish the working copy as a new served run, unless it still matches CURRENT."""
+    run = current_run(store_dir)
+    if run is not None:
+        files = load_manifest(run, store_dir)["files"]
+        if run_files(model_dir) == sorted(files) and all(
+                _sha256(os.path.join(model_dir, name)) == entry["sha256"] for name, entry in files.items()):
+            print(f"✔ Nothing changed — {run} stays the served run")
+            return None
+    manifest = publish({**run_meta(model_dir), "rebuild": script}, model_dir, store_dir)
+    print_manifest(manifest, store_dir)
+    return manifest
+
+
+def _sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_manifest(run, store_dir=STORE_DIR):
+    with open(os.path.join(store_dir, "manifests", f"{run}.json")) as f:
+        return json.load(f)
+
+
+def list_runs(store_dir=STORE_DIR):
+    return sorted(os.path.splitext(n)[0] for n in os.listdir(os.path.join(store_dir, "manifests")))
+
+
+def gc(store_dir=STORE_DIR):
+    """Delete blobs no manifest references; returns (blobs removed, bytes freed)."""
+    live = {e["sha256"] for run in list_runs(store_dir)
+            for e in load_manifest(run, store_dir)["files"].values()}
+    removed = freed = 0
+    for path in glob.glob(os.path.join(store_dir, "blobs", "*", "*")):
+        if os.path.basename(path) not in live:
+            freed += os.path.getsize(path)
+            os.remove(path)
+            removed += 1
+    return removed, freed
+
+
+def print_manifest(manifest, store_dir=STORE_DIR):
+    raw = sum(e["bytes"] for e in manifest["files"].values())
+    stored = sum(e["stored"] for e in manifest["files"].values())
+    print(f"✔ Run {manifest['run']}: {len(manifest['files'])} files, "
+          f"{raw / 1024:.0f} KB → {stored / 1024:.0f} KB stored")
+    if manifest["parent"]:
+        seen = {e["sha256"] for e in load_manifest(manifest["parent"], store_dir)["files"].values()}
+        reused = sum(e["sha256"] in seen for e in manifest["files"].values())
+        print(f"   {reused} files unchanged since {manifest['parent']} (stored once)")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "publish":
+        print_manifest(publish())
+    elif command == "list":
+        active = current_run()
+        for run in list_runs():
+            m = load_manifest(run)
+            best = m["meta"].get("best_model", "")
+            print(f"{'*' if run == active else ' '} {run}  {len(m['files']):>3} files  {best}")
+    elif command == "rollback" and len(sys.argv) > 2:
+        try:
+            set_current(sys.argv[2])
+        except ValueError as e:
+            sys.exit(f"✘ {e}")
+        print(f"✔ CURRENT → {sys.argv[2]} (restart the backend to serve it)")
+    elif command == "checkout" and len(sys.argv) > 2:
+        if sys.argv[2] not in list_runs():
+            sys.exit(f"✘ no manifest for run {sys.argv[2]!r}")
+        written = checkout(sys.argv[2])
+        print(f"✔ Working copy = {sys.argv[2]} ({len(written)} files rewritten)")
+    elif command == "gc":
+        removed, freed = gc()
+        print(f"✔ Removed {removed} unreferenced blobs ({freed / 1024:.0f} KB)")
+    else:
+        print(__doc__)
+        sys.exit(2)
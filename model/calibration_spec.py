@@ -0,0 +1,179 @@
+"""
+Per-model probability calibration, exported as piecewise-linear tables.
+
+Random forest and gradient boosting probabilities are not calibrated —
+a 0.6 from the forest is not a 60 % event rate — so the 0.3 / 0.6 risk
+bands mean different things per model. For each model this fits a
+monotone map from raw predict_proba to observed event rate on
+out-of-fold predictions (cross_val_predict on the training split, so the
+map never sees a row the model was fitted on):
+
+    isotonic  when the training split has ISOTONIC_MIN_SAMPLES rows or more
+    sigmoid   (Platt scaling) otherwise — isotonic overfits small sets
+
+Both are written as knots (x, y) for np.interp: isotonic's own
+thresholds, or the sigmoid sampled at SIGMOID_KNOTS points. The backend
+applies them with one np.interp call per row or batch. calibration.json
+also records held-out Brier score, log loss and expected calibration
+error before and after, which the model cards report.
+
+The compact tree variants (model_variants.py) get tables of their own,
+under "variants" as "<model>.<variant>", fitted the same way on
+out-of-fold predictions of the variant itself: each fold's model is
+pruned / quantized before it predicts.
+
+A fitted map is only kept when it lowers both the held-out Brier score
+and log loss of the raw output. Otherwise the model gets an "identity"
+table (served raw) and the rejected fit's metrics are kept under
+"rejected".
+
+Run this file directly to refit calibration.json for the served run's
+pickles (checked out first; it re-creates the 80/20 split used in
+training), refresh the model cards and publish the result as a new run:
+
+    cd model
+    python calibration_spec.py
+"""
+import json
+import os
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import brier_score_loss, log_loss
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+CALIBRATION_VERSION = 1
+CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calibration.json")
+CV_FOLDS = 5
+ISOTONIC_MIN_SAMPLES = 1000
+SIGMOID_KNOTS = 101
+ECE_BINS = 10
+
+
+def cv_folds():
+    return StratifiedKFold(CV_FOLDS, shuffle=True, random_state=42)
+
+
+def out_of_fold_proba(model, X_train, y_train):
+    return cross_val_predict(clone(model), X_train, y_train, cv=cv_folds(), method="predict_proba")[:, 1]
+
+
+def fit_calibration(model, X_train, y_train, method=None):
+    """{"method", "x", "y"} knots mapping raw probability to calibrated probability."""
+    return fit_table(out_of_fold_proba(model, X_train, y_train), y_train, method)
+
+
+def fit_table(raw, y_train, method=None):
+    """fit_calibration from out-of-fold raw probabilities already computed."""
+    method = method or ("isotonic" if len(y_train) >= ISOTONIC_MIN_SAMPLES else "sigmoid")
+    if method == "isotonic":
+        iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(raw, y_train)
+        x, y = iso.X_thresholds_, iso.y_thresholds_
+    else:
+        platt = LogisticRegression(C=1e6).fit(raw.reshape(-1, 1), y_train)
+        x = np.linspace(0.0, 1.0, SIGMOID_KNOTS)
+        y = platt.predict_proba(x.reshape(-1, 1))[:, 1]
+    return {"method": method, "x": np.round(x, 6).tolist(), "y": np.round(y, 6).tolist()}
+
+
+def apply_calibration(table, probability):
+    return np.interp(probability, table["x"], table["y"])
+
+
+def expected_calibration_error(y_true, y_prob, bins=ECE_BINS):
+    """Gap between mean predicted probability and event rate, weighted over equal-width bins."""
+    y_true, y_prob = np.asarray(y_true), np.asarray(y_prob)
+    which = np.minimum((y_prob * bins).astype(int), bins - 1)
+    ece = 0.0
+    for b in range(bins):
+        in_bin = which == b
+        if in_bin.any():
+            ece += in_bin.mean() * abs(y_prob[in_bin].mean() - y_true[in_bin].mean())
+    return ece
+
+
+def calibration_metrics(y_true, raw, calibrated):
+    clipped = np.clip(calibrated, 1e-6, 1 - 1e-6)
+    return {
+        "brier_raw": round(float(brier_score_loss(y_true, raw)), 4),
+        "brier": round(float(brier_score_loss(y_true, calibrated)), 4),
+        "log_loss_raw": round(float(log_loss(y_true, np.clip(raw, 1e-6, 1 - 1e-6))), 4),
+        "log_loss": round(float(log_loss(y_true, clipped)), 4),
+        "ece_raw": round(float(expected_calibration_error(y_true, raw)), 4),
+        "ece": round(float(expected_calibration_error(y_true, calibrated)), 4),
+    }
+
+
+def identity_table():
+    return {"method": "identity", "x": [0.0, 1.0], "y": [0.0, 1.0]}
+
+
+def improves(metrics):
+    return metrics["brier"] < metrics["brier_raw"] and metrics["log_loss"] < metrics["log_loss_raw"]
+
+
+def build_calibration(model, X_train, y_train, X_test, y_test):
+    """Table for one model plus its held-out metrics; the identity unless the fit helps held out."""
+    table = fit_calibration(model, X_train, y_train)
+    return check_calibration(table, model.predict_proba(X_test)[:, 1], y_test)
+
+
+def check_calibration(table, raw, y_test):
+    """`table` with its held-out metrics on `raw`, or the identity when it does not help."""
+    table["metrics"] = calibration_metrics(y_test, raw, apply_calibration(table, raw))
+    if improves(table["metrics"]):
+        return table
+    rejected = {"method": table["method"], **table["metrics"]}
+    table = identity_table()
+    table["metrics"] = calibration_metrics(y_test, raw, raw)
+    table["rejected"] = rejected
+    return table
+
+
+def save_calibration_spec(tables, variants=None, path=CALIBRATION_FILE):
+    with open(path, "w") as f:
+        json.dump({"version": CALIBRATION_VERSION, "folds": CV_FOLDS, "models": tables,
+                   "variants": variants or {}}, f)
+
+
+def load_calibration_spec(path=CALIBRATION_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    import joblib
+    from sklearn.model_selection import train_test_split
+
+    from artifact_store import checkout_current, publish_rebuild
+
+    import model_cards
+    from model_variants import calibrate_variants
+    from preprocessing_spec import load_heart, load_preprocessing_spec, scaler_from
+
+    checkout_current()
+
+    # Imputed and scaled with the served preprocessing.json, split as in train_model.py
+    spec = load_preprocessing_spec()
+    X, y = load_heart(spec)
+    X_train, X_test, y_train, y_test = train_test_split(scaler_from(spec)(X), y, test_size=0.2, random_state=42)
+
+    models = {name: joblib.load(f"{name}.pkl")
+              for name in ("logistic_regression", "random_forest", "gradient_boosting")}
+    tables = {}
+    for name, model in models.items():
+        tables[name] = build_calibration(model, X_train, y_train, X_test, y_test)
+        m = tables[name]["metrics"]
+        m = tables[name].get("rejected", m)
+        print(f"{name}: {tables[name]['method']} · Brier {m['brier_raw']} → {m['brier']} "
+              f"· log loss {m['log_loss_raw']} → {m['log_loss']} · ECE {m['ece_raw']} → {m['ece']}")
+    variants = calibrate_variants(models, X_train, y_train, X_test, y_test)
+    print("variants: " + ", ".join(f"{name} {t['method']}" for name, t in variants.items()))
+    save_calibration_spec(tables, variants)
+    print(f"Calibration v{CALIBRATION_VERSION} written to {CALIBRATION_FILE}")
+    model_cards.rebuild_cards()
+    publish_rebuild("calibration_spec.py")
@@ -0,0 +1,74 @@
+"""
+Training reference distributions for drift monitoring (backend/drift.py).
+
+drift_reference.json holds, per feature in FEATURE order, the bin edges
+the backend sketches live requests into and the share of heart.csv rows
+in each bin:
+
+    numeric      edges at the training deciles (repeated deciles merged),
+                 so every bin holds about a tenth of the training data
+    categorical  edges halfway between the training codes, one bin per code
+
+A value v falls in bin i when edges[i-1] < v <= edges[i] (the number of
+edges below it), for the reference here and for every live request, so
+PSI and KS compare like with like. Values are in training codes after
+imputation — what the model actually sees. Run this file directly to
+rebuild it from the served run's heart.csv and publish the result:
+
+    cd model
+    python drift_spec.py
+"""
+import json
+import os
+
+import numpy as np
+
+DRIFT_VERSION = 1
+DRIFT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "drift_reference.json")
+CATEGORICAL = ["sex", "cp", "fbs", "restecg", "exang", "slope", "ca", "thal"]
+QUANTILES = np.linspace(0.1, 0.9, 9)
+
+
+def feature_edges(values, categorical):
+    if categorical:
+        codes = np.unique(values)
+        return ((codes[:-1] + codes[1:]) / 2).tolist()
+    return np.unique(np.quantile(values, QUANTILES)).tolist()
+
+
+def bin_shares(values, edges):
+    bins = np.searchsorted(edges, values, side="left")
+    return (np.bincount(bins, minlength=len(edges) + 1) / len(values)).tolist()
+
+
+def build_drift_reference(X):
+    """Reference from the cleaned (imputed) training feature frame."""
+    features = {}
+    for name in X.columns:
+        values = X[name].to_numpy(np.float64)
+        kind = "categorical" if name in CATEGORICAL else "numeric"
+        edges = feature_edges(values, kind == "categorical")
+        features[name] = {
+            "kind": kind,
+            "edges": [round(e, 6) for e in edges],
+            "reference": [round(s, 6) for s in bin_shares(values, edges)],
+        }
+        if kind == "categorical":
+            features[name]["codes"] = np.unique(values).tolist()
+    return {"version": DRIFT_VERSION, "rows": len(X), "features": features}
+
+
+def save_drift_reference(spec, path=DRIFT_FILE):
+    with open(path, "w") as f:
+        json.dump(spec, f, indent=2)
+
+
+if __name__ == "__main__":
+    from artifact_store import checkout_current, publish_rebuild
+    from preprocessing_spec import load_heart, load_preprocessing_spec
+
+    checkout_current()
+    X, _ = load_heart(load_preprocessing_spec())
+    save_drift_reference(build_drift_reference(X))
+    print(f"Drift reference v{DRIFT_VERSION} written to {DRIFT_FILE}")
+    publish_rebuild("drift_spec.py")
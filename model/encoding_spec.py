@@ -0,0 +1,50 @@
+"""
+Versioned categorical feature encodings (the "encoding" block of
+preprocessing.json — see preprocessing_spec.py).
+
+The models are trained on heart.csv, which uses the UCI Cleveland codes
+(cp 1-4, slope 1-3, thal 3/6/7). The Predict form asks for 0-based codes
+instead (cp 0-3, slope 0-2, thal 0-3 with 3 = unknown). The spec records,
+for every named input encoding, how each categorical code maps onto the
+training ("canonical") code, so the backend can translate any request
+before scaling. An "unknown" answer maps to the training median — the
+same value training used to fill missing entries.
+
+Bump ENCODING_VERSION whenever a mapping changes meaning.
+"""
+ENCODING_VERSION = 1
+CANONICAL = "uci"
+DEFAULT_INPUT = "form"
+
+
+def _identity(codes):
+    return {str(c): c for c in codes}
+
+
+def build_encoding_spec(df):
+    """Encoding spec from the cleaned training frame (codes as in heart.csv)."""
+    unknown_thal = float(df["thal"].median())
+    return {
+        "version": ENCODING_VERSION,
+        "canonical": CANONICAL,
+        "default": DEFAULT_INPUT,
+        "encodings": {
+            # heart.csv / UCI Cleveland codes — what the models were trained on
+            "uci": {
+                "cp": _identity([1, 2, 3, 4]),
+                "restecg": _identity([0, 1, 2]),
+                "slope": _identity([1, 2, 3]),
+                "ca": _identity([0, 1, 2, 3]),
+                "thal": _identity([3, 6, 7]),
+            },
+            # 0-based codes used by the Predict form
+            "form": {
+                "cp": {"0": 1, "1": 2, "2": 3, "3": 4},
+                "restecg": _identity([0, 1, 2]),
+                "slope": {"0": 1, "1": 2, "2": 3},
+                "ca": _identity([0, 1, 2, 3]),
+                "thal": {"0": 3, "1": 6, "2": 7, "3": unknown_thal},
+            },
+        },
+    }
+
@@ -0,0 +1,193 @@
+"""
+Compact per-model "cards" for the frontend.
+
+A card is a small JSON document holding everything the Model Info and
+Model Comparison pages need — metrics, confusion matrix, ROC and
+precision-recall points, a decision-threshold table and global
+importances/coefficients — so the UI never has to unpickle a model or
+load a static PNG just to draw a chart. Curves are decimated to at most
+MAX_CURVE_POINTS points so card size stays bounded for any test set.
+train_model.py writes one card per model into cards/; the backend serves
+them from /model-cards.
+
+Cards also carry each model's calibration method and held-out
+calibration metrics from calibration.json (calibration_spec.py) when it
+exists. Run this file directly to rebuild the cards for the served run's
+pickles (checked out first; it re-creates the same 80/20 split used in
+training) and publish the result as a new run:
+
+    cd model
+    python model_cards.py
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+from sklearn.metrics import (
+    accuracy_score,
+    average_precision_score,
+    confusion_matrix,
+    f1_score,
+    precision_recall_curve,
+    precision_score,
+    recall_score,
+    roc_auc_score,
+    roc_curve,
+)
+
+from calibration_spec import load_calibration_spec
+
+CARDS_DIR = "cards"
+MAX_CURVE_POINTS = 200
+THRESHOLDS = [round(t, 2) for t in np.arange(0.1, 0.95, 0.05)]
+
+
+def _sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _rounded(values, digits=4):
+    return [round(float(v), digits) for v in values]
+
+
+def decimate_curve(x, y, max_points=MAX_CURVE_POINTS):
+    """Indices of at most `max_points` points spread evenly along the curve's length.
+
+    Both endpoints are always kept, and sampling by arc length rather than by
+    index keeps the corners of step-shaped ROC/PR curves.
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    seg = np.hypot(np.diff(x), np.diff(y))
+    arc = np.concatenate([[0.0], np.cumsum(seg)])
+    targets = np.linspace(0.0, arc[-1], max_points)
+    idx = np.searchsorted(arc, targets)
+    return np.unique(np.clip(np.concatenate([[0], idx, [n - 1]]), 0, n - 1))
+
+
+def curve_points(y_true, y_prob):
+    fpr, tpr, roc_thr = roc_curve(y_true, y_prob)
+    keep = decimate_curve(fpr, tpr)
+    # roc_curve starts at threshold=inf; clamp so the card stays valid JSON
+    roc = {
+        "fpr": _rounded(fpr[keep]),
+        "tpr": _rounded(tpr[keep]),
+        "thresholds": _rounded(np.minimum(roc_thr[keep], 1.0)),
+    }
+
+    # precision/recall have one more point than thresholds (the recall=0 end)
+    precision, recall, pr_thr = precision_recall_curve(y_true, y_prob)
+    pr_thr = np.append(pr_thr, 1.0)
+    keep = decimate_curve(recall, precision)
+    pr = {
+        "precision": _rounded(precision[keep]),
+        "recall": _rounded(recall[keep]),
+        "thresholds": _rounded(np.minimum(pr_thr[keep], 1.0)),
+    }
+    return roc, pr
+
+
+def threshold_table(y_true, y_prob):
+    rows = []
+    for t in THRESHOLDS:
+        y_hat = (y_prob >= t).astype(int)
+        rows.append({
+            "threshold": t,
+            "accuracy": round(accuracy_score(y_true, y_hat), 4),
+            "precision": round(precision_score(y_true, y_hat, zero_division=0), 4),
+            "recall": round(recall_score(y_true, y_hat, zero_division=0), 4),
+            "f1_score": round(f1_score(y_true, y_hat, zero_division=0), 4),
+        })
+    return rows
+
+
+def build_model_card(name, display_name, model, X_test, y_test, feature_names, model_path,
+                     calibration=None):
+    y_pred = model.predict(X_test)
+    y_prob = model.predict_proba(X_test)[:, 1]
+    roc, pr = curve_points(y_test, y_prob)
+
+    card = {
+        "model": name,
+        "display_name": display_name,
+        "sha256": _sha256(model_path),
+        "n_test": int(len(y_test)),
+        "metrics": {
+            "accuracy": accuracy_score(y_test, y_pred),
+            "precision": precision_score(y_test, y_pred),
+            "recall": recall_score(y_test, y_pred),
+            "f1_score": f1_score(y_test, y_pred),
+            "roc_auc": roc_auc_score(y_test, y_prob),
+            "average_precision": average_precision_score(y_test, y_prob),
+        },
+        "feature_names": list(feature_names),
+        "confusion_matrix": confusion_matrix(y_test, y_pred).tolist(),
+        "roc": roc,
+        "pr": pr,
+        "threshold_table": threshold_table(y_test, y_prob),
+        "importances": None,
+        "importance_kind": None,
+        "coefficients": None,
+        "intercept": None,
+        "calibration": None,
+    }
+    if calibration is not None:
+        card["calibration"] = {"method": calibration["method"], "knots": len(calibration["x"]),
+                               **calibration["metrics"], "rejected": calibration.get("rejected")}
+
+    if hasattr(model, "feature_importances_"):
+        card["importances"] = _rounded(model.feature_importances_, 6)
+        card["importance_kind"] = "Feature Importance"
+    elif hasattr(model, "coef_"):
+        card["coefficients"] = _rounded(model.coef_[0], 6)
+        card["intercept"] = round(float(model.intercept_[0]), 6)
+        card["importances"] = _rounded(np.abs(model.coef_[0]), 6)
+        card["importance_kind"] = "Coefficient Magnitude"
+    return card
+
+
+def save_model_cards(cards, best_name, out_dir=CARDS_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    for name, card in cards.items():
+        card["is_best"] = name == best_name
+        with open(os.path.join(out_dir, f"{name}.json"), "w") as f:
+            json.dump(card, f, separators=(",", ":"))
+
+
+def rebuild_cards():
+    import joblib
+    from sklearn.model_selection import train_test_split
+
+    from preprocessing_spec import load_heart, load_preprocessing_spec, scaler_from
+
+    spec = load_preprocessing_spec()
+    X, y = load_heart(spec)
+    _, X_test, _, y_test = train_test_split(scaler_from(spec)(X), y, test_size=0.2, random_state=42)
+
+    names = {
+        "logistic_regression": "Logistic Regression",
+        "random_forest": "Random Forest",
+        "gradient_boosting": "Gradient Boosting",
+    }
+    calibration = (load_calibration_spec() or {}).get("models", {})
+    cards = {}
+    for name, display in names.items():
+        path = f"{name}.pkl"
+        cards[name] = build_model_card(
+            name, display, joblib.load(path), X_test, y_test, X.columns, path,
+            calibration.get(name)
+        )
+    best = max(cards, key=lambda n: cards[n]["metrics"]["accuracy"])
+    save_model_cards(cards, best)
+    print(f"Model cards written to {CARDS_DIR}/ (best: {best})")
+
+
+if __name__ == "__main__":
+    from artifact_store import checkout_current, publish_rebuild
+
+    checkout_current()
+    rebuild_cards()
+    publish_rebuild("model_cards.py")
@@ -0,0 +1,275 @@
+"""
+Pruned and quantized variants of the tree ensembles, for small edge boxes.
+
+For random forest and gradient boosting this writes, next to the full
+pickles, compact variants the backend can serve instead
+(CARDIOSCAN_MODEL_VARIANT, see backend/compact_model.py):
+
+    pruned            first PRUNING[model]["max_estimators"] trees, forest
+                      trees cut to PRUNING[model]["max_depth"] (a cut node
+                      becomes a leaf with its own class fractions)
+    quantized         every tree, thresholds and leaf values as float16
+    pruned_quantized  both
+
+Each variant is one compressed .npz of flat arrays in variants/ — trees
+in preorder, so a node's left child is always the next node and only the
+right child index is stored:
+
+    feature  int8     split feature, -1 for a leaf
+    value    f32/f16  split threshold, or the leaf value for a leaf
+    right    uint16   right child (uint32 past 65 535 nodes)
+    roots    uint32   first node of each tree
+
+plus kind, depth, learning_rate and init (gradient boosting's prior
+log-odds). Thresholds are stored so float32 inputs route exactly as in
+sklearn at float32 and keep every training-data decision at float16 (see
+split_thresholds). Pruning and quantization are applied to a copy of the
+sklearn model first, so the accuracy / ROC-AUC deltas in
+variants/report.json are measured with sklearn on the held-out split
+against the full model. backend/bench_variants.py adds serving latency
+side by side.
+
+A variant's probabilities differ from the full model's, so it is never
+served through the full model's calibration table: calibrate_variants
+fits one per variant (calibration.json "variants", calibration_spec.py).
+
+Run this file directly to rebuild the variants for the served run's
+pickles (checked out first; it re-creates the same 80/20 split used in
+training) and publish the result as a new run:
+
+    cd model
+    python model_variants.py
+"""
+import copy
+import json
+import os
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+from calibration_spec import check_calibration, cv_folds, fit_table, load_calibration_spec, save_calibration_spec
+
+VARIANT_DIR = "variants"
+VARIANT_FORMAT = 1
+PRUNING = {
+    "random_forest": {"max_estimators": 50, "max_depth": 8},
+    # Boosting trees are already shallow and their internal nodes carry no
+    # Newton leaf value, so only whole stages are dropped
+    "gradient_boosting": {"max_estimators": 50, "max_depth": None},
+}
+VARIANTS = {
+    "pruned": {"prune": True, "quantize": False},
+    "quantized": {"prune": False, "quantize": True},
+    "pruned_quantized": {"prune": True, "quantize": True},
+}
+
+
+# ─────────────────────────────────────────────
+# PRUNE / QUANTIZE (on a copy of the sklearn model)
+# ─────────────────────────────────────────────
+def _trees(model):
+    return [est[0] if isinstance(est, np.ndarray) else est for est in model.estimators_]
+
+
+def _cut_depth(tree, max_depth):
+    t = tree.tree_
+    left, right = t.children_left, t.children_right      # writable views
+    depth = np.zeros(t.node_count, dtype=int)
+    for node in range(t.node_count):                       # parents precede children
+        if left[node] != -1:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    cut = (depth >= max_depth) & (left != -1)
+    left[cut] = -1
+    right[cut] = -1
+
+
+def _nudge(values, dtype, direction):
+    rounded = values.astype(dtype)
+    off = (rounded.astype(np.float64) - values) * direction < 0
+    rounded[off] = np.nextafter(rounded[off], dtype(np.inf * direction))
+    return rounded
+
+
+def split_thresholds(values, dtype):
+    """float64 sklearn thresholds stored as `dtype` for float32 inputs.
+
+    Rounding down to float32 is exact: x <= t  <=>  x <= largest float32 <= t.
+    float16 then rounds that *up*, so a threshold sitting exactly on a data
+    value still sends that value left; only inputs strictly between the
+    float32 and float16 thresholds change side."""
+    down = _nudge(values, np.float32, -1)
+    if dtype == np.float32:
+        return down
+    return _nudge(down.astype(np.float64), dtype, 1)
+
+
+def make_variant(model, name, prune, quantize):
+    variant = copy.deepcopy(model)
+    if prune:
+        limits = PRUNING[name]
+        variant.estimators_ = variant.estimators_[:limits["max_estimators"]]
+        variant.n_estimators = len(variant.estimators_)
+        if limits["max_depth"]:
+            for tree in _trees(variant):
+                _cut_depth(tree, limits["max_depth"])
+    if quantize:
+        for tree in _trees(variant):
+            t = tree.tree_
+            t.threshold[:] = split_thresholds(t.threshold, np.float16)
+            t.value[:] = t.value.astype(np.float16).astype(np.float64)
+    return variant
+
+
+# ─────────────────────────────────────────────
+# EXPORT
+# ─────────────────────────────────────────────
+def _leaf_value(model, value):
+    if hasattr(model, "learning_rate"):
+        return value[0, 0]                 # boosting: regression leaf (log-odds step)
+    return value[0, 1] / value[0].sum()    # forest: positive-class fraction
+
+
+def compact_arrays(model, quantize):
+    feature, value, right, roots = [], [], [], []
+    depth = 0
+    for tree in _trees(model):
+        t = tree.tree_
+        roots.append(len(feature))
+        stack = [(0, 0, None)]               # (node, depth, index of the parent to patch)
+        while stack:
+            node, d, patch = stack.pop()
+            if patch is not None:
+                right[patch] = len(feature)
+            depth = max(depth, d)
+            if t.children_left[node] == -1:
+                feature.append(-1)
+                value.append(_leaf_value(model, t.value[node]))
+                right.append(0)
+                continue
+            feature.append(t.feature[node])
+            value.append(t.threshold[node])
+            right.append(0)
+            here = len(feature) - 1
+            # Right pushed first so the left subtree follows its parent directly
+            stack.append((t.children_right[node], d + 1, here))
+            stack.append((t.children_left[node], d + 1, None))
+
+    index_type = np.uint16 if len(feature) <= np.iinfo(np.uint16).max else np.uint32
+    value_type = np.float16 if quantize else np.float32
+    feature, value = np.array(feature, dtype=np.int8), np.array(value)
+    split = feature >= 0
+    stored = value.astype(value_type)
+    stored[split] = split_thresholds(value[split], value_type)
+    arrays = {
+        "format": np.array(VARIANT_FORMAT),
+        "kind": np.array("gradient_boosting" if hasattr(model, "learning_rate") else "random_forest"),
+        "n_features": np.array(model.n_features_in_),
+        "depth": np.array(depth),
+        "feature": feature,
+        "value": stored,
+        "right": np.array(right, dtype=index_type),
+        "roots": np.array(roots, dtype=np.uint32),
+    }
+    if hasattr(model, "learning_rate"):
+        prior = model.init_.predict_proba(np.zeros((1, model.n_features_in_)))[0, 1]
+        arrays["learning_rate"] = np.array(model.learning_rate)
+        arrays["init"] = np.array(np.log(prior / (1 - prior)))
+    return arrays
+
+
+def variant_path(name, variant, out_dir=VARIANT_DIR):
+    return os.path.join(out_dir, f"{name}.{variant}.npz")
+
+
+# ─────────────────────────────────────────────
+# BUILD + REPORT
+# ─────────────────────────────────────────────
+def _scores(model, X_test, y_test):
+    prob = model.predict_proba(X_test)[:, 1]
+    return accuracy_score(y_test, prob >= 0.5), roc_auc_score(y_test, prob)
+
+
+def export_variants(models, X_test, y_test, out_dir=VARIANT_DIR):
+    """Write every variant of every tree model in `models` ({name: model}); returns the report."""
+    os.makedirs(out_dir, exist_ok=True)
+    report = {"format": VARIANT_FORMAT, "pruning": PRUNING, "models": {}}
+    for name, model in models.items():
+        if name not in PRUNING:
+            continue
+        acc, auc = _scores(model, X_test, y_test)
+        entry = {"full": {"bytes": os.path.getsize(f"{name}.pkl"), "accuracy": round(acc, 4),
+                          "roc_auc": round(auc, 4), "trees": len(_trees(model)),
+                          "nodes": int(sum(t.tree_.node_count for t in _trees(model)))}}
+        for variant, opts in VARIANTS.items():
+            small = make_variant(model, name, **opts)
+            arrays = compact_arrays(small, opts["quantize"])
+            path = variant_path(name, variant, out_dir)
+            np.savez_compressed(path, **arrays)
+            v_acc, v_auc = _scores(small, X_test, y_test)
+            entry[variant] = {
+                "bytes": os.path.getsize(path),
+                "accuracy": round(v_acc, 4),
+                "roc_auc": round(v_auc, 4),
+                "accuracy_delta": round(v_acc - acc, 4),
+                "roc_auc_delta": round(v_auc - auc, 4),
+                "trees": len(arrays["roots"]),
+                "nodes": len(arrays["feature"]),
+                "depth": int(arrays["depth"]),
+            }
+        report["models"][name] = entry
+    with open(os.path.join(out_dir, "report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def calibrate_variants(models, X_train, y_train, X_test, y_test):
+    """{"<model>.<variant>": calibration table} for every variant of every tree model in `models`.
+
+    Out-of-fold like the full models' tables, but each fold's model is
+    turned into the variant before it predicts, so the map is fitted to
+    the variant's own probabilities."""
+    X_train, y_train = np.asarray(X_train), np.asarray(y_train)
+    tables = {}
+    for name, model in models.items():
+        if name not in PRUNING:
+            continue
+        folds = [(val, clone(model).fit(X_train[train], y_train[train]))
+                 for train, val in cv_folds().split(X_train, y_train)]
+        for variant, opts in VARIANTS.items():
+            raw = np.empty(len(y_train))
+            for val, fold_model in folds:
+                raw[val] = make_variant(fold_model, name, **opts).predict_proba(X_train[val])[:, 1]
+            served = make_variant(model, name, **opts)
+            tables[f"{name}.{variant}"] = check_calibration(
+                fit_table(raw, y_train), served.predict_proba(X_test)[:, 1], y_test)
+    return tables
+
+
+def print_report(report):
+    print(f"\n{'model':<20}{'variant':<18}{'size':>10}{'nodes':>8}{'accuracy':>10}{'Δ':>8}{'roc_auc':>9}{'Δ':>8}")
+    for name, entry in report["models"].items():
+        for variant, r in entry.items():
+            print(f"{name:<20}{variant:<18}{r['bytes'] / 1024:>8.1f}KB{r['nodes']:>8}"
+                  f"{r['accuracy']:>10.4f}{r.get('accuracy_delta', 0):>+8.4f}"
+                  f"{r['roc_auc']:>9.4f}{r.get('roc_auc_delta', 0):>+8.4f}")
+
+
+if __name__ == "__main__":
+    import joblib
+    from sklearn.model_selection import train_test_split
+
+    from artifact_store import checkout_current, publish_rebuild
+    from preprocessing_spec import load_heart, load_preprocessing_spec, scaler_from
+
+    checkout_current()
+    spec = load_preprocessing_spec()
+    X, y = load_heart(spec)
+    X_train, X_test, y_train, y_test = train_test_split(scaler_from(spec)(X), y, test_size=0.2, random_state=42)
+
+    models = {name: joblib.load(f"{name}.pkl") for name in PRUNING}
+    print_report(export_variants(models, X_test, y_test))
+    spec = load_calibration_spec() or {}
+    save_calibration_spec(spec.get("models", {}), calibrate_variants(models, X_train, y_train, X_test, y_test))
+    print(f"\nVariants and their calibration tables written to {VARIANT_DIR}/, calibration.json")
+    publish_rebuild("model_variants.py")
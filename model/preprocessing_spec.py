@@ -0,0 +1,101 @@
+"""
+The preprocessing artifact — everything the backend does to a request
+before the model sees it, saved as one versioned JSON file.
+
+preprocessing.json holds, in FEATURE order:
+
+    median     training medians, used to fill missing values
+    optional   the fields heart.csv has gaps in ("?"), which may be left
+               out of a request and are then imputed like in training
+    mean/scale the fitted StandardScaler's mean_ and scale_
+    encoding   the categorical input encodings (encoding_spec.py)
+
+as flat lists, so the backend applies imputation, encoding and scaling
+with plain numpy and never unpickles the scaler. Bump
+PREPROCESSING_VERSION whenever the meaning of a field changes. It is the
+only copy of these statistics: the standalone rebuilds (model_cards.py,
+calibration_spec.py, model_variants.py, retrain.py) impute and scale
+heart.csv through load_heart / scaler_from below. Run this file directly
+to rebuild preprocessing.json from heart.csv of the served run without
+retraining and publish the result (the scaler is refitted on the same
+cleaned data, which gives identical statistics):
+
+    cd model
+    python preprocessing_spec.py
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from encoding_spec import build_encoding_spec
+
+PREPROCESSING_VERSION = 1
+PREPROCESSING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preprocessing.json")
+HEART_FILE = os.path.join(os.path.dirname(PREPROCESSING_FILE), "heart.csv")
+
+
+def build_preprocessing_spec(df, scaler, medians, optional):
+    """Spec from the cleaned feature frame, its fitted scaler and the pre-fill medians."""
+    features = list(scaler.feature_names_in_)
+    return {
+        "version": PREPROCESSING_VERSION,
+        "features": features,
+        "median": [float(medians[f]) for f in features],
+        "optional": [f for f in features if f in optional],
+        "mean": scaler.mean_.tolist(),
+        "scale": scaler.scale_.tolist(),
+        "encoding": build_encoding_spec(df),
+    }
+
+
+def save_preprocessing_spec(spec, path=PREPROCESSING_FILE):
+    with open(path, "w") as f:
+        json.dump(spec, f, indent=2)
+
+
+def load_preprocessing_spec(path=PREPROCESSING_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_heart(spec, path=HEART_FILE):
+    """heart.csv as (features, 0/1 target), gaps filled with the spec's medians."""
+    df = pd.read_csv(path, names=spec["features"] + ["target"])
+    df.replace("?", np.nan, inplace=True)
+    df = df.apply(pd.to_numeric)
+    X = df[spec["features"]].fillna(dict(zip(spec["features"], spec["median"])))
+    return X, (df["target"] > 0).astype(int)
+
+
+def scaler_from(spec):
+    """StandardScaler.transform from the spec's mean/scale."""
+    mean, scale = np.array(spec["mean"]), np.array(spec["scale"])
+    return lambda X: (np.asarray(X, dtype=np.float64) - mean) / scale
+
+
+if __name__ == "__main__":
+    from sklearn.preprocessing import StandardScaler
+
+    from artifact_store import checkout_current, publish_rebuild
+
+    checkout_current()
+
+    columns = [
+        "age", "sex", "cp", "trestbps", "chol",
+        "fbs", "restecg", "thalach", "exang",
+        "oldpeak", "slope", "ca", "thal", "target"
+    ]
+    df = pd.read_csv("heart.csv", names=columns)
+    df.replace("?", np.nan, inplace=True)
+    df = df.apply(pd.to_numeric)
+    medians = df.median()
+    optional = [c for c in columns if df[c].isnull().any()]
+    df.fillna(medians, inplace=True)
+
+    X = df.drop("target", axis=1)
+    scaler = StandardScaler().fit(X)
+    save_preprocessing_spec(build_preprocessing_spec(X, scaler, medians, optional))
+    print(f"Preprocessing v{PREPROCESSING_VERSION} written to {PREPROCESSING_FILE}")
+    publish_rebuild("preprocessing_spec.py")
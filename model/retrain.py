@@ -0,0 +1,317 @@
+"""
+Incremental retraining from labeled predictions.
+
+POST /history/outcome on the backend appends one labeled row to a label
+log (backend/outcomes.jsonl, or the `outcomes` collection in MongoDB):
+the stored prediction's inputs in training codes plus the outcome that
+was observed. Each /history index is labeled at most once. This job reads only the labels added since it last ran,
+CHUNK_ROWS at a time, and warm-starts the served models on them instead
+of refitting from heart.csv:
+
+    random_forest        warm_start, RF_TREES_PER_CHUNK new trees per chunk
+    gradient_boosting    warm_start, GB_STAGES_PER_CHUNK new boosting stages per chunk
+    logistic_regression  partial_fit, one SGD pass per chunk (log loss, same L2
+                         strength) starting from the served coefficients
+
+Every HOLDOUT_EVERY-th label is held out rather than trained on. Each
+candidate is scored against the model it would replace on the heart.csv
+test split plus the held-out labels, and replaces it only when ROC-AUC
+rises by more than MIN_GAIN and accuracy does not fall. If any model
+improved, the improved pickles are written with fresh calibration tables
+for them and their variants; cards, metrics and variants are re-scored
+on the same evaluation rows, and the folder is published as a new run. A model that did not improve keeps its
+bytes, and so its hash.
+
+Job state lives in feedback/, outside the runs:
+
+    feedback/labels.csv   one row per labeled index (training codes, target, split, index)
+    feedback/state.json   how far into the label log the job has read
+
+Each manifest records per model how many rows of labels.csv it has
+absorbed (meta.retrain.absorbed). After a rollback, the next job trains
+on exactly the rows the served models have not seen.
+
+    cd model
+    python retrain.py                    # read new labels, retrain, publish if better
+    python retrain.py --stage            # publish without moving CURRENT (shadow it first)
+    python retrain.py --mongo <uri>      # read the label log from MongoDB
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from artifact_store import MODEL_DIR, checkout, current_run, load_manifest, print_manifest, publish, run_meta
+from calibration_spec import build_calibration, load_calibration_spec, save_calibration_spec
+from model_cards import build_model_card, save_model_cards
+from model_variants import calibrate_variants, export_variants, print_report
+from preprocessing_spec import load_heart, load_preprocessing_spec, scaler_from
+
+LABEL_LOG = os.path.join(MODEL_DIR, "..", "backend", "outcomes.jsonl")
+FEEDBACK_DIR = os.path.join(MODEL_DIR, "feedback")
+LABELS_FILE = os.path.join(FEEDBACK_DIR, "labels.csv")
+STATE_FILE = os.path.join(FEEDBACK_DIR, "state.json")
+
+FEATURES = [
+    "age", "sex", "cp", "trestbps", "chol",
+    "fbs", "restecg", "thalach", "exang",
+    "oldpeak", "slope", "ca", "thal"
+]
+MODELS = ["logistic_regression", "random_forest", "gradient_boosting"]
+CHUNK_ROWS = 256
+HOLDOUT_EVERY = 5
+MIN_NEW_ROWS = 20
+MIN_GAIN = 0.001
+RF_TREES_PER_CHUNK = 10
+GB_STAGES_PER_CHUNK = 10
+SGD_LEARNING_RATE = 0.01
+
+
+# ─────────────────────────────────────────────
+# LABEL LOG — read from where the last job stopped
+# ─────────────────────────────────────────────
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {"labels_read": 0, "offset": 0}
+    with open(STATE_FILE) as f:
+        return json.load(f)
+
+
+def save_state(state):
+    os.makedirs(FEEDBACK_DIR, exist_ok=True)
+    with open(STATE_FILE, "w") as f:
+        json.dump(state, f, indent=2)
+
+
+def log_chunks(path, offset, chunk_rows):
+    """(entries, next offset) per chunk of complete lines after byte `offset`."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            entries = []
+            while len(entries) < chunk_rows:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break           # end of log, or a line still being written
+                entries.append(json.loads(line))
+                offset = f.tell()
+            if not entries:
+                return
+            yield entries, offset
+
+
+def collection_chunks(uri, skip, chunk_rows):
+    from pymongo import MongoClient
+
+    outcomes = MongoClient(uri, serverSelectionTimeoutMS=8000)["heartDB"]["outcomes"]
+    while True:
+        entries = list(outcomes.find({}, {"_id": 0}).sort("_id", 1).skip(skip).limit(chunk_rows))
+        if not entries:
+            return
+        skip += len(entries)
+        yield entries, None
+
+
+def ingest(chunks, state):
+    """Append every new label to labels.csv, saving the read position after each chunk.
+
+    One row per /history index: the first label read for an index stands, as
+    on the backend, and a later one for the same index is skipped."""
+    labels = load_labels()
+    seen = set(labels["index"]) if "index" in labels else set()
+    kept, added = len(labels), 0
+    for entries, offset in chunks:
+        state["labels_read"] += len(entries)
+        fresh = []
+        for e in entries:
+            if e["index"] not in seen:
+                seen.add(e["index"])
+                fresh.append(e)
+        if len(fresh) < len(entries):
+            print(f"⚠ Skipped {len(entries) - len(fresh)} labels for already-labeled indices")
+        if fresh:
+            rows = pd.DataFrame([e["features"] for e in fresh], columns=FEATURES)
+            rows["target"] = [int(e["outcome"]) for e in fresh]
+            rows["split"] = ["holdout" if (kept + i) % HOLDOUT_EVERY == HOLDOUT_EVERY - 1 else "train"
+                             for i in range(len(fresh))]
+            rows["index"] = [e["index"] for e in fresh]
+            os.makedirs(FEEDBACK_DIR, exist_ok=True)
+            rows.to_csv(LABELS_FILE, mode="a", header=not os.path.exists(LABELS_FILE), index=False)
+            kept += len(fresh)
+            added += len(fresh)
+        if offset is not None:
+            state["offset"] = offset
+        save_state(state)
+    return added
+
+
+def load_labels():
+    if not os.path.exists(LABELS_FILE):
+        return pd.DataFrame(columns=FEATURES + ["target", "split", "index"])
+    return pd.read_csv(LABELS_FILE)
+
+
+# ─────────────────────────────────────────────
+# DATA — heart.csv split as in train_model.py, scaled with the served stats
+# ─────────────────────────────────────────────
+def heart_split(preprocessing):
+    X, y = load_heart(preprocessing)
+    return train_test_split(X.to_numpy(np.float64), y.to_numpy(), test_size=0.2, random_state=42)
+
+
+# ─────────────────────────────────────────────
+# WARM START
+# ─────────────────────────────────────────────
+def as_sgd(model, n_train):
+    """A log-loss SGDClassifier carrying a LogisticRegression's coefficients (same L2 strength)."""
+    if isinstance(model, SGDClassifier):
+        return model
+    sgd = SGDClassifier(loss="log_loss", alpha=1.0 / (model.C * n_train), learning_rate="constant",
+                        eta0=SGD_LEARNING_RATE, random_state=42)
+    sgd.coef_, sgd.intercept_ = model.coef_.copy(), model.intercept_.copy()
+    return sgd
+
+
+def warm_start(name, model, chunks, n_train):
+    """A copy of `model` updated on each (X, y) chunk in turn; the served model is untouched."""
+    model = copy.deepcopy(model)
+    if name == "logistic_regression":
+        model = as_sgd(model, n_train)
+    for X, y in chunks:
+        if isinstance(model, SGDClassifier):
+            model.partial_fit(X, y, classes=np.array([0, 1]))
+        elif len(np.unique(y)) == 2:     # trees need both classes in what they are fitted on
+            grow = RF_TREES_PER_CHUNK if name == "random_forest" else GB_STAGES_PER_CHUNK
+            model.set_params(warm_start=True, n_estimators=model.n_estimators + grow, random_state=42)
+            model.fit(X, y)
+    return model
+
+
+def scores(model, X, y):
+    prob = model.predict_proba(X)[:, 1]
+    return {"accuracy": accuracy_score(y, prob >= 0.5), "roc_auc": roc_auc_score(y, prob)}
+
+
+def improves(candidate, served):
+    return (candidate["roc_auc"] > served["roc_auc"] + MIN_GAIN
+            and candidate["accuracy"] >= served["accuracy"])
+
+
+# ─────────────────────────────────────────────
+# WRITE + PUBLISH
+# ─────────────────────────────────────────────
+def write_run(models, improved, X_fit, y_fit, X_eval, y_eval):
+    """Overwrite the improved pickles, then re-score every card, metric and variant."""
+    spec = load_calibration_spec() or {}
+    tables, variant_tables = spec.get("models", {}), spec.get("variants", {})
+    for name in improved:
+        joblib.dump(models[name], f"{name}.pkl")
+        tables[name] = build_calibration(models[name], X_fit, y_fit, X_eval, y_eval)
+    variant_tables.update(calibrate_variants({name: models[name] for name in improved},
+                                             X_fit, y_fit, X_eval, y_eval))
+    save_calibration_spec(tables, variant_tables)
+
+    cards = {name: build_model_card(name, name.replace("_", " ").title(), model, X_eval, y_eval,
+                                    FEATURES, f"{name}.pkl", tables.get(name))
+             for name, model in models.items()}
+    best = max(cards, key=lambda n: cards[n]["metrics"]["accuracy"])
+    save_model_cards(cards, best)
+
+    with open("model_comparison.json", "w") as f:
+        json.dump({c["display_name"]: {"accuracy": c["metrics"]["accuracy"], "roc_auc": c["metrics"]["roc_auc"]}
+                   for c in cards.values()}, f)
+    with open("metrics.json", "w") as f:
+        json.dump({k: cards[best]["metrics"][k]
+                   for k in ("accuracy", "precision", "recall", "f1_score", "roc_auc")}, f)
+    np.save("confusion_matrix.npy", np.array(cards[best]["confusion_matrix"]))
+
+    print_report(export_variants(models, X_eval, y_eval))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-start the served models on newly labeled predictions.")
+    parser.add_argument("--labels", default=LABEL_LOG, help="label log written by POST /history/outcome")
+    parser.add_argument("--mongo", help="read the label log from this MongoDB URI instead")
+    parser.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="labels per chunk")
+    parser.add_argument("--stage", action="store_true", help="publish without moving CURRENT")
+    args = parser.parse_args()
+
+    run = current_run()
+    if run is None:
+        sys.exit("✘ No artifact store — run train_model.py first")
+
+    state = load_state()
+    chunks = (collection_chunks(args.mongo, state["labels_read"], args.chunk) if args.mongo
+              else log_chunks(args.labels, state["offset"], args.chunk))
+    print(f"✔ Added {ingest(chunks, state)} new labels ({state['labels_read']} read in total)")
+
+    # Start from exactly what the backend serves
+    checkout(run)
+    manifest = load_manifest(run)
+    absorbed = dict(manifest["meta"].get("retrain", {}).get("absorbed", {}))
+    preprocessing = load_preprocessing_spec()
+    scale = scaler_from(preprocessing)
+    served = {name: joblib.load(f"{name}.pkl") for name in MODELS}
+
+    labels = load_labels()
+    X_heart, X_test, y_heart, y_test = heart_split(preprocessing)
+    holdout = labels[labels["split"] == "holdout"]
+    X_eval = scale(np.vstack([X_test, holdout[FEATURES].to_numpy(np.float64)]))
+    y_eval = np.concatenate([y_test, holdout["target"].to_numpy(int)])
+
+    candidates, report = {}, {}
+    for name, model in served.items():
+        new = labels.iloc[absorbed.get(name, 0):]
+        new = new[new["split"] == "train"]
+        if len(new) < MIN_NEW_ROWS:
+            print(f"  {name}: {len(new)} new labeled rows (needs {MIN_NEW_ROWS}) — kept")
+            continue
+        X_new, y_new = scale(new[FEATURES].to_numpy(np.float64)), new["target"].to_numpy(int)
+        chunks = [(X_new[i:i + args.chunk], y_new[i:i + args.chunk]) for i in range(0, len(new), args.chunk)]
+        candidates[name] = warm_start(name, model, chunks, len(y_heart))
+        report[name] = (scores(model, X_eval, y_eval), scores(candidates[name], X_eval, y_eval), len(new))
+
+    if report:
+        print(f"\n{'model':<22}{'rows':>6}{'accuracy':>10}{'→':>3}{'new':>8}{'roc_auc':>9}{'→':>3}{'new':>8}")
+    for name, (old, new, rows) in report.items():
+        print(f"{name:<22}{rows:>6}{old['accuracy']:>10.4f}{'':>3}{new['accuracy']:>8.4f}"
+              f"{old['roc_auc']:>9.4f}{'':>3}{new['roc_auc']:>8.4f}  {'✔' if improves(new, old) else '·'}")
+    improved = [name for name, (old, new, _) in report.items() if improves(new, old)]
+    if not improved:
+        print(f"\n⚠ No model improved on {len(y_eval)} evaluation rows — nothing published")
+        return
+
+    models = {**served, **{name: candidates[name] for name in improved}}
+    labeled_train = labels[labels["split"] == "train"]
+    X_fit = scale(np.vstack([X_heart, labeled_train[FEATURES].to_numpy(np.float64)]))
+    y_fit = np.concatenate([y_heart, labeled_train["target"].to_numpy(int)])
+    best = write_run(models, improved, X_fit, y_fit, X_eval, y_eval)
+
+    absorbed.update({name: len(labels) for name in improved})
+    meta = {**run_meta(), "retrain": {"from_run": run, "improved": improved, "absorbed": absorbed,
+                                      "eval_rows": int(len(y_eval))}}
+    print()
+    manifest = publish(meta, activate=not args.stage)
+    print_manifest(manifest)
+    print(f"   improved: {', '.join(improved)} · best: {best}")
+    if args.stage:
+        hashes = ",".join(manifest["files"][f"{name}.pkl"]["sha256"][:12] for name in improved)
+        print(f"   staged — shadow it with CARDIOSCAN_SHADOW={hashes}, "
+              f"then `python artifact_store.py rollback {manifest['run']}`")
+    else:
+        print(f"✔ CURRENT → {manifest['run']} (restart the backend to serve it)")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,13 @@ from sklearn.metrics import (
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 
+from artifact_store import print_manifest, publish
+from calibration_spec import build_calibration, save_calibration_spec
+from drift_spec import build_drift_reference, save_drift_reference
+from model_cards import build_model_card, save_model_cards
+from model_variants import calibrate_variants, export_variants, print_report
+from preprocessing_spec import build_preprocessing_spec, save_preprocessing_spec
+
 # -----------------------------
 # 1. LOAD DATA
 # -----------------------------
@@ -45,7 +52,11 @@ df = df.apply(pd.to_numeric)
 print("\nMissing Values Before Cleaning:")
 print(df.isnull().sum())
 
-df.fillna(df.median(), inplace=True)
+# Medians and gappy columns go into the preprocessing artifact so the
+# backend imputes exactly like this
+medians = df.median()
+optional_columns = [c for c in columns if df[c].isnull().any()]
+df.fillna(medians, inplace=True)
 
 print("\nMissing Values After Cleaning:")
 print(df.isnull().sum())
@@ -87,6 +98,8 @@ models = {
 }
 
 comparison_results = {}
+model_cards = {}
+calibration = {}
 best_model = None
 best_accuracy = 0
 
@@ -95,7 +108,8 @@ for name, model in models.items():
     print(f"\nTraining {name}...")
 
     model.fit(X_train, y_train)
-    joblib.dump(model, f"{name.replace(' ', '_').lower()}.pkl")
+    key = name.replace(' ', '_').lower()
+    joblib.dump(model, f"{key}.pkl")
     y_pred = model.predict(X_test)
     y_prob = model.predict_proba(X_test)[:,1]
 
@@ -112,6 +126,13 @@ for name, model in models.items():
         "roc_auc": roc_auc
     }
 
+    # Out-of-fold isotonic / Platt map the backend applies to predict_proba
+    calibration[key] = build_calibration(model, X_train, y_train, X_test, y_test)
+
+    model_cards[key] = build_model_card(
+        key, name, model, X_test, y_test, X.columns, f"{key}.pkl", calibration[key]
+    )
+
     print(f"{name} Accuracy: {acc:.4f}")
     print(f"{name} ROC-AUC: {roc_auc:.4f}")
 
@@ -121,9 +142,8 @@ for name, model in models.items():
         best_model_name = name
         best_y_pred = y_pred
         best_y_prob = y_prob
-        best_fpr = fpr
-        best_tpr = tpr
         best_roc_auc = roc_auc
+        best_key = key
 
 print("\nBest Model Selected:", best_model_name)
 
@@ -134,6 +154,15 @@ print("\nBest Model Selected:", best_model_name)
 with open("model_comparison.json", "w") as f:
     json.dump(comparison_results, f)
 
+# Model cards — compact JSON the Model Info page renders from
+save_model_cards(model_cards, best_key)
+
+# Pruned / float16 variants of the tree models for small edge boxes, each
+# with a calibration table fitted to its own probabilities
+trained = {name.replace(' ', '_').lower(): model for name, model in models.items()}
+print_report(export_variants(trained, X_test, y_test))
+save_calibration_spec(calibration, calibrate_variants(trained, X_train, y_train, X_test, y_test))
+
 # -----------------------------
 # 7. SAVE EVALUATION METRICS
 # -----------------------------
@@ -153,14 +182,7 @@ with open("metrics.json", "w") as f:
 cm = confusion_matrix(y_test, best_y_pred)
 np.save("confusion_matrix.npy", cm)
 
-# Save ROC Curve
-plt.figure()
-plt.plot(best_fpr, best_tpr, label=f"AUC = {best_roc_auc:.2f}")
-plt.plot([0,1],[0,1],'--')
-plt.legend()
-plt.title("ROC Curve")
-plt.savefig("roc_curve.png")
-plt.close()
+# ROC / precision-recall points for every model live in the model cards
 
 # -----------------------------
 # 8. FEATURE IMPORTANCE
@@ -177,10 +199,17 @@ if hasattr(best_model, "feature_importances_"):
     print(feat_df)
 
 # -----------------------------
-# 9. SAVE BEST MODEL
+# 9. SAVE PREPROCESSING + PUBLISH RUN
 # -----------------------------
 
-joblib.dump(best_model, "heart_model.pkl")
-joblib.dump(scaler, "scaler.pkl")
+# Imputation medians, categorical code maps and scaler stats the backend
+# applies to every request — the only saved copy of the fitted scaler
+save_preprocessing_spec(build_preprocessing_spec(X, scaler, medians, optional_columns))
+
+# Per-feature training distributions the backend's drift monitor compares against
+save_drift_reference(build_drift_reference(X))
 
-print("\nBest model and scaler saved successfully!")
+# Every output above, deduplicated into artifacts/ under a new manifest the
+# backend serves (the best model is named in the manifest, not copied)
+print()
+print_manifest(publish())